@@ -4,16 +4,69 @@
 Public API
 """
 
-from .compile import to_nfa as compile
-from .process import match, full_match, search
-from .shared import exceptions
+from .compile import cached_nfa as compile
+from .compile import (
+    dumps,
+    loads,
+    dump,
+    load,
+    compile_cached,
+    map_dfa,
+    cache_info,
+    purge)
+from .process import (
+    match,
+    full_match,
+    search,
+    finditer,
+    count,
+    sub,
+    split,
+    search_file,
+    finditer_file,
+    count_file,
+    search_lines,
+    match_many,
+    search_many,
+    match_mask,
+    full_match_mask,
+    search_mask,
+    match_ends,
+    extract_many)
+from .shared import (
+    exceptions,
+    Flags)
 
 
 __all__ = [
     'compile',
+    'dumps',
+    'loads',
+    'dump',
+    'load',
+    'compile_cached',
+    'map_dfa',
+    'cache_info',
+    'purge',
     'match',
     'full_match',
     'search',
-    'exceptions']
+    'finditer',
+    'count',
+    'sub',
+    'split',
+    'search_file',
+    'finditer_file',
+    'count_file',
+    'search_lines',
+    'match_many',
+    'search_many',
+    'match_mask',
+    'full_match_mask',
+    'search_mask',
+    'match_ends',
+    'extract_many',
+    'exceptions',
+    'Flags']
 
-__version__ = '0.17'
+__version__ = '0.18'
@@ -1,13 +1,33 @@
 # -*- coding: utf-8 -*-
 
 from . import compile
+from . import serialize
+from . import cache
 
 __doc__ = compile.__doc__
 __all__ = [
     'to_nfa',
     'to_rpn',
-    'to_atoms']
+    'to_atoms',
+    'dumps',
+    'loads',
+    'dump',
+    'load',
+    'compile_cached',
+    'map_dfa',
+    'cached_nfa',
+    'cache_info',
+    'purge']
 
 to_nfa = compile.to_nfa
 to_rpn = compile.to_rpn
 to_atoms = compile.to_atoms
+dumps = serialize.dumps
+loads = serialize.loads
+dump = serialize.dump
+load = serialize.load
+compile_cached = serialize.compile_cached
+map_dfa = serialize.map_dfa
+cached_nfa = cache.cached_nfa
+cache_info = cache.cache_info
+purge = cache.purge
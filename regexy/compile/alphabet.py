@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tools for splitting the alphabet\
+into classes of equivalent chars
+
+Two chars are equivalent when every\
+char node matches both of them or none\
+of them. Table driven matchers (i.e: a DFA)\
+can then have a transition per class\
+instead of a transition per char
+
+:private:
+"""
+
+import array
+import bisect
+from typing import (
+    Iterator,
+    List,
+    Tuple,
+    Union)
+
+from ..shared import Flags
+from ..shared.nodes import (
+    Node,
+    CharNode)
+
+
+__all__ = [
+    'Alphabet',
+    'alphabet',
+    'nfa_alphabet',
+    'char_nodes']
+
+
+MAX_CODE_POINT = 0x10ffff
+MAX_BYTE = 0xff
+ASCII_SIZE = 0x80
+
+
+class Alphabet:
+    """
+    A partition of the alphabet into\
+    classes. A char class is looked up\
+    in a table for ASCII chars and\
+    by bisecting the intervals otherwise
+
+    :ivar starts: first char (code point)\
+    of every interval, sorted
+    :ivar classes: class of every interval
+    :ivar chars: a char of every class
+    :ivar ascii: class of every ASCII char
+    :private:
+    """
+
+    __slots__ = (
+        'starts',
+        'classes',
+        'chars',
+        'ascii')
+
+    def __init__(
+            self,
+            starts: List[int],
+            classes: List[int],
+            chars: List[Union[str, int]]) -> None:
+        self.starts = array.array('I', starts)
+        self.classes = array.array('I', classes)
+        self.chars = chars
+        self.ascii = array.array('I', (
+            self._bisect(code_point)
+            for code_point in range(ASCII_SIZE)))
+
+    def __len__(self) -> int:
+        return len(self.chars)
+
+    def __repr__(self) -> str:
+        return '%s<%d classes, %d intervals>' % (
+            self.__class__.__name__, len(self.chars), len(self.starts))
+
+    def _bisect(self, code_point: int) -> int:
+        return self.classes[
+            bisect.bisect_right(self.starts, code_point) - 1]
+
+    def class_of(self, char: Union[str, int]) -> int:
+        """
+        Return the class of a char.\
+        The char is a byte (int) in bytes mode
+
+        :param char: a char
+        :return: the class of the char
+        :private:
+        """
+        code_point = char if isinstance(char, int) else ord(char)
+
+        if code_point < ASCII_SIZE:
+            return self.ascii[code_point]
+
+        return self._bisect(code_point)
+
+
+def char_nodes(state: Node) -> Iterator[CharNode]:
+    """
+    Return every CharNode of the NFA
+
+    :param state: the first state of the NFA
+    :return: the CharNodes
+    :private:
+    """
+    visited = {state}
+    pending = [state]
+
+    while pending:
+        state = pending.pop()
+
+        if isinstance(state, CharNode):
+            yield state
+
+        for s in state.out:
+            if s not in visited:
+                visited.add(s)
+                pending.append(s)
+
+
+def _ranges(char) -> List[Tuple[int, int]]:
+    if isinstance(char, str):
+        return [(ord(char), ord(char))]
+
+    if isinstance(char, int):
+        return [(char, char)]
+
+    return char.code_point_ranges(is_surrogates=True)
+
+
+def alphabet(state: Node, is_bytes: bool=False) -> Alphabet:
+    """
+    Split the alphabet into classes\
+    of chars no char node can tell apart.\
+    The alphabet are the bytes in bytes\
+    mode and the code points otherwise
+
+    Every char node matches a set of\
+    ranges. These split the alphabet into\
+    intervals, every char in an interval\
+    is matched by the same char nodes.\
+    The intervals are then grouped by\
+    the char nodes matching them
+
+    :param state: the first state of the NFA
+    :param is_bytes: whether it's bytes mode
+    :return: the alphabet
+    :private:
+    """
+    max_char = MAX_BYTE if is_bytes else MAX_CODE_POINT
+    nodes = list(char_nodes(state))
+    bounds = {0}
+
+    for node in nodes:
+        for start, end in _ranges(node.char):
+            bounds.add(start)
+            bounds.add(end + 1)
+
+    class_ids = {}
+    starts = []
+    classes = []
+    chars = []
+
+    for start in sorted(bounds):
+        if start > max_char:
+            break
+
+        char = start if is_bytes else chr(start)
+        key = tuple(char == node.char for node in nodes)
+
+        if key not in class_ids:
+            class_ids[key] = len(chars)
+            chars.append(char)
+
+        # Merge adjacent intervals of the same class
+        if classes and classes[-1] == class_ids[key]:
+            continue
+
+        starts.append(start)
+        classes.append(class_ids[key])
+
+    return Alphabet(starts, classes, chars)
+
+
+def nfa_alphabet(nfa) -> Alphabet:
+    """
+    Return the alphabet of the NFA.\
+    It's built along with the DFAs\
+    (see ``NFA.alphabet``), otherwise\
+    it's built here every time
+
+    :param nfa: a NFA
+    :return: the alphabet
+    :private:
+    """
+    if nfa.alphabet is not None:
+        return nfa.alphabet
+
+    return alphabet(nfa.state, is_bytes=bool(nfa.flags & Flags.BYTES))
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+"""
+A process-wide cache of compiled\
+regular expressions
+
+The least recently used regex\
+is dropped when the cache is full
+
+:public:
+"""
+
+import sys
+import threading
+import collections
+from typing import Union
+
+from .compile import (
+    NFA,
+    to_nfa)
+from .dfa import MAX_STATES
+from .nfa import all_states
+from .serialize import loads
+
+
+__all__ = [
+    'cached_nfa',
+    'cache_info',
+    'purge',
+    'CacheInfo']
+
+
+MAX_SIZE = 512
+
+CacheInfo = collections.namedtuple('CacheInfo', (
+    'hits',
+    'misses',
+    'evictions',
+    'size',
+    'max_size',
+    'bytes'))
+CacheInfo.__doc__ = """
+    Statistics of the compile cache
+
+    :ivar int hits: regexes found in the cache
+    :ivar int misses: regexes compiled
+    :ivar int evictions: regexes dropped\
+    to make room for others
+    :ivar int size: regexes in the cache
+    :ivar int max_size: max regexes in the cache
+    :ivar int bytes: estimated memory used\
+    by the regexes in the cache
+"""
+
+_lock = threading.Lock()
+# NFA and estimated bytes by key
+_cache = collections.OrderedDict()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'bytes': 0}
+
+
+def _bytes(nfa: NFA) -> int:
+    """
+    Estimate the memory used by the NFA
+
+    :private:
+    """
+    size = sum(
+        sys.getsizeof(state) +
+        sys.getsizeof(vars(state)) +
+        sys.getsizeof(state.out)
+        for state in all_states(nfa.state))
+
+    if nfa.alphabet is not None:
+        size += sum(
+            sys.getsizeof(values)
+            for values in (
+                nfa.alphabet.starts,
+                nfa.alphabet.classes,
+                nfa.alphabet.chars,
+                nfa.alphabet.ascii))
+
+    if nfa.dfa is not None:
+        size += sum(dfa.table_bytes for dfa in nfa.dfa[:3])
+
+    return size
+
+
+def cached_nfa(
+        expression: Union[str, bytes],
+        flags: int=0,
+        dfa: str=None,
+        dfa_max_states: int=MAX_STATES) -> NFA:
+    """
+    Same as ``to_nfa`` but the regex\
+    is compiled once and kept in the cache.\
+    The regex is compiled outside the lock,\
+    so a slow regex does not block others
+
+    It's thread safe
+
+    :param expression: regex expression
+    :param flags: compiling flags (see ``Flags``)
+    :param dfa: see ``to_nfa``
+    :param dfa_max_states: see ``to_nfa``
+    :return: NFA for the given expression
+    """
+    return _load_nfa(expression, flags, dfa, dfa_max_states)
+
+
+def _load_nfa(
+        expression: Union[str, bytes],
+        flags: int,
+        dfa: Union[str, None],
+        dfa_max_states: int,
+        data: bytes=None) -> NFA:
+    """
+    Same as ``cached_nfa`` but the NFA\
+    may be loaded from the data stored\
+    by ``dumps`` instead of compiled.\
+    Unpickled regexes are kept in\
+    the cache this way
+
+    :param expression: regex expression
+    :param flags: compiling flags (see ``Flags``)
+    :param dfa: see ``to_nfa``
+    :param dfa_max_states: see ``to_nfa``
+    :param data: the stored NFA or\
+    ``None`` to compile the regex
+    :return: NFA for the given expression
+    :private:
+    """
+    # The type is part of the key
+    # since 'a' and b'a' are not equal
+    key = (type(expression), expression, flags, dfa, dfa_max_states)
+
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            _stats['hits'] += 1
+            return _cache[key][0]
+
+        _stats['misses'] += 1
+
+    if data is None:
+        nfa = to_nfa(expression, flags, dfa, dfa_max_states)
+    else:
+        nfa = loads(data)
+
+    size = _bytes(nfa)
+
+    with _lock:
+        if key in _cache:
+            return _cache[key][0]
+
+        _cache[key] = (nfa, size)
+        _stats['bytes'] += size
+
+        while len(_cache) > MAX_SIZE:
+            _key, (_nfa, evicted_size) = _cache.popitem(last=False)
+            _stats['bytes'] -= evicted_size
+            _stats['evictions'] += 1
+
+    return nfa
+
+
+def cache_info() -> CacheInfo:
+    """
+    Return the statistics of the cache
+
+    :return: the statistics
+    """
+    with _lock:
+        return CacheInfo(
+            hits=_stats['hits'],
+            misses=_stats['misses'],
+            evictions=_stats['evictions'],
+            size=len(_cache),
+            max_size=MAX_SIZE,
+            bytes=_stats['bytes'])
+
+
+def purge() -> None:
+    """
+    Clear the cache and its statistics
+    """
+    with _lock:
+        _cache.clear()
+
+        for name in _stats:
+            _stats[name] = 0
@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tools for generating the Python source\
+of a matcher specialized for a regex
+
+The generated functions run the DFAs\
+(see ``to_dfa``) with the states as\
+integers and the transitions inlined\
+as comparisons of the char, so there\
+is no table nor nodes to look up.\
+States matching too many intervals\
+of chars look up their class instead,\
+and so do all of them in large DFAs
+
+The generated source is a module, it\
+can be executed or written to a file\
+and imported ahead of time
+
+:public:
+"""
+
+import collections
+from typing import (
+    List,
+    Tuple)
+
+from ..shared import Flags
+from .alphabet import (
+    MAX_BYTE,
+    MAX_CODE_POINT,
+    Alphabet,
+    nfa_alphabet)
+from .dfa import (
+    DFA,
+    DEAD,
+    START,
+    full_dfa)
+
+
+__all__ = [
+    'Matcher',
+    'to_source',
+    'matcher',
+    'write_module']
+
+
+# States are dispatched in sequence,
+# past this all of them look up
+# the class of the char
+MAX_STATES = 256
+
+# Max intervals of chars compared
+# inline, by state. Otherwise the
+# class of the char is looked up
+MAX_INLINE = 8
+
+Matcher = collections.namedtuple('Matcher', (
+    'match',
+    'full_match',
+    'source'))
+Matcher.__doc__ = """
+    Generated matcher functions. These take\
+    an iterable of chunks of the text and\
+    return where the match ends or ``-1``
+
+    :ivar match: same as ``match``
+    :ivar full_match: same as ``full_match``
+    :ivar str source: the generated source
+    :private:
+"""
+
+IntervalsType = List[Tuple[int, int]]
+
+
+def _intervals(
+        alphabet: Alphabet,
+        max_char: int) -> List[Tuple[int, int, int]]:
+    """
+    Return the first char, last char and\
+    class of every interval of the alphabet
+
+    :private:
+    """
+    starts = alphabet.starts
+    ends = [start - 1 for start in starts[1:]] + [max_char]
+    return list(zip(starts, ends, alphabet.classes))
+
+
+def _condition(intervals: IntervalsType, is_bytes: bool) -> str:
+    """
+    Return a condition matching\
+    a char within the intervals
+
+    :private:
+    """
+    to_char = repr if is_bytes else lambda c: repr(chr(c))
+    conditions = []
+
+    for start, end in intervals:
+        if start == end:
+            conditions.append('char == %s' % to_char(start))
+        else:
+            conditions.append('%s <= char <= %s' % (
+                to_char(start), to_char(end)))
+
+    return ' or '.join(conditions)
+
+
+def _lookup_lines(name: str, state: str, is_full: bool) -> List[str]:
+    """
+    Return the lines of a transition\
+    looking up the class of the char
+
+    :private:
+    """
+    lines = [
+        'state = _%s_ROWS[%s][_class_of(char)]' % (name, state),
+        'if state == %d:' % DEAD,
+        '    return %s' % ('-1' if is_full else 'end')]
+
+    if not is_full:
+        lines.extend([
+            'if _%s_ACCEPTS[state]:' % name,
+            '    end = pos'])
+
+    return lines
+
+
+def _state_lines(
+        dfa: DFA,
+        name: str,
+        state: int,
+        intervals: List[Tuple[int, int, int]],
+        is_bytes: bool,
+        is_full: bool) -> List[str]:
+    """
+    Return the lines of the transitions\
+    of a state, these are indented\
+    for the body of the ``if`` of the state
+
+    :private:
+    """
+    on_dead = 'return -1' if is_full else 'return end'
+    targets = collections.OrderedDict()
+
+    for start, end, char_class in intervals:
+        target = dfa.step(state, char_class)
+
+        if target == DEAD:
+            continue
+
+        target_intervals = targets.setdefault(target, [])
+
+        # Merge adjacent intervals
+        if target_intervals and target_intervals[-1][1] == start - 1:
+            target_intervals[-1] = (target_intervals[-1][0], end)
+        else:
+            target_intervals.append((start, end))
+
+    if sum(len(i) for i in targets.values()) > MAX_INLINE:
+        return _lookup_lines(name, str(state), is_full)
+
+    lines = []
+
+    for target, target_intervals in targets.items():
+        lines.append('%s %s:' % (
+            'elif' if lines else 'if',
+            _condition(target_intervals, is_bytes)))
+        body = []
+
+        if target != state:
+            body.append('state = %d' % target)
+
+        if not is_full and dfa.accepts[target]:
+            body.append('end = pos')
+
+        lines.extend('    %s' % line for line in body or ['pass'])
+
+    if lines:
+        lines.extend(['else:', '    %s' % on_dead])
+    else:
+        lines.append(on_dead)
+
+    return lines
+
+
+def _table_lines(name: str, dfa: DFA) -> List[str]:
+    return [
+        '_%s_ROWS = %r' % (name.upper(), tuple(
+            tuple(
+                dfa.step(state, char_class)
+                for char_class in range(dfa.classes_count))
+            for state in range(dfa.states_count))),
+        '_%s_ACCEPTS = %r' % (
+            name.upper(), tuple(bool(a) for a in dfa.accepts))]
+
+
+def _function_lines(
+        name: str,
+        dfa: DFA,
+        intervals: List[Tuple[int, int, int]],
+        is_bytes: bool,
+        is_full: bool) -> List[str]:
+    """
+    Return the lines of a function\
+    running the DFA
+
+    :private:
+    """
+    lines = [
+        'def %s(chunks):' % name,
+        '    state = %d' % START,
+        '    end = %d' % (0 if dfa.accepts[START] else -1),
+        '    pos = 0',
+        '',
+        '    for chunk in chunks:',
+        '        for char in chunk:',
+        '            pos += 1',
+        '']
+
+    if dfa.states_count > MAX_STATES:
+        body = _lookup_lines(name.upper(), 'state', is_full)
+    else:
+        body = []
+
+        for state in range(START, dfa.states_count):
+            body.append('%s state == %d:' % (
+                'if' if state == START else 'elif', state))
+            body.extend(
+                '    %s' % line
+                for line in _state_lines(
+                    dfa, name.upper(), state, intervals, is_bytes, is_full))
+
+    lines.extend('            %s' % line for line in body)
+
+    if is_full:
+        lines.extend([
+            '',
+            '    if _%s_ACCEPTS[state]:' % name.upper(),
+            '        return pos',
+            '',
+            '    return -1'])
+    else:
+        lines.extend(['', '    return end'])
+
+    return lines
+
+
+def to_source(nfa) -> str:
+    """
+    Return the source of a module\
+    with the ``match`` and ``full_match``\
+    functions of the regex (see ``Matcher``).\
+    The DFAs of the NFA are used, or\
+    built if there are none
+
+    :param nfa: a NFA
+    :return: the source of the module
+    :raise ValueError: if the DFAs\
+    can't be built (see ``full_dfa``)
+    :private:
+    """
+    from .. import __version__
+
+    dfas = nfa.dfa or full_dfa(nfa)
+    alphabet = nfa_alphabet(nfa)
+    is_bytes = bool(nfa.flags & Flags.BYTES)
+    intervals = _intervals(
+        alphabet, MAX_BYTE if is_bytes else MAX_CODE_POINT)
+    lines = [
+        '# -*- coding: utf-8 -*-',
+        '',
+        '# Generated by regexy %s, do not edit' % __version__,
+        '',
+        'import bisect',
+        '',
+        'EXPRESSION = %r' % (nfa.expression,),
+        'FLAGS = %d' % nfa.flags,
+        '',
+        '_STARTS = %r' % (tuple(alphabet.starts),),
+        '_CLASSES = %r' % (tuple(alphabet.classes),),
+        '_ASCII = %r' % (tuple(alphabet.ascii),)]
+    lines.extend(_table_lines('match', dfas.match))
+    lines.extend(_table_lines('full_match', dfas.full_match))
+    lines.extend([
+        '',
+        '',
+        'def _class_of(char):',
+        '    code = %s' % ('char' if is_bytes else 'ord(char)'),
+        '',
+        '    if code < %d:' % len(alphabet.ascii),
+        '        return _ASCII[code]',
+        '',
+        '    return _CLASSES[bisect.bisect_right(_STARTS, code) - 1]',
+        '',
+        ''])
+    lines.extend(_function_lines(
+        'match', dfas.match, intervals, is_bytes, is_full=False))
+    lines.extend(['', ''])
+    lines.extend(_function_lines(
+        'full_match', dfas.full_match, intervals, is_bytes, is_full=True))
+    return '\n'.join(lines) + '\n'
+
+
+def matcher(nfa) -> Matcher:
+    """
+    Generate the matcher functions\
+    of the regex
+
+    :param nfa: a NFA
+    :return: the matcher
+    :raise ValueError: see ``to_source``
+    :private:
+    """
+    source = to_source(nfa)
+    namespace = {}
+    exec(compile(source, '<regexy>', 'exec'), namespace)
+    return Matcher(
+        match=namespace['match'],
+        full_match=namespace['full_match'],
+        source=source)
+
+
+def write_module(nfa, path: str) -> None:
+    """
+    Write the module of the regex\
+    matcher (see ``to_source``). The\
+    module can be imported ahead of\
+    time, its functions take an\
+    iterable of chunks of the text
+
+    :param nfa: a NFA
+    :param path: path of the ``.py`` file
+    :raise ValueError: see ``to_source``
+    """
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(to_source(nfa))
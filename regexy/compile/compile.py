@@ -15,14 +15,30 @@ One-off scripts are not a use-case I care about
 """
 
 import collections
+from typing import Union
 
+from ..shared import Flags
+from ..shared.nodes import (
+    Node,
+    LookaheadNFANode)
 from .parse import (
     parse,
     greediness,
     join_atoms,
     fill_groups)
 from .rpn import rpn
-from .nfa import nfa
+from .nfa import (
+    nfa,
+    literals,
+    anchors,
+    lengths)
+from .utf8 import utf8
+from .alphabet import alphabet
+from .literal import literal
+from .dfa import (
+    MAX_STATES,
+    full_dfa)
+from . import codegen
 
 
 __all__ = [
@@ -32,21 +48,81 @@ __all__ = [
     'to_atoms']
 
 
-NFA = collections.namedtuple('NFA', (
+_NFA = collections.namedtuple('NFA', (
     'state',
     'groups_count',
-    'named_groups'))
-NFA.__doc__ = """
+    'named_groups',
+    'flags',
+    'expression',
+    'alphabet',
+    'dfa',
+    'matcher',
+    'literal',
+    'is_start_anchored',
+    'is_end_anchored',
+    'min_length',
+    'max_length'))
+
+
+class NFA(_NFA):
+    """
     This contains the first state\
     of the NFA and the number of groups
 
     The state must be treated as an immutable data\
     structure, but currently this is not enforced
 
+    The NFA is pickled as the table\
+    of states ``dumps`` stores, along\
+    with the DFAs if any. It's loaded\
+    without compiling it again, so\
+    processes of a pool don't compile it
+
     :ivar Node state: the first node of the NFA
     :ivar int groups_count: the number of capturing groups
+    :ivar dict named_groups: group indexes by name
+    :ivar int flags: the compiling flags
+    :ivar expression: the regular expression\
+    the NFA was compiled from
+    :ivar Alphabet alphabet: the classes of\
+    chars the NFA can't tell apart. These\
+    are built along with the DFAs only,\
+    or ``None`` (see ``nfa_alphabet``)
+    :ivar DFAs dfa: the DFAs of the\
+    capture-free engines or ``None``
+    :ivar Matcher matcher: the generated\
+    matcher functions or ``None``
+    :ivar Literal literal: the text the\
+    regex matches if it's plain text,\
+    or ``None``
+    :ivar bool is_start_anchored: whether\
+    all matches start at the start of the text
+    :ivar bool is_end_anchored: whether\
+    all matches end at the end of the text
+    :ivar int min_length: the min number of\
+    chars a match may span
+    :ivar int max_length: the max number of\
+    chars a match may span or ``None``
     :private:
-"""
+    """
+
+    __slots__ = ()
+
+    def __reduce__(self):
+        # This module is imported by it
+        from .serialize import dumps
+
+        dfa = None
+
+        if self.dfa is not None:
+            dfa = 'full' if self.matcher is None else 'codegen'
+
+        return _unpickle, (
+            self.expression,
+            self.flags,
+            dfa,
+            MAX_STATES if self.dfa is None else self.dfa.max_states,
+            dumps(self))
 
 
 def _to_nodes(expression: str):
@@ -56,25 +132,155 @@ def _to_nodes(expression: str):
                 parse(expression))))
 
 
-def to_nfa(expression: str) -> NFA:
+def _lookahead_nfa(node: LookaheadNFANode, flags: int) -> Node:
+    """
+    Compile the sub-pattern of a lookahead\
+    with the flags of the regex. Lookaheads\
+    of more than one char can't be nested
+
+    :private:
+    """
+    if any(isinstance(n, LookaheadNFANode) for n in parse(node.expression)):
+        raise ValueError(
+            'Nested lookaheads (%r) of more than '
+            'one char are not supported' % node.expression)
+
+    return to_nfa(node.expression, flags).state
+
+
+def to_nfa(
+        expression: Union[str, bytes],
+        flags: int=0,
+        dfa: str=None,
+        dfa_max_states: int=MAX_STATES) -> NFA:
     """
     Build the NFA from a given regular expression
 
-    This should be cached at the app level\
-    when performance matters
+    This does not cache the NFA,\
+    see ``cached_nfa``
 
     It's thread safe
 
+    A ``bytes`` expression is compiled\
+    in bytes mode (see ``Flags.BYTES``)
+
+    Passing ``dfa='full'`` builds the minimal\
+    DFAs of the capture-free engines ahead of\
+    time. These are used by ``match`` and\
+    ``full_match`` when there are no groups,\
+    and by the NumPy masks. This takes longer\
+    to compile and the regex must not\
+    contain assertions
+
+    Passing ``dfa='codegen'`` builds the DFAs\
+    and generates Python functions running\
+    them (see ``codegen``), these are used\
+    instead of the DFAs
+
     :param expression: regex expression
+    :param flags: compiling flags (see ``Flags``)
+    :param dfa: ``'full'`` to build the DFAs,\
+    ``'codegen'`` to generate the matcher\
+    as well, or ``None``
+    :param dfa_max_states: max number of\
+    states of every DFA
     :return: NFA for the given expression
+    :raise ValueError: if the DFAs can't\
+    be built or are too large, or\
+    lookaheads of more than one\
+    char are nested
     :public:
     """
+    assert dfa in (None, 'full', 'codegen'), (
+        'dfa must be None, \'full\' or \'codegen\'')
+
+    original_expression = expression
+
+    if isinstance(expression, bytes):
+        expression = expression.decode('latin-1')
+        flags |= Flags.BYTES
+
+    if flags & Flags.UTF8:
+        flags |= Flags.BYTES
+
     nodes = list(_to_nodes(expression))
+
+    for node in nodes:
+        if isinstance(node, LookaheadNFANode):
+            node.state = _lookahead_nfa(node, flags)
+
+    if flags & Flags.MULTILINE:
+        for node in nodes:
+            node.to_multiline()
+
+    nodes_literal = literal(nodes, flags)
+
+    if flags & Flags.IGNORECASE:
+        is_ascii = bool(flags & Flags.BYTES and not flags & Flags.UTF8)
+
+        for node in nodes:
+            node.to_ignore_case(is_ascii)
+
     groups_count, named_groups = fill_groups(nodes)
-    return NFA(
-        state=nfa(rpn(nodes)),
+    nodes_rpn = rpn(nodes)
+
+    if flags & Flags.UTF8:
+        nodes_rpn = utf8(nodes_rpn)
+    elif flags & Flags.BYTES:
+        for node in nodes:
+            node.to_bytes()
+
+    nodes_rpn = list(nodes_rpn)
+    state = nfa(nodes_rpn)
+    literals(state)
+    is_start_anchored, is_end_anchored = anchors(state)
+    min_length, max_length = lengths(nodes_rpn)
+    result = NFA(
+        state=state,
         groups_count=groups_count,
-        named_groups=named_groups)
+        named_groups=named_groups,
+        flags=flags,
+        expression=original_expression,
+        alphabet=None,
+        dfa=None,
+        matcher=None,
+        literal=nodes_literal,
+        is_start_anchored=is_start_anchored,
+        is_end_anchored=is_end_anchored,
+        min_length=min_length,
+        max_length=max_length)
+
+    # Shorthands go through every code point
+    # the first time, so the alphabet is only
+    # built when the DFAs are
+    if dfa is not None:
+        result = result._replace(
+            alphabet=alphabet(state, is_bytes=bool(flags & Flags.BYTES)))
+        result = result._replace(
+            dfa=full_dfa(result, max_states=dfa_max_states))
+
+    if dfa == 'codegen':
+        result = result._replace(matcher=codegen.matcher(result))
+
+    return result
+
+
+def _unpickle(
+        expression: Union[str, bytes],
+        flags: int,
+        dfa: Union[str, None],
+        dfa_max_states: int,
+        data: bytes) -> NFA:
+    """
+    Load the pickled NFA, once per\
+    process. It's kept in the compile\
+    cache (see ``cached_nfa``)
+
+    :private:
+    """
+    # This module is imported by it
+    from .cache import _load_nfa
+    return _load_nfa(expression, flags, dfa, dfa_max_states, data)
 
 
 def to_rpn(expression: str) -> str:
@@ -0,0 +1,447 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tools for creating a DFA out of a NFA
+
+The DFA can tell whether a text\
+matches and where the match ends,\
+but it can't capture groups.\
+Assertions are not supported
+
+:private:
+"""
+
+import array
+import collections
+from typing import (
+    Dict,
+    Iterator,
+    Sequence,
+    List,
+    Tuple,
+    Set,
+    Union)
+
+from ..shared.nodes import (
+    Node,
+    EOF,
+    CharNode,
+    AssertionNode)
+from .alphabet import nfa_alphabet
+
+
+__all__ = [
+    'DFA',
+    'DFAs',
+    'DEAD',
+    'START',
+    'to_dfa',
+    'minimize',
+    'full_dfa']
+
+
+_DFA = collections.namedtuple('DFA', (
+    'transitions',
+    'accepts',
+    'classes_count'))
+
+
+class DFA(_DFA):
+    """
+    A DFA over classes of chars\
+    (see ``NFA.alphabet``). The table\
+    is a flat array of the next state\
+    by state and class. The arrays may\
+    be ``memoryview`` over a mapped file
+
+    :ivar array transitions: next state\
+    by state and class
+    :ivar array accepts: whether the\
+    state is a match, by state
+    :ivar int classes_count: number of classes
+    :private:
+    """
+
+    __slots__ = ()
+
+    @property
+    def states_count(self) -> int:
+        return len(self.accepts)
+
+    @property
+    def table_bytes(self) -> int:
+        return (
+            self.transitions.itemsize * len(self.transitions) +
+            self.accepts.itemsize * len(self.accepts))
+
+    def step(self, state: int, char_class: int) -> int:
+        return self.transitions[state * self.classes_count + char_class]
+
+    def __reduce__(self):
+        # Mapped tables are copied
+        return self.__class__, (
+            _to_array(self.transitions),
+            _to_array(self.accepts),
+            self.classes_count)
+
+
+def _to_array(values: Union[array.array, memoryview]) -> array.array:
+    if isinstance(values, array.array):
+        return values
+
+    return array.array(values.format, values)
+
+
+DFAs = collections.namedtuple('DFAs', (
+    'match',
+    'full_match',
+    'search',
+    'max_states'))
+DFAs.__doc__ = """
+    The DFAs of every capture-free engine
+
+    :ivar DFA match: leftmost-first DFA\
+    to find where ``match`` ends
+    :ivar DFA full_match: DFA to tell\
+    whether ``full_match`` matches
+    :ivar DFA search: DFA to tell\
+    whether ``search`` matches
+    :ivar int max_states: the max number\
+    of states they were built with
+    :private:
+"""
+
+# The state with no way to a match
+DEAD = 0
+START = 1
+
+MAX_STATES = 10000
+
+StatesType = Tuple[Node, ...]
+RowsType = List[List[int]]
+
+
+def _pack(rows: RowsType, accepts: List[bool], classes_count: int) -> DFA:
+    """
+    Store the table in the smallest\
+    array that fits the states
+
+    :private:
+    """
+    if len(rows) <= 0x100:
+        typecode = 'B'
+    elif len(rows) <= 0x10000:
+        typecode = 'H'
+    else:
+        typecode = 'I'
+
+    return DFA(
+        transitions=array.array(
+            typecode, (state for row in rows for state in row)),
+        accepts=array.array('B', accepts),
+        classes_count=classes_count)
+
+
+def _unpack(dfa: DFA) -> RowsType:
+    return [
+        dfa.transitions[i:i + dfa.classes_count].tolist()
+        for i in range(0, len(dfa.transitions), dfa.classes_count)]
+
+
+def _closure(state: Node, visited: Set[Node]) -> Iterator[Node]:
+    """
+    Go to next CharNode or EOF states.\
+    Same as ``process.match.curr_states``\
+    minus the captures
+
+    :private:
+    """
+    if state in visited:
+        return
+
+    visited.add(state)
+
+    if state is EOF or isinstance(state, CharNode):
+        yield state
+        return
+
+    if isinstance(state, AssertionNode):
+        raise ValueError(
+            'Assertions are not supported by the DFA')
+
+    for s in state.out:
+        yield from _closure(s, visited)
+
+
+def _add(states: list, seen: Set[Node], nodes: Iterator[Node]) -> None:
+    for node in nodes:
+        if node not in seen:
+            seen.add(node)
+            states.append(node)
+
+
+def _step(
+        states: StatesType,
+        char: Union[str, int],
+        is_leftmost_first: bool,
+        closures: Dict[Node, List[Node]]) -> list:
+    """
+    Return the states following\
+    the given ones, in order of priority
+
+    In leftmost-first mode, states of\
+    lower priority than a match are\
+    dropped, same as the NFA matcher does
+
+    The closure of every state\
+    is computed once and kept\
+    in the ``closures`` cache
+
+    :private:
+    """
+    next_states = []
+    seen = set()
+
+    for state in states:
+        if state is EOF:
+            if is_leftmost_first:
+                break
+
+            continue
+
+        if char != state.char:
+            continue
+
+        for s in state.out:
+            if s not in closures:
+                closures[s] = list(_closure(s, visited=set()))
+
+            _add(next_states, seen, closures[s])
+
+    return next_states
+
+
+def _normalize(
+        states: list,
+        is_leftmost_first: bool) -> Tuple[StatesType, tuple]:
+    """
+    Return the states and the key that\
+    identifies them. States of lower priority\
+    than a match are never followed in\
+    leftmost-first mode, so they are dropped.\
+    Otherwise, the order does not matter
+
+    :private:
+    """
+    if is_leftmost_first:
+        if EOF in states:
+            states = states[:states.index(EOF) + 1]
+
+        states = tuple(states)
+        return states, states
+
+    return tuple(states), frozenset(states)
+
+
+def to_dfa(
+        nfa,
+        chars: Sequence[Union[str, int]]=None,
+        is_leftmost_first: bool=True,
+        is_search: bool=False,
+        max_states: int=MAX_STATES) -> DFA:
+    """
+    Build a DFA out of a NFA by subset\
+    construction. Every DFA state is the set\
+    of NFA states threads can be in
+
+    In leftmost-first mode, the end of the\
+    match is the last position where the state\
+    is a match, before reaching the dead state.\
+    This is the same end ``match`` finds.\
+    Otherwise, the DFA tells whether there\
+    is any match (i.e: ``full_match``)
+
+    In search mode, a match may start at any\
+    position. This is not supported in\
+    leftmost-first mode
+
+    :param nfa: a NFA
+    :param chars: a char of every class,\
+    the NFA alphabet classes by default
+    :param is_leftmost_first: whether to\
+    drop the threads of lower priority\
+    than a match
+    :param is_search: whether a match\
+    may start at any position
+    :param max_states: max number of states
+    :return: the DFA
+    :raise ValueError: if there are more\
+    states than the max or the NFA\
+    contains assertions
+    :private:
+    """
+    assert not (is_leftmost_first and is_search)
+
+    if chars is None:
+        chars = nfa_alphabet(nfa).chars
+
+    start_states = []
+    _add(start_states, set(), _closure(nfa.state, visited=set()))
+    start_states, start_key = _normalize(start_states, is_leftmost_first)
+    dead_key = _normalize([], is_leftmost_first)[1]
+
+    closures = {}
+    ids = {dead_key: DEAD, start_key: START}
+    pending = [(START, start_states)]
+    transitions = [[DEAD] * len(chars), None]
+    accepts = [False, EOF in start_states]
+
+    while pending:
+        state_id, states = pending.pop()
+        row = []
+
+        for char in chars:
+            next_states = _step(states, char, is_leftmost_first, closures)
+
+            if is_search:
+                seen = set(next_states)
+                _add(next_states, seen, start_states)
+
+            next_states, key = _normalize(next_states, is_leftmost_first)
+
+            if key not in ids:
+                if len(ids) >= max_states:
+                    raise ValueError(
+                        'The DFA has more than %d states' % max_states)
+
+                ids[key] = len(ids)
+                transitions.append(None)
+                accepts.append(EOF in next_states)
+                pending.append((ids[key], next_states))
+
+            row.append(ids[key])
+
+        transitions[state_id] = row
+
+    return _pack(transitions, accepts, len(chars))
+
+
+def minimize(dfa: DFA) -> DFA:
+    """
+    Merge the states no text can\
+    tell apart (Hopcroft's algorithm).\
+    States are equivalent when they reach\
+    match states on the same chars,\
+    so the leftmost-first ends are kept
+
+    The dead and start states are\
+    kept first, so they keep their number
+
+    :param dfa: a DFA
+    :return: the minimal DFA
+    :private:
+    """
+    rows = _unpack(dfa)
+    states_count = len(rows)
+    classes_count = dfa.classes_count
+    inverse = [
+        collections.defaultdict(list)
+        for _ in range(classes_count)]
+
+    for state, row in enumerate(rows):
+        for char_class, next_state in enumerate(row):
+            inverse[char_class][next_state].append(state)
+
+    accepts = frozenset(
+        state
+        for state in range(states_count)
+        if dfa.accepts[state])
+    rejects = frozenset(range(states_count)) - accepts
+    blocks = [block for block in (accepts, rejects) if block]
+    block_ids = [0] * states_count
+
+    for block_id, block in enumerate(blocks):
+        for state in block:
+            block_ids[state] = block_id
+
+    pending = {
+        (min(range(len(blocks)), key=lambda i: len(blocks[i])), char_class)
+        for char_class in range(classes_count)}
+
+    while pending:
+        block_id, char_class = pending.pop()
+        splitters = collections.defaultdict(set)
+
+        for state in blocks[block_id]:
+            for prev_state in inverse[char_class][state]:
+                splitters[block_ids[prev_state]].add(prev_state)
+
+        for split_id, split in splitters.items():
+            rest = blocks[split_id] - split
+
+            if not rest:
+                continue
+
+            new_id = len(blocks)
+            blocks[split_id] = frozenset(split)
+            blocks.append(rest)
+
+            for state in rest:
+                block_ids[state] = new_id
+
+            for other_class in range(classes_count):
+                if (split_id, other_class) in pending:
+                    pending.add((new_id, other_class))
+                elif len(split) <= len(rest):
+                    pending.add((split_id, other_class))
+                else:
+                    pending.add((new_id, other_class))
+
+    # Number the blocks keeping the
+    # dead and start states first
+    order = [block_ids[DEAD], block_ids[START]]
+    order.extend(
+        block_id
+        for block_id in sorted(
+            range(len(blocks)), key=lambda i: min(blocks[i]))
+        if block_id not in order)
+    # The start state may be the dead one,
+    # then it gets numbered twice
+    numbers = {block_id: number for number, block_id in enumerate(order)}
+    numbers[block_ids[DEAD]] = DEAD
+
+    return _pack(
+        [
+            [numbers[block_ids[next_state]]
+             for next_state in rows[min(blocks[block_id])]]
+            for block_id in order],
+        [dfa.accepts[min(blocks[block_id])] for block_id in order],
+        classes_count)
+
+
+def full_dfa(nfa, max_states: int=MAX_STATES) -> DFAs:
+    """
+    Build the minimal DFA of every\
+    capture-free engine
+
+    :param nfa: a NFA
+    :param max_states: max number of states
+    :return: the DFAs
+    :raise ValueError: if there are more\
+    states than the max or the NFA\
+    contains assertions
+    :private:
+    """
+    chars = nfa_alphabet(nfa).chars
+    return DFAs(
+        match=minimize(to_dfa(
+            nfa, chars, max_states=max_states)),
+        full_match=minimize(to_dfa(
+            nfa, chars, is_leftmost_first=False, max_states=max_states)),
+        search=minimize(to_dfa(
+            nfa,
+            chars,
+            is_leftmost_first=False,
+            is_search=True,
+            max_states=max_states)),
+        max_states=max_states)
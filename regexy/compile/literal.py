@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tools for finding regexes that\
+are plain text, these are matched\
+with the string methods instead\
+of the NFA
+
+:private:
+"""
+
+import collections
+from typing import (
+    Sequence,
+    Union)
+
+from ..shared.nodes import (
+    Node,
+    CharNode,
+    OpNode,
+    StartNode,
+    EndNode)
+from ..shared import (
+    Flags,
+    Symbols)
+
+
+__all__ = [
+    'Literal',
+    'literal']
+
+
+Literal = collections.namedtuple('Literal', (
+    'text',
+    'is_start',
+    'is_end',
+    'is_ignore_case'))
+Literal.__doc__ = """
+    A regex matching a plain text,\
+    maybe anchored to the start\
+    and end of the text
+
+    :ivar text: the text to match,\
+    ``bytes`` in bytes mode
+    :ivar bool is_start: whether the\
+    match must start at the start of the text
+    :ivar bool is_end: whether the\
+    match must end at the end of the text
+    :ivar bool is_ignore_case: whether the\
+    text matches regardless of its case.\
+    Then the text is lowercase ASCII and\
+    it's matched against the lowercased text
+    :private:
+"""
+
+
+def literal(nodes: Sequence[Node], flags: int) -> Union[Literal, None]:
+    """
+    Return the text the regex matches,\
+    if the regex is plain text\
+    (i.e: ``^abc$``, ``a\\.b``)
+
+    :param nodes: the joined nodes\
+    in infix notation, as parsed
+    :param flags: the compiling flags
+    :return: the literal or ``None``
+    :private:
+    """
+    nodes = list(nodes)
+    is_start = (
+        bool(nodes) and
+        isinstance(nodes[0], StartNode) and
+        not nodes[0].is_multiline)
+    is_end = (
+        len(nodes) > is_start and
+        isinstance(nodes[-1], EndNode) and
+        not nodes[-1].is_multiline)
+    chars = []
+
+    for node in nodes[is_start:len(nodes) - is_end]:
+        if isinstance(node, OpNode) and node.char == Symbols.JOINER:
+            continue
+
+        if type(node) is not CharNode:
+            return None
+
+        chars.append(node.char)
+
+    if not chars:
+        return None
+
+    text = ''.join(chars)
+    is_ignore_case = False
+
+    # Folding non-ASCII chars may
+    # change the length of the text
+    if flags & Flags.IGNORECASE:
+        if max(text) > '\x7f':
+            return None
+
+        is_ignore_case = text.lower() != text.upper()
+        text = text.lower()
+
+    if flags & Flags.UTF8:
+        text = text.encode('utf-8', 'surrogatepass')
+    elif flags & Flags.BYTES:
+        if max(text) > '\xff':
+            return None
+
+        text = text.encode('latin-1')
+
+    return Literal(
+        text=text,
+        is_start=is_start,
+        is_end=is_end,
+        is_ignore_case=is_ignore_case)
@@ -9,7 +9,9 @@ Tools for creating the NFA states
 import copy
 from typing import (
     Iterator,
-    Tuple)
+    Sequence,
+    Tuple,
+    Union)
 
 from ..shared.nodes import (
     Node,
@@ -18,35 +20,43 @@ from ..shared.nodes import (
     RepetitionRangeNode,
     OpNode,
     SkipNode,
-    AssertionNode)
+    AssertionNode,
+    StartNode,
+    EndNode)
 from ..shared import Symbols
 
 
-__all__ = ['nfa']
+__all__ = [
+    'nfa',
+    'literals',
+    'anchors',
+    'lengths',
+    'all_states']
 
 
-def _dup(state: Node, visited: set) -> Node:
+def _dup(state: Node, visited: dict) -> Node:
     """
     Recursively shallow copy state and its connected states
 
     Return the copy of the given state (root)
 
     :param state: the root or state to copy
-    :param visited: a record of states to avoid cycles
+    :param visited: the copy of every state\
+    copied so far, to avoid cycles and\
+    to keep shared states shared
     :return: shallow copy of the root state
     :private:
     """
     assert isinstance(state, Node)
 
     if state in visited:
-        return state
-
-    visited.add(state)
+        return visited[state]
 
     if state is EOF:
         return EOF
 
     state_copy = copy.copy(state)
+    visited[state] = state_copy
 
     state_copy.out = [
         _dup(s, visited)
@@ -56,7 +66,7 @@ def _dup(state: Node, visited: set) -> Node:
 
 
 def dup(state: Node) -> Node:
-    return _dup(state=state, visited=set())
+    return _dup(state=state, visited={})
 
 
 def rep_range_fixed(node, state):
@@ -269,3 +279,262 @@ def nfa(nodes: Iterator[Node]) -> Node:
     assert len(states) == 1
 
     return states[0]
+
+
+def _is_plain(state: Node) -> bool:
+    return type(state) is CharNode and isinstance(state.char, (str, int))
+
+
+def literals(state: Node) -> None:
+    """
+    Find the runs of chars in sequence\
+    (i.e: ``abc``) and set them on the\
+    first char of every run. The run is\
+    matched in one step (see ``CharNode``).\
+    The states are not replaced, so the\
+    NFA can still be matched char by char
+
+    Chars within a run are reached\
+    from the previous one only
+
+    :param state: the NFA first state
+    :private:
+    """
+    states = [state]
+    seen = {state}
+    # The first state is
+    # entered at the start
+    prev = {state: None}
+
+    for s in states:
+        for out in s.out:
+            prev[out] = s if out not in prev else None
+
+            if out not in seen:
+                seen.add(out)
+                states.append(out)
+
+    def is_inner(s: Node) -> bool:
+        p = prev.get(s)
+        return (
+            p is not None and
+            _is_plain(s) and
+            _is_plain(p) and
+            len(p.out) == 1 and
+            p.is_captured == s.is_captured)
+
+    for s in states:
+        if not _is_plain(s) or is_inner(s):
+            continue
+
+        run = [s]
+
+        while is_inner(run[-1].out[0]) and run[-1].out[0] is not s:
+            run.append(run[-1].out[0])
+
+        if len(run) < 2:
+            continue
+
+        chars = [r.char for r in run]
+        s.literal = (
+            bytes(chars)
+            if isinstance(s.char, int)
+            else ''.join(chars))
+        s.literal_last = run[-1]
+
+
+def _is_start_anchored(state: Node, visited: set) -> bool:
+    if state in visited:
+        return True
+
+    visited.add(state)
+
+    if isinstance(state, StartNode) and not state.is_multiline:
+        return True
+
+    if state is EOF or isinstance(state, CharNode):
+        return False
+
+    return all(_is_start_anchored(s, visited) for s in state.out)
+
+
+def _is_end_anchored(state: Node) -> bool:
+    """
+    Check every state reaching EOF\
+    goes through an end assertion\
+    after the last char
+
+    :private:
+    """
+    prev = {}
+    pending = [state]
+    seen = {state}
+
+    while pending:
+        s = pending.pop()
+
+        for out in s.out:
+            prev.setdefault(out, []).append(s)
+
+            if out not in seen:
+                seen.add(out)
+                pending.append(out)
+
+    if EOF not in prev:
+        return False
+
+    pending = [EOF]
+    seen = {EOF}
+
+    while pending:
+        s = pending.pop()
+
+        if s is state:
+            return False
+
+        for p in prev.get(s, ()):
+            if ((isinstance(p, EndNode) and not p.is_multiline) or
+                    p in seen):
+                continue
+
+            if isinstance(p, CharNode):
+                return False
+
+            seen.add(p)
+            pending.append(p)
+
+    return True
+
+
+def anchors(state: Node) -> Tuple[bool, bool]:
+    """
+    Check whether all matches start\
+    at the start of the text (i.e: ``^a|^b``)\
+    and whether they all end at the end\
+    of the text (i.e: ``a$``). The ``^``\
+    and ``$`` of multi-line mode don't anchor
+
+    :param state: the NFA first state
+    :return: whether the NFA is anchored\
+    to the start and to the end
+    :private:
+    """
+    return (
+        _is_start_anchored(state, visited=set()),
+        _is_end_anchored(state))
+
+
+LengthsType = Tuple[int, Union[int, None]]
+
+
+def _join(a: LengthsType, b: LengthsType) -> LengthsType:
+    if a[1] is None or b[1] is None:
+        return a[0] + b[0], None
+
+    return a[0] + b[0], a[1] + b[1]
+
+
+def _either(a: LengthsType, b: LengthsType) -> LengthsType:
+    if a[1] is None or b[1] is None:
+        return min(a[0], b[0]), None
+
+    return min(a[0], b[0]), max(a[1], b[1])
+
+
+def lengths(nodes: Sequence[Node]) -> LengthsType:
+    """
+    Return the min and max number of\
+    chars a match may span. Same as ``nfa``\
+    but it adds up the lengths\
+    instead of connecting the states
+
+    :param nodes: the nodes in RPN
+    :return: the min and max length,\
+    the max is ``None`` if there is no max
+    :private:
+    """
+    if not nodes:
+        return 0, 0
+
+    stack = []
+
+    for node in nodes:
+        if isinstance(node, CharNode):
+            stack.append((1, 1))
+            continue
+
+        if isinstance(node, AssertionNode):
+            stack.append((0, 0))
+            continue
+
+        if node.char == Symbols.JOINER:
+            lengths_b = stack.pop()
+            lengths_a = stack.pop()
+            stack.append(_join(lengths_a, lengths_b))
+            continue
+
+        if node.char == Symbols.OR:
+            lengths_b = stack.pop()
+            lengths_a = stack.pop()
+            stack.append(_either(lengths_a, lengths_b))
+            continue
+
+        if node.char in (
+                Symbols.ZERO_OR_MORE,
+                Symbols.ONE_OR_MORE,
+                Symbols.ZERO_OR_ONE):
+            min_length, max_length = stack.pop()
+
+            if node.char != Symbols.ONE_OR_MORE:
+                min_length = 0
+
+            if node.char != Symbols.ZERO_OR_ONE and max_length != 0:
+                max_length = None
+
+            stack.append((min_length, max_length))
+            continue
+
+        if node.char in (Symbols.GROUP_START, Symbols.GROUP_END):
+            continue
+
+        if node.char == Symbols.REPETITION_RANGE:
+            min_length, max_length = stack.pop()
+            min_length *= node.start
+
+            if node.end is None:
+                max_length = 0 if max_length == 0 else None
+            elif max_length is not None:
+                max_length *= node.end
+
+            stack.append((min_length, max_length))
+            continue
+
+        assert False, 'Unhandled node: %s' % repr(node)
+
+    assert len(stack) == 1
+
+    return stack[0]
+
+
+def all_states(state: Node) -> list:
+    """
+    Return all the states reachable\
+    from the given one, in a stable order
+
+    :param state: the first state of the NFA
+    :return: the states
+    :private:
+    """
+    states = [state]
+    seen = {state}
+    i = 0
+
+    while i < len(states):
+        for s in states[i].out:
+            if s not in seen:
+                seen.add(s)
+                states.append(s)
+
+        i += 1
+
+    return states
@@ -6,6 +6,7 @@ Tools to parse a regular expression into nodes
 :private:
 """
 
+import itertools
 from typing import (
     Iterator,
     List,
@@ -209,27 +210,100 @@ def parse_group_tag(
             is_capturing=False)
 
         lookahead = LOOKAHEAD_ASSERTIONS[char]
+        is_negative = char == '!'
         char, nxt = next(expression)
+        assert char != ')'
 
+        # A single char or shorthand is
+        # peeked, anything else (i.e: ``.``,
+        # ``\b``) is matched by a NFA
         if char == '\\':
-            char, nxt = next(expression)
-            assert nxt == ')'
-            yield lookahead(node=SHORTHANDS.get(char, nodes.CharNode)(char=char))
+            escaped, nxt = next(expression)
+
+            if nxt == ')' and escaped not in ASSERTIONS:
+                yield lookahead(
+                    node=SHORTHANDS.get(escaped, nodes.CharNode)(char=escaped))
+                return
+
+            char += escaped
+        elif nxt == ')' and char not in SPECIAL_CHARS:
+            yield lookahead(node=nodes.CharNode(char=char))
             return
 
-        assert nxt == ')'
-        yield lookahead(node=nodes.CharNode(char=char))
+        yield nodes.LookaheadNFANode(
+            expression=parse_sub_expression(char, nxt, expression),
+            is_negative=is_negative)
         return
 
     assert False, 'unhandled group tag'
 
 
+def parse_sub_expression(
+        chars: str,
+        next_char: str,
+        expression: Iterator[Tuple[str, str]]) -> str:
+    """
+    Return the sub-expression of a\
+    lookahead, up to the closing\
+    parenthesis. The parenthesis\
+    is not consumed
+
+    :param chars: the chars read so far
+    :param next_char: the char after them
+    :param expression: expression iterator
+    :return: the sub-expression
+    :private:
+    """
+    sub_expression = []
+    depth = 0
+    set_size = None  # Chars within the current set, if any
+    is_escaped = False
+
+    for char, next_char in itertools.chain(
+            zip(chars, list(chars[1:]) + [next_char]), expression):
+        sub_expression.append(char)
+
+        if is_escaped:
+            is_escaped = False
+
+            if set_size is not None:
+                set_size += 1
+        elif char == '\\':
+            is_escaped = True
+        elif set_size is not None:
+            if char == ']' and set_size:
+                set_size = None
+            elif not (char == '^' and
+                      set_size == 0 and
+                      sub_expression[-2] == '['):
+                set_size += 1
+        elif char == '[':
+            set_size = 0
+        elif char == Symbols.GROUP_START:
+            depth += 1
+        elif char == Symbols.GROUP_END:
+            depth -= 1
+
+        if (next_char == Symbols.GROUP_END and
+                depth == 0 and
+                set_size is None and
+                not is_escaped):
+            return ''.join(sub_expression)
+
+    assert False, 'Unclosed lookahead'
+
+
 SUB_PARSERS = {
     '[': parse_set,
     '{': parse_repetition_range,
     Symbols.GROUP_START: parse_group_tag}
 
 
+# Chars that don't match themselves
+SPECIAL_CHARS = frozenset(
+    set(SYMBOLS) | set(SUB_PARSERS)) - {Symbols.JOINER}
+
+
 def _peek(iterator, eof=None):
     """
     Return an iterator
@@ -0,0 +1,726 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tools for storing compiled regular\
+expressions, so they don't have\
+to be compiled again
+
+The NFA is stored as a table\
+of states, along with the alphabet\
+and the DFAs, if any. The generated\
+matcher is generated again out of the\
+DFAs when loaded. The format is\
+versioned, data stored by a different\
+version of the library is rejected.\
+The data is stored along with its\
+checksum, corrupted data is rejected
+
+DFA tables may be stored on their own\
+and mapped, so processes share them
+
+:public:
+"""
+
+import os
+import io
+import sys
+import mmap
+import array
+import struct
+import pickle
+import hashlib
+import tempfile
+from typing import (
+    BinaryIO,
+    Union)
+
+from ..shared.nodes import (
+    Node,
+    EOF,
+    LookaheadNFANode)
+from .compile import (
+    NFA,
+    to_nfa)
+from .nfa import (
+    literals,
+    all_states)
+from . import codegen
+from .dfa import (
+    DFA,
+    DFAs,
+    START,
+    MAX_STATES,
+    _to_array)
+from .alphabet import (
+    Alphabet,
+    ASCII_SIZE)
+from .literal import Literal
+
+
+__all__ = [
+    'dumps',
+    'loads',
+    'dump',
+    'load',
+    'compile_cached',
+    'map_dfa']
+
+
+MAGIC = b'REGEXY\x00'
+FORMAT_VERSION = 7
+
+# Magic, format version and
+# sha256 of the payload
+_HEADER = struct.Struct('<%dsH32s' % len(MAGIC))
+
+TABLES_MAGIC = b'REGEXYT\x00'
+
+# Header and key of the tables file
+_TABLES_HEADER = struct.Struct('<%dsH32s' % len(TABLES_MAGIC))
+# Typecode, classes and states of a table
+_TABLE = struct.Struct('<cII')
+_TYPECODES = frozenset('BHI')
+_ALIGNMENT = 8
+
+# Globals the stored data may refer to.
+# Names are matched exactly, dotted names
+# would reach the attributes of the globals
+_NODES = frozenset((
+    'CharNode',
+    'OpNode',
+    'GroupNode',
+    'StartNode',
+    'EndNode',
+    'WordBoundaryNode',
+    'NotWordBoundaryNode',
+    'LookaheadNode',
+    'NotLookaheadNode',
+    'LookaheadNFANode',
+    'ShorthandNode',
+    'AlphaNumNode',
+    'DigitNode',
+    'WhiteSpaceNode',
+    'NotWhiteSpaceNode',
+    'NotAlphaNumNode',
+    'NotDigitNode',
+    'AnyNode',
+    'SetNode',
+    'NotSetNode',
+    'SkipNode'))
+_GLOBALS = frozenset(
+    [('regexy.shared.nodes', name) for name in _NODES] +
+    [('regexy.shared.nodes', name) for name in (
+        'BytesMatcher',
+        'CharMatcher',
+        'SetMatcher',
+        'NotSetMatcher',
+        '_is_alnum',
+        '_is_not_alnum',
+        '_is_digit',
+        '_is_not_digit',
+        '_is_white_space',
+        '_is_not_white_space',
+        '_is_not_new_line')] +
+    [
+        ('regexy.compile.alphabet', 'Alphabet'),
+        ('regexy.compile.literal', 'Literal'),
+        ('regexy.compile.dfa', 'DFA'),
+        ('regexy.compile.dfa', 'DFAs'),
+        ('builtins', 'frozenset'),
+        ('builtins', 'set'),
+        ('array', 'array'),
+        ('array', '_array_reconstructor')])
+
+
+def _version() -> str:
+    # The package is not fully
+    # imported when this is
+    from .. import __version__
+    return __version__
+
+
+def _to_table(state: Node) -> list:
+    """
+    Turn the NFA states into a table\
+    of the class, attributes and next\
+    states (by index) of every state.\
+    The EOF state is ``None``. The runs\
+    of chars are not stored, they are\
+    found again when loaded. The NFA of\
+    a lookahead is stored as a table
+
+    :private:
+    """
+    states = all_states(state)
+    indexes = {s: i for i, s in enumerate(states)}
+    table = []
+
+    for s in states:
+        if s is EOF:
+            table.append(None)
+            continue
+
+        attrs = dict(vars(s))
+        del attrs['out']
+        attrs.pop('literal', None)
+        attrs.pop('literal_last', None)
+
+        if isinstance(s, LookaheadNFANode):
+            attrs['state'] = _to_table(attrs['state'])
+
+        table.append((
+            type(s),
+            attrs,
+            [indexes[out] for out in s.out]))
+
+    return table
+
+
+def _from_table(table: list) -> Node:
+    """
+    Build the NFA states back from a table.\
+    See ``_to_table``
+
+    :private:
+    """
+    states = []
+
+    for row in table:
+        if row is None:
+            states.append(EOF)
+            continue
+
+        cls, attrs, _out = row
+
+        if issubclass(cls, LookaheadNFANode):
+            attrs = dict(attrs, state=_from_table(attrs['state']))
+
+        state = cls.__new__(cls)
+        vars(state).update(attrs)
+        states.append(state)
+
+    for state, row in zip(states, table):
+        if row is not None:
+            state.out = [states[i] for i in row[2]]
+
+    literals(states[0])
+    return states[0]
+
+
+class _Unpickler(pickle.Unpickler):
+
+    def find_class(self, module: str, name: str):
+        if '.' in name or (module, name) not in _GLOBALS:
+            raise pickle.UnpicklingError(
+                '%s.%s is not allowed' % (module, name))
+
+        return super().find_class(module, name)
+
+
+def _check_table(table: list) -> None:
+    """
+    Check the table has the shape\
+    given by ``_to_table``
+
+    :raise ValueError: if it has not
+    :private:
+    """
+    if not isinstance(table, list) or not table:
+        raise ValueError('Corrupted stored regex')
+
+    for row in table:
+        if row is None:
+            continue
+
+        if not isinstance(row, tuple) or len(row) != 3:
+            raise ValueError('Corrupted stored regex')
+
+        cls, attrs, out = row
+
+        if (not isinstance(cls, type) or
+                not issubclass(cls, Node) or
+                not isinstance(attrs, dict) or
+                not all(isinstance(name, str) for name in attrs) or
+                not isinstance(out, list) or
+                not all(
+                    isinstance(i, int) and 0 <= i < len(table)
+                    for i in out)):
+            raise ValueError('Corrupted stored regex')
+
+        if issubclass(cls, LookaheadNFANode):
+            _check_table(attrs.get('state'))
+
+
+def _is_table(values, typecodes: str) -> bool:
+    return isinstance(values, array.array) and values.typecode in typecodes
+
+
+def _is_dfa(dfa, classes_count: int) -> bool:
+    return (
+        isinstance(dfa, DFA) and
+        _is_table(dfa.transitions, _TYPECODES) and
+        _is_table(dfa.accepts, 'B') and
+        dfa.classes_count == classes_count and
+        dfa.states_count > START and
+        len(dfa.transitions) == dfa.states_count * classes_count and
+        max(dfa.transitions, default=0) < dfa.states_count)
+
+
+def _check(
+        table: list,
+        groups_count: int,
+        named_groups: dict,
+        flags: int,
+        expression: Union[str, bytes],
+        alphabet: Union[Alphabet, None],
+        dfa: Union[DFAs, None],
+        is_codegen: bool,
+        literal: Union[Literal, None],
+        is_start_anchored: bool,
+        is_end_anchored: bool,
+        min_length: int,
+        max_length: Union[int, None]) -> None:
+    """
+    Check the loaded values have\
+    the types given by ``dumps``,\
+    so a NFA can be built out of them
+
+    :raise ValueError: if they have not
+    :private:
+    """
+    _check_table(table)
+
+    if (not isinstance(groups_count, int) or
+            not isinstance(named_groups, dict) or
+            not all(
+                isinstance(name, str) and
+                isinstance(index, int) and
+                0 <= index < groups_count
+                for name, index in named_groups.items()) or
+            not isinstance(flags, int) or
+            not isinstance(expression, (str, bytes)) or
+            not all(
+                isinstance(value, bool)
+                for value in (
+                    is_codegen,
+                    is_start_anchored,
+                    is_end_anchored)) or
+            not isinstance(min_length, int) or
+            not isinstance(max_length, (int, type(None)))):
+        raise ValueError('Corrupted stored regex')
+
+    if literal is not None and (
+            not isinstance(literal, Literal) or
+            not isinstance(literal.text, (str, bytes))):
+        raise ValueError('Corrupted stored regex')
+
+    if alphabet is not None and (
+            not isinstance(alphabet, Alphabet) or
+            not _is_table(alphabet.starts, 'I') or
+            not _is_table(alphabet.classes, 'I') or
+            not _is_table(alphabet.ascii, 'I') or
+            not isinstance(alphabet.chars, list) or
+            len(alphabet.starts) != len(alphabet.classes) or
+            len(alphabet.ascii) != ASCII_SIZE or
+            max(alphabet.classes, default=0) >= len(alphabet.chars) or
+            max(alphabet.ascii, default=0) >= len(alphabet.chars)):
+        raise ValueError('Corrupted stored regex')
+
+    if dfa is None:
+        if is_codegen:
+            raise ValueError('Corrupted stored regex')
+
+        return
+
+    if (alphabet is None or
+            not isinstance(dfa, DFAs) or
+            not isinstance(dfa.max_states, int) or
+            not all(_is_dfa(d, len(alphabet)) for d in dfa[:3])):
+        raise ValueError('Corrupted stored regex')
+
+
+def dumps(nfa: NFA) -> bytes:
+    """
+    Return the compiled regex as bytes.\
+    See ``loads``
+
+    :param nfa: a NFA
+    :return: the stored NFA
+    """
+    data = pickle.dumps(
+        (
+            _version(),
+            _to_table(nfa.state),
+            nfa.groups_count,
+            nfa.named_groups,
+            nfa.flags,
+            nfa.expression,
+            nfa.alphabet,
+            nfa.dfa,
+            nfa.matcher is not None,
+            nfa.literal,
+            nfa.is_start_anchored,
+            nfa.is_end_anchored,
+            nfa.min_length,
+            nfa.max_length),
+        protocol=4)
+    return _HEADER.pack(
+        MAGIC, FORMAT_VERSION, hashlib.sha256(data).digest()) + data
+
+
+def loads(data: bytes) -> NFA:
+    """
+    Return the compiled regex stored\
+    by ``dumps``. This does not compile\
+    the regex again
+
+    The data is checked against its\
+    checksum, and only a few types\
+    can be loaded. Still, the data\
+    should come from a trusted source
+
+    :param data: the stored NFA
+    :return: the NFA
+    :raise ValueError: if the data\
+    is not a stored NFA, it's corrupted\
+    or it was stored by another version\
+    of the library
+    """
+    if len(data) < _HEADER.size:
+        raise ValueError('Not a stored regex')
+
+    magic, format_version, checksum = _HEADER.unpack_from(data)
+
+    if magic != MAGIC:
+        raise ValueError('Not a stored regex')
+
+    if format_version != FORMAT_VERSION:
+        raise ValueError(
+            'Unsupported format version %d' % format_version)
+
+    data = data[_HEADER.size:]
+
+    if hashlib.sha256(data).digest() != checksum:
+        raise ValueError('Corrupted stored regex')
+
+    try:
+        values = _Unpickler(io.BytesIO(data)).load()
+    except Exception as err:
+        raise ValueError('Corrupted stored regex') from err
+
+    if not isinstance(values, tuple) or len(values) != 14:
+        raise ValueError('Corrupted stored regex')
+
+    if values[0] != _version():
+        raise ValueError(
+            'The regex was stored by version %s' % values[0])
+
+    _check(*values[1:])
+    (table,
+     groups_count,
+     named_groups,
+     flags,
+     expression,
+     alphabet,
+     dfa,
+     is_codegen,
+     literal,
+     is_start_anchored,
+     is_end_anchored,
+     min_length,
+     max_length) = values[1:]
+
+    try:
+        nfa = NFA(
+            state=_from_table(table),
+            groups_count=groups_count,
+            named_groups=named_groups,
+            flags=flags,
+            expression=expression,
+            alphabet=alphabet,
+            dfa=dfa,
+            matcher=None,
+            literal=literal,
+            is_start_anchored=is_start_anchored,
+            is_end_anchored=is_end_anchored,
+            min_length=min_length,
+            max_length=max_length)
+
+        if is_codegen:
+            nfa = nfa._replace(matcher=codegen.matcher(nfa))
+    except Exception as err:
+        raise ValueError('Corrupted stored regex') from err
+
+    return nfa
+
+
+def dump(nfa: NFA, file: BinaryIO) -> None:
+    """
+    Write the compiled regex to a binary file.\
+    See ``dumps``
+
+    :param nfa: a NFA
+    :param file: a file open for writing
+    """
+    file.write(dumps(nfa))
+
+
+def load(file: BinaryIO) -> NFA:
+    """
+    Read a compiled regex from a binary file.\
+    See ``loads``
+
+    :param file: a file open for reading
+    :return: the NFA
+    :raise ValueError: if the file\
+    does not contain a stored NFA
+    """
+    return loads(file.read())
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    """
+    Write the file, so other processes\
+    either see the whole file or\
+    the previous one
+
+    :private:
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path) or None, suffix='.tmp')
+
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _cache_path(
+        directory: str,
+        expression: Union[str, bytes],
+        flags: int,
+        dfa: str,
+        dfa_max_states: int) -> str:
+    key = repr((
+        expression,
+        flags,
+        dfa,
+        dfa_max_states,
+        FORMAT_VERSION,
+        _version()))
+    return os.path.join(
+        directory,
+        '%s.regexy' % hashlib.sha256(
+            key.encode('utf-8', 'surrogatepass')).hexdigest())
+
+
+def compile_cached(
+        expression: Union[str, bytes],
+        directory: str,
+        flags: int=0,
+        dfa: str=None,
+        dfa_max_states: int=MAX_STATES) -> NFA:
+    """
+    Same as ``to_nfa`` but the compiled\
+    regex is stored in a directory, and\
+    it's read from there the next time.\
+    Files are keyed by the expression,\
+    the compiling parameters and the\
+    version of the library
+
+    Files are written atomically, so\
+    many processes may share the directory.\
+    Unreadable files are replaced
+
+    :param expression: regex expression
+    :param directory: cache directory,\
+    it's created if it does not exist
+    :param flags: compiling flags (see ``Flags``)
+    :param dfa: see ``to_nfa``
+    :param dfa_max_states: see ``to_nfa``
+    :return: NFA for the given expression
+    """
+    path = _cache_path(directory, expression, flags, dfa, dfa_max_states)
+
+    try:
+        with open(path, 'rb') as file:
+            nfa = load(file)
+    except Exception:
+        pass
+    else:
+        if nfa.expression == expression:
+            return nfa
+
+    nfa = to_nfa(expression, flags, dfa, dfa_max_states)
+    os.makedirs(directory, exist_ok=True)
+    _write_atomic(path, dumps(nfa))
+    return nfa
+
+
+def _tables_key(nfa: NFA) -> bytes:
+    return hashlib.sha256(repr((
+        nfa.expression,
+        nfa.flags,
+        nfa.dfa.max_states,
+        FORMAT_VERSION,
+        _version(),
+        sys.byteorder)).encode('utf-8', 'surrogatepass')).digest()
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def _dump_tables(nfa: NFA) -> bytes:
+    """
+    Return the DFA tables of the NFA.\
+    Every table is aligned, so it can\
+    be used in place once mapped
+
+    :private:
+    """
+    data = bytearray(_TABLES_HEADER.pack(
+        TABLES_MAGIC, FORMAT_VERSION, _tables_key(nfa)))
+
+    for dfa in nfa.dfa[:3]:
+        transitions = _to_array(dfa.transitions)
+        data.extend(b'\x00' * (_aligned(len(data)) - len(data)))
+        data.extend(_TABLE.pack(
+            transitions.typecode.encode('ascii'),
+            dfa.classes_count,
+            dfa.states_count))
+
+        for values in (transitions, _to_array(dfa.accepts)):
+            data.extend(b'\x00' * (_aligned(len(data)) - len(data)))
+            data.extend(values.tobytes())
+
+    return bytes(data)
+
+
+def _mapped_dfas(nfa: NFA, view: memoryview, views: list) -> DFAs:
+    """
+    Return the DFAs over the mapped\
+    memory. Every view of the tables\
+    is added to the given ones
+
+    :raise ValueError: if the file does not\
+    contain the tables of the NFA
+    :private:
+    """
+    if len(view) < _TABLES_HEADER.size:
+        raise ValueError('Not a DFA tables file')
+
+    magic, format_version, key = _TABLES_HEADER.unpack_from(view)
+
+    if (magic != TABLES_MAGIC or
+            format_version != FORMAT_VERSION or
+            key != _tables_key(nfa)):
+        raise ValueError('The file has the tables of another regex')
+
+    dfas = []
+    offset = _TABLES_HEADER.size
+
+    for _ in range(3):
+        offset = _aligned(offset)
+
+        if offset + _TABLE.size > len(view):
+            raise ValueError('Truncated DFA tables file')
+
+        typecode, classes_count, states_count = _TABLE.unpack_from(
+            view, offset)
+        typecode = typecode.decode('ascii')
+
+        if typecode not in _TYPECODES:
+            raise ValueError('Corrupted DFA tables file')
+
+        offset += _TABLE.size
+        tables = []
+
+        for count, table_typecode in (
+                (states_count * classes_count, typecode),
+                (states_count, 'B')):
+            offset = _aligned(offset)
+            size = count * array.array(table_typecode).itemsize
+
+            if offset + size > len(view):
+                raise ValueError('Truncated DFA tables file')
+
+            views.append(view[offset:offset + size].cast(table_typecode))
+            tables.append(views[-1])
+            offset += size
+
+        dfas.append(DFA(
+            transitions=tables[0],
+            accepts=tables[1],
+            classes_count=classes_count))
+
+    return DFAs(*dfas, max_states=nfa.dfa.max_states)
+
+
+def _map_tables(nfa: NFA, path: str) -> DFAs:
+    """
+    Map the file of DFA tables and return\
+    the DFAs over the mapped memory.\
+    The file is unmapped if it does\
+    not contain the tables, so it\
+    can be replaced right away
+
+    :raise ValueError: if the file does not\
+    contain the tables of the NFA
+    :private:
+    """
+    with open(path, 'rb') as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    views = [memoryview(mapped)]
+
+    try:
+        return _mapped_dfas(nfa, views[0], views)
+    except ValueError:
+        # The map can't be closed
+        # while there are views of it
+        for view in reversed(views):
+            view.release()
+
+        mapped.close()
+        raise
+
+
+def map_dfa(nfa: NFA, path: str) -> NFA:
+    """
+    Share the DFA tables of the regex\
+    between processes. The tables are written\
+    to a file, which is then mapped in\
+    read-only mode, so every process\
+    mapping the file uses the same memory
+
+    The file is written once (atomically),\
+    processes calling this afterwards\
+    only map it. A file containing the\
+    tables of another regex or version\
+    of the library is replaced
+
+    Call this in every worker, or\
+    before forking them
+
+    :param nfa: a NFA compiled with\
+    ``dfa='full'`` (see ``to_nfa``)
+    :param path: path of the tables file
+    :return: the NFA using the mapped tables
+    :raise ValueError: if the NFA has no DFAs
+    """
+    if nfa.dfa is None:
+        raise ValueError(
+            'The regex must be compiled with dfa=\'full\'')
+
+    try:
+        return nfa._replace(dfa=_map_tables(nfa, path))
+    except (OSError, ValueError):
+        pass
+
+    _write_atomic(path, _dump_tables(nfa))
+    return nfa._replace(dfa=_map_tables(nfa, path))
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tools for converting char nodes\
+into automata matching UTF-8 encoded bytes
+
+Every char class becomes a set\
+of byte sequences. The sequences are\
+put into a trie where sibling branches\
+with the same sub-trie are merged,\
+so matching a char takes one step\
+per byte, with few alternatives on each one
+
+:private:
+"""
+
+from typing import (
+    Iterator,
+    List,
+    Tuple,
+    Dict)
+
+from ..shared.nodes import (
+    Node,
+    CharNode,
+    OpNode,
+    BytesMatcher)
+from ..shared import Symbols
+
+
+__all__ = ['utf8']
+
+
+RangesType = List[Tuple[int, int]]
+SequenceType = Tuple[Tuple[int, int], ...]
+
+# Last code point of every UTF-8 encoding length
+_MAX_CODE_POINTS = (0x7f, 0x7ff, 0xffff)
+
+
+def sequences(start: int, end: int) -> Iterator[SequenceType]:
+    """
+    Split a range of code points into\
+    sequences of byte ranges. The UTF-8\
+    encoding of every code point in a\
+    sequence has one byte in each byte range\
+    of it, and the other way around
+
+    The range must not contain surrogates
+
+    :param start: first code point
+    :param end: last code point
+    :return: sequences of byte ranges
+    :private:
+    """
+    for max_code_point in _MAX_CODE_POINTS:
+        if start <= max_code_point < end:
+            yield from sequences(start, max_code_point)
+            yield from sequences(max_code_point + 1, end)
+            return
+
+    if end <= 0x7f:
+        yield ((start, end),)
+        return
+
+    length = len(chr(start).encode('utf-8'))
+
+    for i in range(1, length):
+        mask = (1 << (6 * i)) - 1
+
+        if start & ~mask == end & ~mask:
+            continue
+
+        if start & mask:
+            yield from sequences(start, start | mask)
+            yield from sequences((start | mask) + 1, end)
+            return
+
+        if end & mask != mask:
+            yield from sequences(start, (end & ~mask) - 1)
+            yield from sequences(end & ~mask, end)
+            return
+
+    yield tuple(zip(
+        chr(start).encode('utf-8'),
+        chr(end).encode('utf-8')))
+
+
+TrieType = Dict[Tuple[int, int], 'TrieType']
+
+
+def _trie(ranges: RangesType) -> TrieType:
+    trie = {}
+
+    for start, end in ranges:
+        for sequence in sequences(start, end):
+            curr = trie
+
+            for byte_range in sequence:
+                curr = curr.setdefault(byte_range, {})
+
+    return trie
+
+
+def _key(trie: TrieType) -> tuple:
+    return tuple(sorted(
+        (byte_range, _key(sub_trie))
+        for byte_range, sub_trie in trie.items()))
+
+
+def _byte_node(byte_ranges: List[Tuple[int, int]], is_captured: bool) -> CharNode:
+    byte_ranges.sort()
+
+    if len(byte_ranges) == 1 and byte_ranges[0][0] == byte_ranges[0][1]:
+        return CharNode(char=byte_ranges[0][0], is_captured=is_captured)
+
+    return CharNode(
+        char=BytesMatcher(
+            char='[%s]' % ''.join(
+                '\\x%02x' % start
+                if start == end
+                else '\\x%02x-\\x%02x' % (start, end)
+                for start, end in byte_ranges),
+            values=(
+                b
+                for start, end in byte_ranges
+                for b in range(start, end + 1))),
+        is_captured=is_captured)
+
+
+def _trie_to_rpn(trie: TrieType, is_captured: bool) -> Iterator[Node]:
+    """
+    Convert the trie into nodes in RPN.\
+    Branches with the same sub-trie\
+    are merged into a single byte node
+
+    :private:
+    """
+    branches = {}
+
+    for byte_range, sub_trie in trie.items():
+        branches.setdefault(_key(sub_trie), (sub_trie, []))[1].append(
+            byte_range)
+
+    for i, (sub_trie, byte_ranges) in enumerate(branches.values()):
+        yield _byte_node(byte_ranges, is_captured)
+
+        if sub_trie:
+            yield from _trie_to_rpn(sub_trie, is_captured)
+            yield OpNode(char=Symbols.JOINER)
+
+        if i:
+            yield OpNode(char=Symbols.OR)
+
+
+def _code_point_ranges(node: CharNode) -> RangesType:
+    if isinstance(node.char, str):
+        return [(ord(node.char), ord(node.char))]
+
+    return node.char.code_point_ranges()
+
+
+def utf8(nodes: Iterator[Node]) -> Iterator[Node]:
+    """
+    Convert nodes in RPN to match UTF-8\
+    encoded bytes. Char nodes are expanded\
+    into sub-expressions matching the byte\
+    sequences of every char they match
+
+    Other nodes are converted in place,\
+    the assertions are limited to ASCII chars
+
+    :param nodes: nodes in RPN
+    :return: nodes in RPN
+    :raise ValueError: if a char class matches nothing
+    :private:
+    """
+    for node in nodes:
+        if not isinstance(node, CharNode):
+            node.to_utf8()
+            yield node
+            continue
+
+        trie = _trie(_code_point_ranges(node))
+
+        if not trie:
+            raise ValueError(
+                'Char class %r matches nothing' % node.char)
+
+        yield from _trie_to_rpn(trie, node.is_captured)
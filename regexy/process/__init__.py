@@ -4,10 +4,46 @@
 This module contains all the tools of regex matching
 """
 
-from .match import match, full_match, search
+from .match import (
+    match,
+    full_match,
+    search,
+    finditer,
+    count)
+from .replace import sub
+from .split import split
+from .file import (
+    search_file,
+    finditer_file,
+    count_file)
+from .lines import search_lines
+from .batch import (
+    match_many,
+    search_many)
+from .vectorized import (
+    match_mask,
+    full_match_mask,
+    search_mask,
+    match_ends,
+    extract_many)
 
 
 __all__ = [
     'match',
     'full_match',
-    'search']
+    'search',
+    'finditer',
+    'count',
+    'sub',
+    'split',
+    'search_file',
+    'finditer_file',
+    'count_file',
+    'search_lines',
+    'match_many',
+    'search_many',
+    'match_mask',
+    'full_match_mask',
+    'search_mask',
+    'match_ends',
+    'extract_many']
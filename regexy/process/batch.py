@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+"""
+Matching for regular expressions\
+over many texts at once
+
+:private:
+"""
+
+import itertools
+import functools
+import concurrent.futures
+from typing import (
+    Iterable,
+    Iterator,
+    List,
+    Union)
+
+from ..compile.compile import NFA
+from .match import (
+    Match,
+    NFAType,
+    _Setup,
+    _nfa,
+    _match,
+    _search,
+    _to_match)
+
+
+__all__ = [
+    'match_many',
+    'search_many']
+
+
+TextsType = Iterable[Union[str, bytes]]
+
+
+def _find_many(
+        nfa: NFA,
+        texts: TextsType,
+        is_anchored: bool) -> Iterator[Union[Match, None]]:
+    """
+    Find the first match of every text,\
+    with the same engine ``match`` and\
+    ``search`` use. The setup of the\
+    NFA search is done once and reused\
+    for every text
+
+    :private:
+    """
+    find = _match if is_anchored else _search
+    setup = _Setup(nfa)
+
+    for text in texts:
+        found = find(nfa, text, setup=setup)
+
+        if found is None:
+            yield None
+            continue
+
+        yield _to_match(nfa, found)
+
+
+def _find_chunk(
+        nfa: NFA,
+        is_anchored: bool,
+        texts: List[Union[str, bytes]]) -> List[Union[Match, None]]:
+    return list(_find_many(nfa, texts, is_anchored))
+
+
+def _find_many_parallel(
+        nfa: NFA,
+        texts: TextsType,
+        is_anchored: bool,
+        processes: int,
+        chunksize: int) -> Iterator[Union[Match, None]]:
+    """
+    Find the first match of every text\
+    in a pool of processes. Every process\
+    gets the texts in chunks
+
+    :private:
+    """
+    texts = iter(texts)
+    chunks = iter(
+        lambda: list(itertools.islice(texts, chunksize)), [])
+
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=processes) as executor:
+        for results in executor.map(
+                functools.partial(_find_chunk, nfa, is_anchored),
+                chunks):
+            yield from results
+
+
+def match_many(
+        nfa: NFAType,
+        texts: TextsType,
+        processes: int=1,
+        chunksize: int=64) -> Iterator[Union[Match, None]]:
+    """
+    Match every text. Results are\
+    yielded in the same order as the texts.\
+    See ``search_many``
+
+    :param nfa: a NFA or an expression
+    :param texts: texts to match
+    :param processes: number of processes to use
+    :param chunksize: number of texts\
+    sent to a process at once
+    :return: an iterator of matches or ``None``
+    """
+    nfa = _nfa(nfa)
+
+    if processes <= 1:
+        return _find_many(nfa, texts, is_anchored=True)
+
+    return _find_many_parallel(
+        nfa, texts, True, processes, chunksize)
+
+
+def search_many(
+        nfa: NFAType,
+        texts: TextsType,
+        processes: int=1,
+        chunksize: int=64) -> Iterator[Union[Match, None]]:
+    """
+    Search every text. Results are\
+    yielded in the same order as the texts
+
+    The same engine as ``search`` is used,\
+    the setup of the search\
+    is done once and reused for all of them
+
+    With more than one process, the texts\
+    are searched in a pool of processes.\
+    They are sent to the processes in chunks,\
+    along with the NFA. The NFA is loaded\
+    once per process, it's not compiled\
+    again. Texts and matches must be\
+    picklable, so streams are not supported
+
+    :param nfa: a NFA or an expression
+    :param texts: texts to search
+    :param processes: number of processes to use
+    :param chunksize: number of texts\
+    sent to a process at once
+    :return: an iterator of matches or ``None``
+    """
+    nfa = _nfa(nfa)
+
+    if processes <= 1:
+        return _find_many(nfa, texts, is_anchored=False)
+
+    return _find_many_parallel(
+        nfa, texts, False, processes, chunksize)
@@ -10,6 +10,7 @@ and friends
 
 import collections
 from typing import (
+    Iterator,
     Union,
     Tuple,
     Optional)
@@ -20,14 +21,16 @@ from ..shared import Symbols
 __all__ = [
     'Capture',
     'capture',
-    'matched']
+    'matched',
+    'spans']
 
 
 Capture = collections.namedtuple('Capture', (
     'char',
     'prev',
     'index',
-    'is_repeated'))
+    'is_repeated',
+    'pos'))
 Capture.__doc__ = """
     This contains a capture (node)\
     that stores the matched character.\
@@ -50,6 +53,8 @@ Capture.__doc__ = """
     :ivar int index: group index
     :ivar bool is_repeated: whether the group\
     is repeated (i.e: has ``*``, ``+``, etc) or not
+    :ivar int pos: position of the group start/end\
+    or ``None`` if it's the match start
     :private:
 """
 
@@ -58,7 +63,8 @@ def capture(
         char: str,
         prev: Capture,
         index: int=None,
-        is_repeated: bool=False) -> Capture:
+        is_repeated: bool=False,
+        pos: int=None) -> Capture:
     """
     Build a Capture with some optional params
 
@@ -68,15 +74,26 @@ def capture(
         char=char,
         prev=prev,
         index=index,
-        is_repeated=is_repeated)
+        is_repeated=is_repeated,
+        pos=pos)
 
 
-def _join_reversed(group: list) -> Union[str, Tuple[str]]:
+def _join(chars: Iterator[Union[str, int]], is_bytes: bool) -> Union[str, bytes]:
+    if is_bytes:
+        return bytes(chars)
+
+    return ''.join(chars)
+
+
+def _join_reversed(
+        group: list,
+        is_bytes: bool=False) -> Union[str, bytes, Tuple[str]]:
     """
     Reverse-join every match and sub-match
 
     :param group: a char list of matches\
     and sub-matches
+    :param is_bytes: whether the chars are bytes (ints)
     :return: matched groups as strings\
     or tuple of strings
     :private:
@@ -84,20 +101,23 @@ def _join_reversed(group: list) -> Union[str, Tuple[str]]:
     assert isinstance(group, list)
 
     if not group:
-        return ''
+        return _join((), is_bytes)
 
-    if isinstance(group[0], str):
-        return ''.join(reversed(group))
+    if not isinstance(group[0], list):
+        return _join(reversed(group), is_bytes)
 
     return tuple(
-        ''.join(reversed(sub_match))
+        _join(reversed(sub_match), is_bytes)
         for sub_match in reversed(group))
 
 
 MatchedType = Tuple[Union[str, Tuple[str], None]]
 
 
-def matched(captured: Optional[Capture], groups_count: int) -> MatchedType:
+def matched(
+        captured: Optional[Capture],
+        groups_count: int,
+        is_bytes: bool=False) -> MatchedType:
     """
     Construct the matched strings transversing\
     given a captured structure
@@ -112,6 +132,7 @@ def matched(captured: Optional[Capture], groups_count: int) -> MatchedType:
 
     :param captured: The last capture or None
     :param groups_count: number of groups
+    :param is_bytes: whether the chars are bytes (ints)
     :return: matched strings
     :private:
     """
@@ -144,7 +165,48 @@ def matched(captured: Optional[Capture], groups_count: int) -> MatchedType:
     assert not curr_groups
 
     return tuple(
-        _join_reversed(match[g])
+        _join_reversed(match[g], is_bytes)
         if g in match
         else None
         for g in range(groups_count))
+
+
+SpansType = Tuple[Tuple[int, int], ...]
+
+
+def spans(
+        captured: Optional[Capture],
+        groups_count: int,
+        start: int) -> SpansType:
+    """
+    Return the start and end of every group,\
+    same as ``matched`` does for the strings.\
+    Repeating sub-matches are the last\
+    repetition, same as Python's ``re``
+
+    :param captured: The last capture or None
+    :param groups_count: number of groups
+    :param start: the match start
+    :return: start and end of every group\
+    or ``(-1, -1)`` if it did not match
+    :private:
+    """
+    starts = {}
+    ends = {}
+
+    while captured:
+        if captured.char == Symbols.GROUP_END:
+            ends.setdefault(captured.index, captured.pos)
+        elif (captured.char == Symbols.GROUP_START and
+                captured.index in ends):
+            starts.setdefault(captured.index, captured.pos)
+
+        captured = captured.prev
+
+    return tuple(
+        (
+            start if starts[g] is None else starts[g],
+            start if ends[g] is None else ends[g])
+        if g in starts
+        else (-1, -1)
+        for g in range(groups_count))
@@ -0,0 +1,476 @@
+# -*- coding: utf-8 -*-
+
+"""
+Matching for regular expressions\
+over files. Files are memory-mapped
+
+:private:
+"""
+
+import os
+import mmap
+import contextlib
+import concurrent.futures
+from typing import (
+    Iterator,
+    Iterable,
+    Tuple,
+    List,
+    Union)
+
+from ..compile.compile import NFA
+from ..shared import Flags
+from .match import (
+    Match,
+    FoundType,
+    NFAType,
+    _nfa,
+    _finditer,
+    _finditer_literal,
+    _to_match)
+from .text import (
+    Text,
+    CHUNK_SIZE)
+
+
+__all__ = [
+    'FileMatch',
+    'search_file',
+    'finditer_file',
+    'count_file']
+
+
+PathType = Union[str, bytes]
+
+
+class FileMatch(Match):
+    """
+    A match found in a file. Offsets\
+    are byte offsets from the start of\
+    the file, the line number is the\
+    one where the match starts (1-based)
+
+    :public:
+    """
+
+    __slots__ = ('_line',)
+
+    def __init__(self, match: Match, line: int) -> None:
+        super().__init__(
+            captures=match._captures,
+            named_groups=match._named_groups,
+            span=match._span)
+        self._line = line
+
+    def line(self):
+        return self._line
+
+
+@contextlib.contextmanager
+def _mapped(path: PathType) -> Iterator[Union[mmap.mmap, bytes]]:
+    """
+    Memory-map a file for reading.\
+    An empty file can't be mapped,\
+    so it's an empty ``bytes`` instead
+
+    :private:
+    """
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            yield b''
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+
+def _count_lines(
+        data: Union[mmap.mmap, bytes],
+        start: int,
+        end: int) -> int:
+    """
+    Count the line breaks in between\
+    the given positions. This copies\
+    one bounded chunk at a time
+
+    :private:
+    """
+    count = 0
+
+    for pos in range(start, end, CHUNK_SIZE):
+        count += data[pos:min(pos + CHUNK_SIZE, end)].count(b'\n')
+
+    return count
+
+
+def _check_nfa(nfa: NFA) -> None:
+    if not nfa.flags & Flags.BYTES:
+        raise TypeError(
+            'Can\'t use a str regex on a file, '
+            'pass the BYTES or UTF8 flag')
+
+
+def _finditer_data(
+        nfa: NFA,
+        data: Union[mmap.mmap, bytes],
+        pos: int=0,
+        max_start: int=None,
+        is_empty_allowed: bool=True) -> Iterator[FoundType]:
+    """
+    Find all non-overlapping matches\
+    in the file content, with the same\
+    engine ``finditer`` uses. Regexes\
+    of plain text are found with the\
+    ``mmap`` methods, unless they ignore\
+    case, since that takes a lowercased\
+    copy of the file. See ``_finditer``
+
+    :private:
+    """
+    if nfa.literal is not None and not nfa.literal.is_ignore_case:
+        for start, end in _finditer_literal(
+                nfa.literal, data, pos, max_start):
+            yield None, start, end
+
+        return
+
+    text = Text(data)
+
+    try:
+        yield from _finditer(
+            nfa,
+            text,
+            pos=pos,
+            max_start=max_start,
+            is_empty_allowed=is_empty_allowed)
+    finally:
+        text.close()
+
+
+def _finditer_file(
+        nfa: NFA,
+        data: Union[mmap.mmap, bytes]) -> Iterator[Tuple[Match, int]]:
+    """
+    Find all non-overlapping matches\
+    and the line number of every one
+
+    :private:
+    """
+    line = 1
+    line_pos = 0
+
+    with contextlib.closing(_finditer_data(nfa, data)) as matches:
+        for found in matches:
+            _captured, start, _end = found
+            line += _count_lines(data, line_pos, start)
+            line_pos = start
+            yield _to_match(nfa, found), line
+
+
+def search_file(nfa: NFAType, path: PathType) -> Union[FileMatch, None]:
+    """
+    Search the file content. The file\
+    is memory-mapped, so it's not read\
+    into memory nor copied
+
+    The regex must be compiled\
+    in bytes or UTF-8 mode
+
+    :param nfa: a NFA or an expression
+    :param path: path of the file
+    :return: match or ``None``
+    :raise TypeError: if the regex\
+    is not a bytes or UTF-8 one
+    """
+    nfa = _nfa(nfa)
+    _check_nfa(nfa)
+
+    with _mapped(path) as data, contextlib.closing(
+            _finditer_file(nfa, data)) as matches:
+        for match, line in matches:
+            return FileMatch(match, line)
+
+    return None
+
+
+# Min size of a range scanned by a single process
+RANGE_SIZE = 1024 * 1024
+
+# (start, end, match, line) where ``match``\
+# is ``None`` when only counting, and ``line``\
+# is relative to the start of the range
+RangeItemType = Tuple[int, int, Union[Match, None], int]
+RangeResultType = Tuple[int, int, int, List[RangeItemType]]
+
+
+def _ranges(size: int, processes: int) -> List[Tuple[int, int]]:
+    """
+    Split the file into ranges, the\
+    last one ends past the end. There are\
+    a few ranges per process, so a\
+    range with lots of matches does\
+    not keep the other processes waiting
+
+    :private:
+    """
+    count = max(1, min(processes * 4, size // RANGE_SIZE))
+    bounds = [size * i // count for i in range(count + 1)]
+    # The last range contains
+    # an empty match at the end
+    bounds[-1] += 1
+    return list(zip(bounds, bounds[1:]))
+
+
+def _scan_range(
+        nfa: NFA,
+        path: PathType,
+        start: int,
+        end: int,
+        is_count: bool) -> RangeResultType:
+    """
+    Find the matches starting within the range,\
+    as if the search had started at the start\
+    of the range. Matches may end past the\
+    range. This runs in a worker process
+
+    :private:
+    """
+    items = []
+    line = 0
+    line_pos = start
+
+    with _mapped(path) as data, contextlib.closing(
+            _finditer_data(nfa, data, pos=start, max_start=end)) as matches:
+        for found in matches:
+            _captured, match_start, match_end = found
+
+            if is_count:
+                items.append((match_start, match_end, None, 0))
+                continue
+
+            line += _count_lines(data, line_pos, match_start)
+            line_pos = match_start
+            items.append((
+                match_start,
+                match_end,
+                _to_match(nfa, found),
+                line))
+
+        lines_count = 0 if is_count else _count_lines(data, start, end)
+
+    return start, end, lines_count, items
+
+
+def _synced(
+        items: List[RangeItemType],
+        start: int,
+        pos: int,
+        is_empty_allowed: bool) -> Union[int, None]:
+    """
+    Return the index of the item the\
+    search from the given state finds next,\
+    or ``None`` if it can't be known\
+    from the range result
+
+    The range was searched from its start,\
+    then from the end of every match.\
+    Searching from a position in between\
+    those, finds the same next match,\
+    since there is no match starting before it.\
+    Searching from one of those, finds the\
+    same next match if the empty match rule\
+    is the same. There is no match starting\
+    in between the given position and\
+    the start of the range
+
+    :private:
+    """
+    if pos < start:
+        return 0
+
+    prev_end = start
+    is_prev_empty_allowed = True
+
+    for i, (match_start, match_end, _match, _line) in enumerate(items):
+        if pos == prev_end and is_empty_allowed == is_prev_empty_allowed:
+            return i
+
+        if prev_end < pos < match_start:
+            return i
+
+        if prev_end < pos == match_start and is_empty_allowed:
+            return i
+
+        if pos <= match_start:
+            return None
+
+        prev_end = match_end
+        is_prev_empty_allowed = match_start != match_end
+
+    if pos > prev_end:
+        return len(items)
+
+    if pos == prev_end and is_empty_allowed == is_prev_empty_allowed:
+        return len(items)
+
+    return None
+
+
+def _stitch(
+        nfa: NFA,
+        data: Union[mmap.mmap, bytes],
+        results: Iterable[RangeResultType],
+        is_count: bool) -> Iterator[Tuple[int, int, Union[Match, None], int]]:
+    """
+    Merge the results of every range in order.\
+    A match may overlap the next range, then\
+    the next range matches are not valid\
+    until the search gets in sync again.\
+    The text in between gets searched here
+
+    The result is the same as\
+    searching the whole file at once
+
+    :return: an iterator of match\
+    boundaries, matches and line numbers
+    :private:
+    """
+    pos = 0
+    is_empty_allowed = True
+    line = 1
+
+    for start, end, lines_count, items in results:
+        index = _synced(items, start, pos, is_empty_allowed)
+
+        while index is None:
+            with contextlib.closing(_finditer_data(
+                    nfa,
+                    data,
+                    pos=pos,
+                    max_start=end,
+                    is_empty_allowed=is_empty_allowed)) as matches:
+                found = next(matches, None)
+
+            if found is None:
+                index = len(items)
+                break
+
+            _captured, match_start, match_end = found
+
+            if is_count:
+                yield match_start, match_end, None, 0
+            else:
+                yield (
+                    match_start,
+                    match_end,
+                    _to_match(nfa, found),
+                    line + _count_lines(data, start, match_start))
+
+            pos = match_end
+            is_empty_allowed = match_start != match_end
+            index = _synced(items, start, pos, is_empty_allowed)
+
+        for match_start, match_end, match, match_line in items[index:]:
+            yield match_start, match_end, match, line + match_line
+            pos = match_end
+            is_empty_allowed = match_start != match_end
+
+        line += lines_count
+
+
+def _finditer_file_parallel(
+        nfa: NFA,
+        path: PathType,
+        processes: int,
+        is_count: bool) -> Iterator[Tuple[int, int, Union[Match, None], int]]:
+    """
+    Search the file ranges in a pool\
+    of processes, then stitch the results
+
+    :private:
+    """
+    with _mapped(path) as data:
+        ranges = _ranges(len(data), processes)
+
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=processes) as executor:
+            results = executor.map(
+                _scan_range,
+                *zip(*(
+                    (nfa, path, start, end, is_count)
+                    for start, end in ranges)))
+
+            yield from _stitch(nfa, data, results, is_count)
+
+
+def finditer_file(
+        nfa: NFAType,
+        path: PathType,
+        processes: int=1) -> Iterator[FileMatch]:
+    """
+    Find all non-overlapping\
+    matches in the file content.\
+    Same as ``finditer`` but the file\
+    is memory-mapped, so it's not read\
+    into memory nor copied
+
+    The regex must be compiled\
+    in bytes or UTF-8 mode.\
+    The file is closed once the\
+    iterator is consumed or closed
+
+    With more than one process, the file\
+    is split into ranges searched in\
+    parallel. Matches are yielded in order,\
+    same as they are found by a single process
+
+    :param nfa: a NFA or an expression
+    :param path: path of the file
+    :param processes: number of processes to use
+    :return: an iterator of matches
+    :raise TypeError: if the regex\
+    is not a bytes or UTF-8 one
+    """
+    nfa = _nfa(nfa)
+    _check_nfa(nfa)
+
+    if processes > 1:
+        for _start, _end, match, line in _finditer_file_parallel(
+                nfa, path, processes, is_count=False):
+            yield FileMatch(match, line)
+
+        return
+
+    with _mapped(path) as data, contextlib.closing(
+            _finditer_file(nfa, data)) as matches:
+        for match, line in matches:
+            yield FileMatch(match, line)
+
+
+def count_file(
+        nfa: NFAType,
+        path: PathType,
+        processes: int=1) -> int:
+    """
+    Count the non-overlapping\
+    matches in the file content.\
+    See ``finditer_file``
+
+    :param nfa: a NFA or an expression
+    :param path: path of the file
+    :param processes: number of processes to use
+    :return: the number of matches
+    :raise TypeError: if the regex\
+    is not a bytes or UTF-8 one
+    """
+    nfa = _nfa(nfa)
+    _check_nfa(nfa)
+
+    if processes > 1:
+        return sum(
+            1 for _ in _finditer_file_parallel(
+                nfa, path, processes, is_count=True))
+
+    with _mapped(path) as data, contextlib.closing(
+            _finditer_data(nfa, data)) as matches:
+        return sum(1 for _ in matches)
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+
+"""
+Matching for regular expressions\
+over every line of a text
+
+:private:
+"""
+
+import mmap
+from typing import (
+    Iterator,
+    Tuple,
+    Union)
+
+from ..compile.compile import NFA
+from ..shared import (
+    Flags,
+    exceptions)
+from .match import (
+    Match,
+    NFAType,
+    FoundType,
+    _Setup,
+    _find,
+    _nfa,
+    _text,
+    _literal_text,
+    _finditer_literal,
+    _to_match)
+from .file import _count_lines
+
+
+__all__ = ['search_lines']
+
+
+LinesTextType = Union[str, bytes, bytearray, mmap.mmap]
+
+# Line start, line end and match found
+FoundLineType = Tuple[int, int, FoundType]
+
+
+def _line_break(nfa: NFA) -> Union[str, bytes]:
+    return b'\n' if nfa.flags & Flags.BYTES else '\n'
+
+
+def _count_line_breaks(text: LinesTextType, start: int, end: int) -> int:
+    if isinstance(text, str):
+        return text.count('\n', start, end)
+
+    return _count_lines(text, start, end)
+
+
+def _search_lines_literal(
+        nfa: NFA,
+        text: Union[str, bytes]) -> Iterator[FoundLineType]:
+    """
+    Search every line for a plain\
+    text regex. The text is searched\
+    with the string methods, the line\
+    is computed for the matches only
+
+    :private:
+    """
+    literal = nfa.literal
+    line_break = _line_break(nfa)
+
+    # It can't be within a line
+    if line_break in literal.text:
+        return
+
+    pos = 0
+
+    while True:
+        start = text.find(literal.text, pos)
+
+        if start < 0:
+            return
+
+        line_start = max(pos, text.rfind(line_break, pos, start) + 1)
+        line_end = text.find(line_break, start)
+
+        if line_end < 0:
+            line_end = len(text)
+
+        for found_start, found_end in _finditer_literal(
+                literal, text[line_start:line_end]):
+            yield line_start, line_end, (
+                None, line_start + found_start, line_start + found_end)
+            break
+
+        pos = line_end + 1
+
+
+def _search_lines(
+        nfa: NFA,
+        text: LinesTextType) -> Iterator[FoundLineType]:
+    """
+    Search every line in a single pass\
+    over the text (see ``_find``). The\
+    line is computed for the matches only
+
+    :private:
+    """
+    line_break = _line_break(nfa)
+    size = len(text)
+
+    if not size:
+        return
+
+    # A line break at the end does
+    # not start an empty line
+    max_start = None
+
+    if text[size - 1:] == line_break:
+        max_start = size
+
+    wrapped = _text(nfa, text)
+    setup = _Setup(nfa)
+    pos = 0
+
+    try:
+        while pos < size:
+            try:
+                found = _find(
+                    nfa,
+                    wrapped,
+                    pos=pos,
+                    max_start=max_start,
+                    setup=setup,
+                    lines=text)
+            except exceptions.MatchError:
+                return
+
+            _captured, start, end = found
+            line_start = max(pos, text.rfind(line_break, pos, start) + 1)
+            line_end = text.find(line_break, end)
+
+            if line_end < 0:
+                line_end = size
+
+            yield line_start, line_end, found
+            pos = line_end + 1
+    finally:
+        wrapped.close()
+
+
+def search_lines(
+        nfa: NFAType,
+        text: LinesTextType) -> Iterator[Tuple[int, Union[str, bytes], Match]]:
+    """
+    Search every line of the text.\
+    Same as calling ``search`` on every\
+    line, but the text is searched\
+    in a single pass and it's not\
+    split into lines
+
+    Lines are split at ``\\n``, which\
+    is not part of the line. A line\
+    break at the end of the text\
+    does not start another line
+
+    Offsets (see ``Match.span``)\
+    are relative to the start\
+    of the line
+
+    :param nfa: a NFA or an expression
+    :param text: a text to match against.\
+    In bytes mode it may be a ``mmap``
+    :return: an iterator of the line\
+    number (1-based), the line and\
+    the match of every matching line
+    :raise TypeError: if the text\
+    is a stream or a ``memoryview``
+    """
+    nfa = _nfa(nfa)
+
+    if not isinstance(text, (str, bytes, bytearray, mmap.mmap)):
+        raise TypeError(
+            'Can\'t search the lines of a %s, '
+            'pass a str, bytes, bytearray or mmap' % type(text).__name__)
+
+    literal_text = _literal_text(nfa, text)
+
+    if literal_text is not None:
+        found_lines = _search_lines_literal(nfa, literal_text)
+    else:
+        found_lines = _search_lines(nfa, text)
+
+    line = 1
+    line_pos = 0
+
+    for line_start, line_end, (captured, start, end) in found_lines:
+        line += _count_line_breaks(text, line_pos, line_start)
+        line_pos = line_start
+        yield line, text[line_start:line_end], _to_match(
+            nfa, (captured, start - line_start, end - line_start))
@@ -6,40 +6,68 @@ Matching for regular expressions
 :private:
 """
 
+import io
+import mmap
 from typing import (
-    List,
+    Callable,
     Tuple,
     Iterator,
     Union,
-    Set)
+    Set,
+    FrozenSet)
 
 from ..shared.nodes import (
     EOF,
+    LINE_BREAKS,
     CharNode,
     GroupNode,
     Node,
-    AssertionNode)
+    AssertionNode,
+    LookaheadNFANode)
 from ..shared import exceptions
+from ..shared import Flags
 from ..shared.collections import StatesSet
 from ..compile.compile import NFA
+from ..compile.literal import Literal
+from ..compile.cache import cached_nfa
+from ..compile.dfa import (
+    DEAD,
+    START)
 from . import captures
-from .captures import (
-    Capture,
-    MatchedType)
+from .captures import Capture
+from .text import (
+    Text,
+    TextType,
+    BYTES_TYPES)
 
 
-__all__ = ['match']
+__all__ = [
+    'match',
+    'full_match',
+    'search',
+    'finditer',
+    'count']
+
+
+# A NFA or an expression to compile
+NFAType = Union[NFA, str, bytes]
 
 
 class Match:
 
     __slots__ = (
         '_captures',
-        '_named_groups')
-
-    def __init__(self, captures: tuple, named_groups: dict):
+        '_named_groups',
+        '_span')
+
+    def __init__(
+            self,
+            captures: tuple,
+            named_groups: dict,
+            span: Tuple[int, int]):
         self._captures = captures
         self._named_groups = named_groups
+        self._span = span
 
     def __repr__(self):
         return '%s<%s>' % (self.__class__.__name__, self._captures)
@@ -58,32 +86,180 @@ class Match:
             name: self._captures[index]
             for name, index in self._named_groups.items()}
 
+    def span(self):
+        return self._span
+
+    def start(self):
+        return self._span[0]
+
+    def end(self):
+        return self._span[1]
+
 
-def _get_match(states: List[Tuple[Node, Capture]]) -> Capture:
+# Lookaheads not matched yet and the
+# states of their NFA, if any
+ChecksType = Union[FrozenSet[Tuple[LookaheadNFANode, FrozenSet[Node]]], None]
+
+
+class _Pending:
+    """
+    The state of a thread that passed\
+    lookaheads of more than one char\
+    (see ``LookaheadNFANode``). The NFA\
+    of every lookahead is run along\
+    the thread, one char at a time,\
+    until it tells whether the\
+    lookahead matches. The thread is\
+    dropped if it does not
+
+    Threads are told apart by state\
+    and lookahead states, so there\
+    are a limited number of them\
+    and the search takes linear time
+
+    :ivar state: a CharNode or EOF
+    :ivar checks: the lookaheads to match
+    :ivar int end: where the match ends,\
+    if the state is EOF
+    :private:
     """
-    Find a state that ended with EOF\
-    meaning it matched, otherwise raise an error
 
-    :param states: sequence of matches
-    :return: the last capture associated to the match
-    :raise `exceptions.MatchError`: when no match if found
+    __slots__ = (
+        'state',
+        'checks',
+        'end')
+
+    def __init__(self, state: Node, checks: ChecksType, end: int) -> None:
+        self.state = state
+        self.checks = checks
+        self.end = end
+
+    def __hash__(self):
+        return hash((self.state, self.checks))
+
+    def __eq__(self, other):
+        return (
+            other.__class__ is _Pending and
+            self.state is other.state and
+            self.checks == other.checks)
+
+
+def _lookahead_states(
+        state: Node,
+        chars: Tuple[str, str],
+        visited: Set[Node]) -> Iterator[Node]:
+    """
+    Go to next CharNode or EOF states\
+    of the NFA of a lookahead.\
+    Same as ``_next_states``\
+    minus the captures
+
     :private:
     """
-    for s, captured in states:
-        if s == EOF:
-            return captured
+    if state in visited:
+        return
+
+    visited.add(state)
+
+    if state is EOF or isinstance(state, CharNode):
+        yield state
+        return
+
+    if (isinstance(state, AssertionNode) and
+            not state.match(*chars)):
+        return
 
-    raise exceptions.MatchError('No match')
+    for s in state.out:
+        yield from _lookahead_states(s, chars, visited)
+
+
+def _check(
+        node: LookaheadNFANode,
+        states: FrozenSet[Node]) -> Union[bool, None]:
+    """
+    Tell whether the lookahead matches\
+    or ``None`` if it's not known yet
+
+    :private:
+    """
+    if EOF in states:
+        return not node.is_negative
 
+    if not states:
+        return node.is_negative
 
-NextStateType = Iterator[Tuple[Node, Capture]]
+    return None
+
+
+def _add_check(
+        checks: ChecksType,
+        node: LookaheadNFANode,
+        chars: Tuple[str, str]) -> Union[ChecksType, bool]:
+    """
+    Start matching the lookahead
+
+    :return: the checks to match\
+    or ``False`` if the lookahead\
+    does not match
+    :private:
+    """
+    states = frozenset(_lookahead_states(node.state, chars, visited=set()))
+    is_match = _check(node, states)
+
+    if is_match is None:
+        return (checks or frozenset()) | {(node, states)}
+
+    if not is_match:
+        return False
+
+    return checks
+
+
+def _step_checks(
+        checks: ChecksType,
+        char: Union[str, int],
+        next_char: Union[str, int],
+        is_eol: bool) -> Union[ChecksType, bool]:
+    """
+    Match the char against the\
+    NFA of every lookahead
+
+    :return: the checks left\
+    or ``False`` if a lookahead\
+    does not match
+    :private:
+    """
+    next_checks = set()
+
+    for node, states in checks:
+        visited = set()
+        next_states_ = frozenset(
+            s
+            for state in states
+            if not is_eol and char == state.char
+            for out in state.out
+            for s in _lookahead_states(out, (char, next_char), visited))
+        is_match = _check(node, next_states_)
+
+        if is_match is None:
+            next_checks.add((node, next_states_))
+        elif not is_match:
+            return False
+
+    return frozenset(next_checks) or None
+
+
+NextStateType = Iterator[Tuple[Node, Capture, int]]
 
 
 def _next_states(
         state: Node,
         captured: Capture,
+        start: int,
         chars: Tuple[str, str],
-        visited: Set[Node]) -> NextStateType:
+        visited: Set[Node],
+        pos: int=None,
+        checks: ChecksType=None) -> NextStateType:
     """
     Go to next CharNode or EOF state.\
     Capture matches along the way
@@ -91,28 +267,41 @@ def _next_states(
     This will follow all state connections,\
     so it may return multiple states
 
+    States are wrapped (see ``_Pending``)\
+    while there are lookaheads to match
+
     :param state: current state/node
     :param captured: current capture
+    :param start: position where the match started
+    :param pos: current position or\
+    ``None`` if it's the match start
+    :param checks: lookaheads to match
     :return: one or more states for the next match
     :private:
     """
+    key = state if checks is None else (state, checks)
+
     # Break a** cycle
-    if state in visited:
+    if key in visited:
         return
 
-    visited.add(state)
+    visited.add(key)
 
-    if state is EOF:
-        yield EOF, captured
-        return
+    if state is EOF or isinstance(state, CharNode):
+        if checks is not None:
+            state = _Pending(state, checks, start if pos is None else pos)
 
-    if isinstance(state, CharNode):
-        yield state, captured
+        yield state, captured, start
         return
 
-    if (isinstance(state, AssertionNode) and
-            not state.match(*chars)):
-        return
+    if isinstance(state, AssertionNode):
+        if state.__class__ is LookaheadNFANode:
+            checks = _add_check(checks, state, chars)
+
+            if checks is False:
+                return
+        elif not state.match(*chars):
+            return
 
     if (isinstance(state, GroupNode) and
             state.is_capturing):
@@ -120,31 +309,41 @@ def _next_states(
             char=state.char,
             prev=captured,
             index=state.index,
-            is_repeated=state.is_repeated)
+            is_repeated=state.is_repeated,
+            pos=pos)
 
     for s in state.out:
-        yield from _next_states(s, captured, chars, visited)
+        yield from _next_states(
+            s, captured, start, chars, visited, pos, checks)
 
 
 def next_states(
         state: Node,
         captured: Capture,
-        chars: Tuple[str, str]) -> NextStateType:
+        start: int,
+        chars: Tuple[str, str],
+        pos: int=None,
+        checks: ChecksType=None) -> NextStateType:
     """
     Go to next states of the given state
 
     :param state: current state
     :param captured: current capture
+    :param start: position where the match started
+    :param pos: position of the next state
+    :param checks: lookaheads to match
     :return: one or more states
     :private:
     """
     for s in state.out:
-        yield from _next_states(s, captured, chars, visited=set())
+        yield from _next_states(
+            s, captured, start, chars, visited=set(), pos=pos, checks=checks)
 
 
 def curr_states(
         state: Node,
         captured: Capture,
+        start: int,
         chars: Tuple[str, str]) -> NextStateType:
     """
     Return a state to match.\
@@ -152,62 +351,416 @@ def curr_states(
 
     :param state: current state
     :param captured: current capture
+    :param start: position where the match started
     :return: one or more states
     """
-    return _next_states(state, captured, chars, visited=set())
+    return _next_states(state, captured, start, chars, visited=set())
+
+
+def _is_static(state: Node, visited: Set[Node]) -> bool:
+    """
+    Check the states following the given\
+    one up to the next CharNode or EOF\
+    don't depend on the text, this\
+    is they are not assertions
+
+    :private:
+    """
+    if state in visited:
+        return True
+
+    visited.add(state)
+
+    if state is EOF or isinstance(state, CharNode):
+        return True
+
+    if isinstance(state, AssertionNode):
+        return False
+
+    return all(_is_static(s, visited) for s in state.out)
 
 
-def _peek(iterator, sof, eof):
-    iterator = iter(iterator)
-    prev = sof
+def _is_eof(state: Union[Node, _Pending]) -> bool:
+    return state is EOF or (
+        state.__class__ is _Pending and state.state is EOF)
 
-    for elm in iterator:
-        yield prev, elm
-        prev = elm
 
-    yield prev, eof
+StartStatesType = Tuple[Tuple[Node, Capture], ...]
 
 
-def match(nfa: NFA, text: Iterator[str]) -> Union[Match, None]:
+class _Setup:
+    """
+    What a search needs before\
+    reading the text. This is built\
+    once and reused by every search\
+    of the same NFA in a row
+
+    :ivar start_states: the states a match\
+    starts with, if they are always the same
+    :ivar curr_states_set: states buffer
+    :ivar next_states_set: states buffer
+    :private:
     """
-    Match works by going through the given text\
-    and matching it to the current states\
-    (one or multiple states)
 
-    Return the matched groups or\
-    an empty sequence if the regex has no groups or\
-    ``None`` if no match is found
+    __slots__ = (
+        'start_states',
+        'curr_states_set',
+        'next_states_set')
 
-    The iterator may not be fully consumed
+    def __init__(self, nfa: NFA) -> None:
+        self.start_states = None  # type: StartStatesType
 
-    :param nfa: a NFA
-    :param text: a text to match against
-    :return: match or ``None``
+        if _is_static(nfa.state, visited=set()):
+            self.start_states = tuple(
+                (state, captured)
+                for state, captured, _start in curr_states(
+                    state=nfa.state,
+                    captured=None,
+                    start=0,
+                    chars=('', '')))
+
+        self.curr_states_set = StatesSet()
+        self.next_states_set = StatesSet()
+
+
+FoundType = Tuple[Capture, int, int]
+
+
+def _is_utf8_continuation(char: Union[str, int]) -> bool:
+    return char != '' and 0x80 <= char <= 0xbf
+
+
+def _keep_from(
+        states: StatesSet,
+        found: Union[FoundType, None],
+        pos: int) -> Tuple[int, int]:
     """
-    text_it = _peek(text, sof='', eof='')
+    Return the first position that\
+    may still be part of the match,\
+    and the first position that may\
+    still be read. The end of\
+    a match is read by the next search
 
-    curr_states_set = StatesSet()
-    next_states_set = StatesSet()
+    :private:
+    """
+    start = end = pos
 
-    curr_states_set.extend(curr_states(
-        state=nfa.state,
-        captured=None,
-        chars=next(text_it)))
+    for state, _captured, thread_start in states:
+        if thread_start < start:
+            start = thread_start
 
-    for char, next_char in text_it:
-        if not curr_states_set:
-            break
+        if (state.__class__ is _Pending and
+                state.state is EOF and
+                state.end < end):
+            end = state.end
 
-        if curr_states_set[0] is EOF:
-            break
+    if found is not None:
+        start = min(start, found[1])
+        end = min(end, found[2])
+
+    return start, end
+
+
+def _line_limits(
+        nfa: NFA,
+        lines: TextType,
+        pos: int,
+        max_start: Union[int, None]) -> Tuple[int, int]:
+    """
+    Return where the line at the given\
+    position ends and the position\
+    matches must start before to fit\
+    within the line. Regexes anchored\
+    to the start are tried at the\
+    given position only
+
+    :private:
+    """
+    line_end = lines.find(
+        b'\n' if nfa.flags & Flags.BYTES else '\n', pos)
+
+    if line_end < 0:
+        line_end = len(lines)
+
+    line_max_start = line_end - nfa.min_length + 1
+
+    if nfa.is_start_anchored:
+        line_max_start = min(line_max_start, pos + 1)
+
+    if max_start is not None and max_start < line_max_start:
+        line_max_start = max_start
 
-        for curr_state, captured in curr_states_set:
+    return line_end, line_max_start
+
+
+def _find(
+        nfa: NFA,
+        text: Text,
+        pos: int=0,
+        is_anchored: bool=False,
+        is_full: bool=False,
+        is_empty_allowed: bool=True,
+        max_start: int=None,
+        setup: _Setup=None,
+        lines: TextType=None) -> FoundType:
+    """
+    Find the left-most match starting the\
+    search at the given position
+
+    Threads are kept in order of priority,\
+    once a thread reaches the EOF state every\
+    thread of lower priority is dropped,\
+    since none of them can be a better match.\
+    The search ends when there\
+    are no threads left to try
+
+    In UTF-8 mode matches start\
+    at char boundaries only
+
+    Regexes anchored to the start of\
+    the text are only tried there. If the\
+    text length is known, regexes anchored\
+    to the end of the text are tried from\
+    the first position a match may span\
+    the rest of the text from, and no\
+    regex is tried where the rest of the\
+    text is shorter than a match
+
+    Text before the earliest thread\
+    start is discarded as the text\
+    gets read, so a stream never\
+    gets fully buffered. Only the text\
+    from the current position is kept\
+    in the buffer, the text before it\
+    is kept aside (see ``Text.shift``)
+
+    In lines mode every line is\
+    matched as if it was the whole\
+    text. Threads are dropped at the\
+    line break, and assertions see\
+    the start and end of the text there.\
+    The rest of a line is skipped once\
+    there are no threads and it's\
+    shorter than a match
+
+    :param nfa: a NFA
+    :param text: a text to match against
+    :param pos: position to start the search from
+    :param is_anchored: match at the given position only
+    :param is_full: match up to the end of the text only
+    :param is_empty_allowed: whether an empty\
+    match at the given position is allowed
+    :param max_start: position (exclusive) matches\
+    must start before or ``None`` for no limit
+    :param setup: the setup of a previous\
+    search of the same NFA, to reuse it
+    :param lines: the whole text, to match\
+    within a line only. It's searched\
+    for the line breaks
+    :return: the last capture and match boundaries
+    :raise `exceptions.MatchError`: when no match if found
+    :private:
+    """
+    is_lines = lines is not None
+
+    if nfa.is_start_anchored and not is_lines:
+        if pos > 0:
+            raise exceptions.MatchError('No match')
+
+        is_anchored = True
+
+    first = pos
+
+    if (nfa.is_end_anchored and
+            not is_lines and
+            nfa.max_length is not None and
+            text.size is not None and
+            not is_anchored):
+        pos = max(pos, text.size - nfa.max_length)
+
+    if text.size is not None:
+        last_start = text.size - nfa.min_length + 1
+
+        if max_start is None or last_start < max_start:
+            max_start = last_start
+
+    text_max_start = max_start
+    line_end = None
+
+    if is_lines:
+        line_end, max_start = _line_limits(nfa, lines, pos, text_max_start)
+
+    if setup is None:
+        setup = _Setup(nfa)
+
+    start_states = setup.start_states
+    curr_states_set = setup.curr_states_set
+    next_states_set = setup.next_states_set
+    curr_states_set.clear()
+    next_states_set.clear()
+    found = None
+    prev_char = text.char_at(pos - 1)
+    buffer = text.buffer
+    index = pos - text.offset
+    is_utf8 = bool(nfa.flags & Flags.UTF8)
+    is_str = not nfa.flags & Flags.BYTES
+    line_break = LINE_BREAKS[not is_str]
+
+    if is_lines and prev_char == line_break:
+        prev_char = ''
+
+    while True:
+        # Read a new chunk only when
+        # the current one was consumed
+        if index + 1 >= len(buffer) and not text.is_eof:
+            keep, read = _keep_from(curr_states_set, found, pos)
+            text.discard(keep - 1)
+            text.shift(read - 1)
+            index = pos - text.offset
+
+            while index + 1 >= len(text.buffer) and text.fill():
+                pass
+
+            buffer = text.buffer
+
+        is_eot = index >= len(buffer)
+        char = '' if is_eot else buffer[index]
+        is_eol = is_eot
+
+        if is_lines and char == line_break:
+            char = ''
+            is_eol = True
+
+        if (found is None and
+                (not is_anchored or pos == first) and
+                (max_start is None or pos < max_start) and
+                not (is_utf8 and _is_utf8_continuation(char))):
+            if start_states is not None:
+                seeds = (
+                    (state, captured, pos)
+                    for state, captured in start_states)
+            else:
+                seeds = curr_states(
+                    state=nfa.state,
+                    captured=None,
+                    start=pos,
+                    chars=(prev_char, char))
+
+            curr_states_set.extend(
+                (state, captured, start)
+                for state, captured, start in seeds
+                if (is_empty_allowed or
+                    pos != first or
+                    not _is_eof(state)))
+
+        next_char = (
+            buffer[index + 1]
+            if index + 1 < len(buffer)
+            else '')
+
+        if is_lines and next_char == line_break:
+            next_char = ''
+
+        for curr_state, captured, start in curr_states_set:
             if curr_state is EOF:
-                next_states_set.extend(
-                    ((curr_state, captured),))
+                if is_full and not is_eot:
+                    continue
+
+                found = (captured, start, pos)
+                break
+
+            # A thread within a run of chars
+            if curr_state.__class__ is tuple:
+                last, wake = curr_state
+
+                if pos + 1 < wake:
+                    next_states_set.extend((
+                        (curr_state, captured, start),))
+                    continue
+
+                next_states_set.extend(next_states(
+                    state=last,
+                    captured=captured,
+                    start=start,
+                    chars=(char, next_char),
+                    pos=pos + 1))
+                continue
+
+            # A thread matching lookaheads
+            if curr_state.__class__ is _Pending:
+                state = curr_state.state
+
+                if state is EOF:
+                    if is_full and not is_eot:
+                        continue
+                elif is_eol or char != state.char:
+                    continue
+
+                checks = _step_checks(
+                    curr_state.checks, char, next_char, is_eol)
+
+                if checks is False:
+                    continue
+
+                if state is EOF:
+                    if checks is None:
+                        found = (captured, start, curr_state.end)
+                        break
+
+                    # Threads of lower priority
+                    # are kept until it matches
+                    next_states_set.extend((
+                        (_Pending(EOF, checks, curr_state.end),
+                         captured,
+                         start),))
+                    continue
+
+                if state.is_captured:
+                    captured = captures.capture(
+                        char=char,
+                        prev=captured)
+
+                next_states_set.extend(next_states(
+                    state=state,
+                    captured=captured,
+                    start=start,
+                    chars=(char, next_char),
+                    pos=pos + 1,
+                    checks=checks))
+                continue
+
+            if is_eol or char != curr_state.char:
                 continue
 
-            if char != curr_state.char:
+            literal = curr_state.literal
+
+            # Match the run of chars in one step.
+            # Streams may not have the whole run
+            # buffered, then it's matched char by char
+            if (literal is not None and
+                    (index + len(literal) <= len(buffer) or
+                     text.is_eof)):
+                if is_str:
+                    if not buffer.startswith(literal, index):
+                        continue
+                elif buffer[index:index + len(literal)] != literal:
+                    continue
+
+                if is_lines and line_break in literal:
+                    continue
+
+                if curr_state.is_captured:
+                    for c in literal:
+                        captured = captures.capture(
+                            char=c,
+                            prev=captured)
+
+                # The thread is parked until the
+                # last char, it keeps its priority
+                next_states_set.extend((
+                    ((curr_state.literal_last, pos + len(literal)),
+                     captured,
+                     start),))
                 continue
 
             if curr_state.is_captured:
@@ -218,126 +771,548 @@ def match(nfa: NFA, text: Iterator[str]) -> Union[Match, None]:
             next_states_set.extend(next_states(
                 state=curr_state,
                 captured=captured,
-                chars=(char, next_char)))
+                start=start,
+                chars=(char, next_char),
+                pos=pos + 1))
+
+        if is_eot:
+            break
 
         curr_states_set, next_states_set = (
             next_states_set, curr_states_set)
         next_states_set.clear()
 
+        if (not curr_states_set and
+                (found is not None or
+                 is_anchored or
+                 (max_start is not None and pos + 1 >= max_start))):
+            if found is not None or not is_lines or line_end >= len(lines):
+                break
+
+            # No match can start in the rest
+            # of the line, skip to the next one
+            index += line_end - pos
+            pos = line_end
+            char = ''
+            is_eol = True
+
+        if is_lines and is_eol:
+            line_end, max_start = _line_limits(
+                nfa, lines, pos + 1, text_max_start)
+
+        prev_char = char
+        pos += 1
+        index += 1
+
+    if found is None:
+        raise exceptions.MatchError('No match')
+
+    return found
+
+
+def _find_dfa(nfa: NFA, text: Text, is_full: bool=False) -> FoundType:
+    """
+    Match at the start of the text\
+    running the DFA built at compile\
+    time (see ``NFA.dfa``), or the\
+    generated matcher if any.\
+    There are no captures
+
+    :param nfa: a NFA with DFAs
+    :param text: a text to match against
+    :param is_full: match up to the end of the text only
+    :return: the match start and end
+    :raise MatchError: if no match is found
+    :private:
+    """
+    if nfa.matcher is not None:
+        if is_full:
+            end = nfa.matcher.full_match(text.chunks())
+        else:
+            end = nfa.matcher.match(text.chunks())
+
+        if end < 0:
+            raise exceptions.MatchError('No match')
+
+        return None, 0, end
+
+    dfa = nfa.dfa.full_match if is_full else nfa.dfa.match
+    transitions = dfa.transitions
+    accepts = dfa.accepts
+    classes_count = dfa.classes_count
+    class_of = nfa.alphabet.class_of
+    state = START
+    end = 0 if accepts[START] else -1
+    pos = 0
+
+    while (state != DEAD and
+           (pos - text.offset < len(text.buffer) or text.fill())):
+        for char in text.buffer[pos - text.offset:]:
+            state = transitions[state * classes_count + class_of(char)]
+            pos += 1
+
+            if state == DEAD:
+                break
+
+            if accepts[state]:
+                end = pos
+
+        text.discard(pos)
+
+    if end < 0 or (is_full and (state == DEAD or end != pos)):
+        raise exceptions.MatchError('No match')
+
+    return None, 0, end
+
+
+def _finditer(
+        nfa: NFA,
+        text: Text,
+        pos: int=0,
+        max_start: int=None,
+        is_empty_allowed: bool=True) -> Iterator[FoundType]:
+    """
+    Find all non-overlapping matches
+
+    :param nfa: a NFA
+    :param text: a text to match against
+    :param pos: position to start the search from
+    :param max_start: position (exclusive) matches\
+    must start before or ``None`` for no limit
+    :param is_empty_allowed: whether an empty\
+    match at the given position is allowed
+    :return: an iterator of captures and match boundaries
+    :private:
+    """
+    setup = _Setup(nfa)
+
+    while True:
+        try:
+            found = _find(
+                nfa,
+                text,
+                pos=pos,
+                is_empty_allowed=is_empty_allowed,
+                max_start=max_start,
+                setup=setup)
+        except exceptions.MatchError:
+            return
+
+        yield found
+        _captured, start, pos = found
+        is_empty_allowed = start != pos
+
+
+def _finditer_between(
+        nfa: NFA,
+        text: Text,
+        write: Callable[[str], None],
+        count: int=0) -> Iterator[FoundType]:
+    """
+    Find all non-overlapping matches\
+    and write the text in between them.\
+    The text before a match is written\
+    before the match is yielded and the\
+    text after the last match is\
+    written at the end
+
+    The text gets written as it's discarded\
+    from the buffer, so there is no need to\
+    keep it in memory until a match is found
+
+    :param nfa: a NFA
+    :param text: a text to match against.\
+    It must have not been read yet
+    :param write: a callback the text\
+    in between matches is written to
+    :param count: max number of matches\
+    to find or ``0`` for all of them
+    :return: an iterator of captures and match boundaries
+    :private:
+    """
+    last_end = 0
+
+    def write_text(text_part: Union[str, memoryview]) -> None:
+        if isinstance(text_part, memoryview):
+            text_part = text_part.tobytes()
+
+        write(text_part)
+
+    def on_discard(offset: int, discarded: str) -> None:
+        if offset + len(discarded) > last_end:
+            write_text(discarded[max(last_end - offset, 0):])
+
+    assert text.offset == 0 and not text.buffer
+    text.on_discard = on_discard
+
+    for i, found in enumerate(_finditer(nfa, text), 1):
+        _captured, start, end = found
+
+        if start > last_end:
+            write_text(text.span(last_end, start))
+
+        yield found
+        last_end = end
+
+        if i == count:
+            break
+
+    # The rest of the text is
+    # written as it gets read
+    text.discard(last_end)
+
+    for chunk in text.chunks():
+        if chunk:
+            write_text(chunk)
+
+
+def _is_ascii(text: Union[str, bytes]) -> bool:
     try:
-        captured = _get_match(curr_states_set)
-    except exceptions.MatchError:
+        return text.isascii()
+    except AttributeError:  # Python < 3.7
+        return not text or max(text) < (
+            '\x80' if isinstance(text, str) else 0x80)
+
+
+def _literal_text(
+        nfa: NFA,
+        text: TextType) -> Union[str, bytes, None]:
+    """
+    Return the text to match the plain\
+    text regex against with the string\
+    methods, or ``None`` if the regex\
+    is not plain text or the text\
+    can't be matched that way
+
+    Regexes ignoring case are matched\
+    against the lowercased text. The\
+    text must be ASCII, except in bytes\
+    mode, so the offsets don't change.\
+    This copies the text
+
+    :private:
+    """
+    literal = nfa.literal
+
+    if literal is None:
         return None
 
-    return Match(
-        captures=captures.matched(captured, nfa.groups_count),
-        named_groups=nfa.named_groups)
+    if nfa.flags & Flags.BYTES:
+        if not isinstance(text, (bytes, bytearray)):
+            return None
+    elif not isinstance(text, str):
+        return None
+
+    if not literal.is_ignore_case:
+        return text
+
+    if nfa.flags & Flags.UTF8 or not nfa.flags & Flags.BYTES:
+        if not _is_ascii(text):
+            return None
+
+    return text.lower()
 
 
-def full_match(nfa: NFA, text: Iterator[str]) -> Union[Match, None]:
+def _finditer_literal(
+        literal: Literal,
+        text: Union[str, bytes, mmap.mmap],
+        pos: int=0,
+        max_start: int=None) -> Iterator[Tuple[int, int]]:
     """
+    Find all non-overlapping matches\
+    of a plain text regex, with the\
+    string methods. The text may\
+    be a ``mmap``, it's not copied
+
+    :param literal: the regex text
+    :param text: a text to match against
+    :param pos: position to start the search from
+    :param max_start: position (exclusive) matches\
+    must start before or ``None`` for no limit
+    :return: an iterator of match boundaries
+    :private:
+    """
+    size = len(literal.text)
+
+    if max_start is None:
+        max_start = len(text) + 1
+
+    if literal.is_start:
+        if (pos == 0 < max_start and
+                text[:size] == literal.text and
+                (not literal.is_end or len(text) == size)):
+            yield 0, size
+
+        return
+
+    if literal.is_end:
+        start = len(text) - size
+
+        if pos <= start < max_start and text[start:] == literal.text:
+            yield start, len(text)
+
+        return
+
+    start = text.find(literal.text, pos)
+
+    while 0 <= start < max_start:
+        yield start, start + size
+        start = text.find(literal.text, start + size)
+
+
+def _text(nfa: NFA, text: TextType) -> Text:
+    """
+    Wrap the text, check it's\
+    of the same type as the regex
 
     :param nfa: a NFA
     :param text: a text to match against
-    :return: match or ``None``
+    :return: the wrapped text
+    :raise TypeError: if the text\
+    and regex types mismatch
+    :private:
     """
-    text_it = _peek(text, sof='', eof='')
+    is_bytes = bool(nfa.flags & Flags.BYTES)
 
-    curr_states_set = StatesSet()
-    next_states_set = StatesSet()
+    if is_bytes and isinstance(text, (str, io.TextIOBase)):
+        raise TypeError(
+            'Can\'t use a bytes regex on a str text')
 
-    curr_states_set.extend(curr_states(
-        state=nfa.state,
-        captured=None,
-        chars=next(text_it)))
+    if not is_bytes and isinstance(text, BYTES_TYPES):
+        raise TypeError(
+            'Can\'t use a str regex on a bytes-like text')
 
-    for char, next_char in text_it:
-        if not curr_states_set:
-            break
+    return Text(text)
 
-        for curr_state, captured in curr_states_set:
-            if char != curr_state.char:
-                continue
 
-            if curr_state.is_captured:
-                captured = captures.capture(
-                    char=char,
-                    prev=captured)
+def _nfa(nfa: NFAType) -> NFA:
+    """
+    Compile the expression, if it's not\
+    compiled already. Compiled expressions\
+    are cached (see ``cached_nfa``)
 
-            next_states_set.extend(next_states(
-                state=curr_state,
-                captured=captured,
-                chars=(char, next_char)))
+    :private:
+    """
+    if isinstance(nfa, NFA):
+        return nfa
 
-        curr_states_set, next_states_set = (
-            next_states_set, curr_states_set)
-        next_states_set.clear()
+    return cached_nfa(nfa)
+
+
+def _to_match(nfa: NFA, found: FoundType) -> Match:
+    captured, start, end = found
+    return Match(
+        captures=captures.matched(
+            captured,
+            nfa.groups_count,
+            is_bytes=bool(nfa.flags & Flags.BYTES)),
+        named_groups=nfa.named_groups,
+        span=(start, end))
+
+
+def _match(
+        nfa: NFA,
+        text: TextType,
+        setup: _Setup=None) -> Union[FoundType, None]:
+    """
+    Match with the fastest engine\
+    for the regex: the string methods\
+    for plain text, the DFAs if there\
+    are no groups, or the NFA
+
+    :param nfa: a NFA
+    :param text: a text to match against
+    :param setup: the setup of a previous\
+    search of the same NFA, to reuse it
+    :return: the match or ``None``
+    :private:
+    """
+    literal_text = _literal_text(nfa, text)
+
+    if literal_text is not None:
+        if nfa.literal.is_end:
+            is_match = literal_text == nfa.literal.text
+        else:
+            is_match = literal_text.startswith(nfa.literal.text)
+
+        if not is_match:
+            return None
+
+        return None, 0, len(nfa.literal.text)
+
+    text = _text(nfa, text)
+
+    if text.size is not None and text.size < nfa.min_length:
+        return None
 
     try:
-        captured = _get_match(curr_states_set)
+        if nfa.dfa is not None and not nfa.groups_count:
+            return _find_dfa(nfa, text)
+
+        return _find(nfa, text, is_anchored=True, setup=setup)
     except exceptions.MatchError:
         return None
 
-    return Match(
-        captures=captures.matched(captured, nfa.groups_count),
-        named_groups=nfa.named_groups)
 
+def match(nfa: NFAType, text: TextType) -> Union[Match, None]:
+    """
+    Match works by going through the given text\
+    and matching it to the current states\
+    (one or multiple states)
+
+    Return the matched groups or\
+    an empty sequence if the regex has no groups or\
+    ``None`` if no match is found
+
+    The iterator may not be fully consumed
 
-def search(nfa: NFA, text: Iterator[str]) -> Union[MatchedType, None]:
+    :param nfa: a NFA or an expression
+    :param text: a text to match against
+    :return: match or ``None``
     """
+    nfa = _nfa(nfa)
+    found = _match(nfa, text)
 
-    :param nfa: a NFA
+    if found is None:
+        return None
+
+    return _to_match(nfa, found)
+
+
+def full_match(nfa: NFAType, text: TextType) -> Union[Match, None]:
+    """
+
+    :param nfa: a NFA or an expression
     :param text: a text to match against
     :return: match or ``None``
     """
-    text_it = _peek(text, sof='', eof='')
+    nfa = _nfa(nfa)
 
-    curr_states_set = StatesSet()
-    next_states_set = StatesSet()
+    literal_text = _literal_text(nfa, text)
 
-    curr_states_set.extend(curr_states(
-        state=nfa.state,
-        captured=None,
-        chars=next(text_it)))
+    if literal_text is not None:
+        if literal_text != nfa.literal.text:
+            return None
 
-    for char, next_char in text_it:
-        if (curr_states_set and
-                curr_states_set[0] is EOF):
-            break
+        return _to_match(nfa, (None, 0, len(literal_text)))
 
-        for curr_state, captured in curr_states_set:
-            if curr_state is EOF:
-                next_states_set.extend(
-                    ((curr_state, captured),))
-                continue
+    text = _text(nfa, text)
 
-            if char != curr_state.char:
-                continue
+    if text.size is not None and (
+            text.size < nfa.min_length or
+            (nfa.max_length is not None and text.size > nfa.max_length)):
+        return None
 
-            if curr_state.is_captured:
-                captured = captures.capture(
-                    char=char,
-                    prev=captured)
+    try:
+        if nfa.dfa is not None and not nfa.groups_count:
+            found = _find_dfa(nfa, text, is_full=True)
+        else:
+            found = _find(nfa, text, is_anchored=True, is_full=True)
+    except exceptions.MatchError:
+        return None
 
-            next_states_set.extend(next_states(
-                state=curr_state,
-                captured=captured,
-                chars=(char, next_char)))
+    return _to_match(nfa, found)
 
-        next_states_set.extend(curr_states(
-            state=nfa.state,
-            captured=None,
-            chars=(char, next_char)))
 
-        curr_states_set, next_states_set = (
-            next_states_set, curr_states_set)
-        next_states_set.clear()
+def _search(
+        nfa: NFA,
+        text: TextType,
+        setup: _Setup=None) -> Union[FoundType, None]:
+    """
+    Search with the fastest engine\
+    for the regex: the string methods\
+    for plain text or the NFA
+
+    :param nfa: a NFA
+    :param text: a text to match against
+    :param setup: the setup of a previous\
+    search of the same NFA, to reuse it
+    :return: the match or ``None``
+    :private:
+    """
+    literal_text = _literal_text(nfa, text)
+
+    if literal_text is not None:
+        for start, end in _finditer_literal(nfa.literal, literal_text):
+            return None, start, end
+
+        return None
 
     try:
-        captured = _get_match(curr_states_set)
+        return _find(nfa, _text(nfa, text), setup=setup)
     except exceptions.MatchError:
         return None
 
-    return Match(
-        captures=captures.matched(captured, nfa.groups_count),
-        named_groups=nfa.named_groups)
+
+def search(nfa: NFAType, text: TextType) -> Union[Match, None]:
+    """
+
+    :param nfa: a NFA or an expression
+    :param text: a text to match against
+    :return: match or ``None``
+    """
+    nfa = _nfa(nfa)
+    found = _search(nfa, text)
+
+    if found is None:
+        return None
+
+    return _to_match(nfa, found)
+
+
+def finditer(nfa: NFAType, text: TextType) -> Iterator[Match]:
+    """
+    Find all non-overlapping matches.\
+    Every search starts where the\
+    previous match ended. An empty match\
+    is not allowed right after another\
+    empty match, same as Python's ``re``
+
+    Matches are yielded as soon as they are\
+    found. The text is read once and only the\
+    part that may belong to the current match\
+    is kept in memory, so this works on streams
+
+    Offsets (see ``Match.span``) are\
+    relative to the start of the text
+
+    :param nfa: a NFA or an expression
+    :param text: a text to match against
+    :return: an iterator of matches
+    """
+    nfa = _nfa(nfa)
+
+    literal_text = _literal_text(nfa, text)
+
+    if literal_text is not None:
+        for start, end in _finditer_literal(nfa.literal, literal_text):
+            yield _to_match(nfa, (None, start, end))
+
+        return
+
+    for found in _finditer(nfa, _text(nfa, text)):
+        yield _to_match(nfa, found)
+
+
+def count(nfa: NFAType, text: TextType) -> int:
+    """
+    Return the number of non-overlapping\
+    matches. Same as counting the\
+    matches of ``finditer``
+
+    :param nfa: a NFA or an expression
+    :param text: a text to match against
+    :return: the number of matches
+    """
+    nfa = _nfa(nfa)
+
+    literal_text = _literal_text(nfa, text)
+
+    if literal_text is not None:
+        if not nfa.literal.is_start and not nfa.literal.is_end:
+            return literal_text.count(nfa.literal.text)
+
+        return sum(
+            1 for _ in _finditer_literal(nfa.literal, literal_text))
+
+    return sum(1 for _ in _finditer(nfa, _text(nfa, text)))
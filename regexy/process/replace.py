@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+"""
+Substitution of regular expression matches
+
+:private:
+"""
+
+import io
+import functools
+from typing import (
+    List,
+    Union,
+    Callable)
+
+from ..compile.compile import NFA
+from ..shared import Flags
+from .match import (
+    Match,
+    NFAType,
+    _nfa,
+    _finditer_between,
+    _text,
+    _to_match)
+from .text import TextType
+
+
+__all__ = ['sub']
+
+
+ReplType = Union[str, bytes, Callable[[Match], str]]
+ReplPartType = Union[str, bytes, int]
+
+
+def _parse_repl(repl: Union[str, bytes], nfa: NFA) -> List[ReplPartType]:
+    """
+    Parse a replacement string into a list\
+    of literals (``str``) and group indexes (``int``)
+
+    Supported references are ``\\N``,\
+    ``\\g<N>`` and ``\\g<name>``. Group\
+    indexes are the same as ``Match.group`` ones.\
+    A backslash may be escaped as ``\\\\``
+
+    A ``bytes`` replacement is parsed\
+    into ``bytes`` literals
+
+    :param repl: replacement string
+    :param nfa: a NFA
+    :return: parsed replacement
+    :raise ValueError: if a referenced\
+    group is not in the regex
+    :private:
+    """
+    if isinstance(repl, bytes):
+        return [
+            part.encode('latin-1') if isinstance(part, str) else part
+            for part in _parse_repl(repl.decode('latin-1'), nfa)]
+
+    parts = []
+    literal = []
+    i = 0
+
+    while i < len(repl):
+        char = repl[i]
+
+        if char != '\\':
+            literal.append(char)
+            i += 1
+            continue
+
+        next_char = repl[i + 1:i + 2]
+
+        if next_char.isdigit():
+            end = i + 1
+
+            while repl[end:end + 1].isdigit():
+                end += 1
+
+            ref = repl[i + 1:end]
+            i = end
+        elif repl.startswith('g<', i + 1):
+            end = repl.index('>', i + 3)
+            ref = repl[i + 3:end]
+            i = end + 1
+        else:
+            literal.append(
+                '\\' if next_char == '\\' else char + next_char)
+            i += 2
+            continue
+
+        if literal:
+            parts.append(''.join(literal))
+            literal.clear()
+
+        if ref.isdigit() and int(ref) < nfa.groups_count:
+            parts.append(int(ref))
+        elif ref in nfa.named_groups:
+            parts.append(nfa.named_groups[ref])
+        else:
+            raise ValueError('Unknown group %r' % ref)
+
+    if literal:
+        parts.append(''.join(literal))
+
+    return parts
+
+
+def _expand(
+        parts: List[ReplPartType],
+        empty: Union[str, bytes],
+        m: Match) -> Union[str, bytes]:
+    """
+    Build the replacement for a match.\
+    Repeated groups are replaced\
+    by their last repetition and\
+    unmatched groups by an empty string
+
+    :param parts: parsed replacement
+    :param empty: an empty ``str`` or ``bytes``
+    :param m: the match to replace
+    :return: the replacement
+    :private:
+    """
+    expanded = []
+
+    for part in parts:
+        if not isinstance(part, int):
+            expanded.append(part)
+            continue
+
+        group = m.group(part)
+
+        if isinstance(group, tuple):
+            group = group[-1] if group else None
+
+        expanded.append(group or empty)
+
+    return empty.join(expanded)
+
+
+def sub(
+        nfa: NFAType,
+        repl: ReplType,
+        text: TextType,
+        out: Union[io.TextIOBase, Callable[[str], None]]=None) -> Union[str, None]:
+    """
+    Replace every non-overlapping match\
+    in the text by the replacement
+
+    The replacement may be a string\
+    containing group references\
+    (``\\0``, ``\\g<0>``, ``\\g<name>``) or\
+    a function that takes a ``Match``\
+    and returns a string
+
+    The text is read once. The output is\
+    written to ``out`` (a file-like object or\
+    a callback) as soon as it's known,\
+    so only the text that may still belong\
+    to a match is kept in memory.\
+    If ``out`` is not passed,\
+    the result is returned as a string
+
+    :param nfa: a NFA or an expression
+    :param repl: replacement string or function
+    :param text: a text to match against
+    :param out: file-like object or callback\
+    the output will be written to
+    :return: the resulting text\
+    or ``None`` if ``out`` is passed
+    :raise ValueError: if the replacement\
+    references a group not in the regex
+    """
+    nfa = _nfa(nfa)
+    empty = b'' if nfa.flags & Flags.BYTES else ''
+
+    if out is None:
+        result = []
+        write = result.append
+    else:
+        write = getattr(out, 'write', out)
+
+    if callable(repl):
+        expand = repl
+    else:
+        expand = functools.partial(
+            _expand, _parse_repl(repl, nfa), empty)
+
+    for found in _finditer_between(nfa, _text(nfa, text), write):
+        write(expand(_to_match(nfa, found)))
+
+    if out is None:
+        return empty.join(result)
+
+    return None
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+"""
+Splitting of text by regular expression matches
+
+:private:
+"""
+
+from typing import (
+    Iterator,
+    Union,
+    Tuple)
+
+from ..shared import Flags
+from .match import (
+    NFAType,
+    _nfa,
+    _finditer_between,
+    _text,
+    _to_match)
+from .text import TextType
+
+
+__all__ = ['split']
+
+
+def split(
+        nfa: NFAType,
+        text: TextType,
+        maxsplit: int=0) -> Iterator[Union[str, bytes, Tuple[str], None]]:
+    """
+    Split the text by the matches\
+    of the regular expression
+
+    If the regex contains capturing groups,\
+    then the groups of every match are\
+    yielded after the piece preceding it,\
+    same as Python's ``re.split``
+
+    Every piece is yielded as soon as the\
+    match that ends it is found, so this\
+    works on streams. Only the current\
+    piece is kept in memory
+
+    :param nfa: a NFA or an expression
+    :param text: a text to split
+    :param maxsplit: max number of splits\
+    or ``0`` for no limit. The rest of the\
+    text is yielded as the last piece
+    :return: an iterator of pieces and groups
+    """
+    nfa = _nfa(nfa)
+    empty = b'' if nfa.flags & Flags.BYTES else ''
+    piece = []
+
+    for found in _finditer_between(
+            nfa, _text(nfa, text), piece.append, count=maxsplit):
+        yield empty.join(piece)
+        piece.clear()
+        yield from _to_match(nfa, found).groups()
+
+    yield empty.join(piece)
@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tools for reading the text to match
+
+:private:
+"""
+
+import io
+import mmap
+import functools
+import collections
+from typing import (
+    Iterator,
+    Callable,
+    List,
+    Union)
+
+
+__all__ = [
+    'Text',
+    'TextType']
+
+
+CHUNK_SIZE = 64 * 1024
+
+BYTES_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
+
+TextType = Union[
+    str,
+    Iterator[str],
+    io.TextIOBase,
+    bytes,
+    bytearray,
+    memoryview,
+    mmap.mmap,
+    Iterator[bytes],
+    io.BufferedIOBase,
+    io.RawIOBase]
+
+
+def _join(parts: List[Union[str, bytes, memoryview]]) -> Union[str, bytes]:
+    if isinstance(parts[0], str):
+        return ''.join(parts)
+
+    return b''.join(parts)
+
+
+class Text:
+    """
+    A buffered window over the text to match.\
+    The text may be a string, a text stream\
+    (i.e: a file open in text mode) or\
+    an iterable of string chunks of any\
+    size (i.e: ``read(n)`` results or chars)
+
+    The text is read one chunk at a time,\
+    and only when more text is needed
+
+    In bytes mode the text may be any\
+    bytes-like object (i.e: ``bytes``,\
+    ``memoryview``, ``mmap``), a binary stream\
+    or an iterable of bytes-like chunks.\
+    Bytes-like objects are not copied,\
+    they are read through a ``memoryview``
+
+    Only the unread part and whatever\
+    was not discarded is kept in memory,\
+    so it's possible to go back and re-read\
+    a bounded part of a stream
+
+    The text moved out of the buffer\
+    (see ``shift``) is kept as a list of\
+    parts until it's discarded, so it's\
+    not copied every time a chunk is read
+
+    :ivar on_discard: a callback to be notified\
+    of every discarded part of the text
+    :ivar str buffer: the buffered text
+    :ivar int offset: absolute position\
+    of the first char of the buffer
+    :ivar bool is_eof: whether the text\
+    was fully read
+    :ivar int size: length of the text\
+    or ``None`` if it's a stream
+    :private:
+    """
+
+    __slots__ = (
+        '_chunks',
+        '_kept',
+        '_kept_size',
+        'on_discard',
+        'buffer',
+        'offset',
+        'is_eof',
+        'size')
+
+    def __init__(self, text: TextType) -> None:
+        self.size = None  # type: int
+
+        if isinstance(text, str):
+            self.size = len(text)
+            text = (text,)
+        elif isinstance(text, BYTES_TYPES):
+            text = (memoryview(text).cast('B'),)
+            self.size = len(text[0])
+        elif isinstance(text, io.TextIOBase):
+            text = iter(functools.partial(text.read, CHUNK_SIZE), '')
+        elif isinstance(text, (io.BufferedIOBase, io.RawIOBase)):
+            text = iter(functools.partial(text.read, CHUNK_SIZE), b'')
+
+        self._chunks = iter(text)
+        self._kept = collections.deque()
+        self._kept_size = 0
+        self.on_discard = None  # type: Callable[[int, str], None]
+        self.buffer = ''
+        self.offset = 0
+        self.is_eof = False
+
+    def fill(self) -> bool:
+        """
+        Read more text into the buffer
+
+        :return: whether there was more text to read
+        :private:
+        """
+        for chunk in self._chunks:
+            if not chunk:
+                continue
+
+            if not self.buffer:
+                self.buffer = chunk
+            elif isinstance(self.buffer, str):
+                self.buffer += chunk
+            else:
+                self.buffer = bytes(self.buffer) + chunk
+
+            return True
+
+        self.is_eof = True
+        return False
+
+    def _notify(self, offset: int, parts: List[Union[str, bytes]]) -> None:
+        if self.on_discard is None or not parts:
+            return
+
+        if len(parts) == 1:
+            self.on_discard(offset, parts[0])
+            return
+
+        self.on_discard(offset, _join(parts))
+
+    def discard(self, pos: int) -> None:
+        """
+        Remove the buffered text before\
+        the given absolute position
+
+        :param pos: absolute position
+        :private:
+        """
+        offset = self.offset - self._kept_size
+        discarded = []
+
+        while self._kept and pos > self.offset - self._kept_size:
+            part = self._kept.popleft()
+            count = pos - (self.offset - self._kept_size)
+
+            if count < len(part):
+                self._kept.appendleft(part[count:])
+                part = part[:count]
+
+            self._kept_size -= len(part)
+            discarded.append(part)
+
+        if self._kept:
+            self._notify(offset, discarded)
+            return
+
+        count = min(pos - self.offset, len(self.buffer))
+
+        if count > 0:
+            discarded.append(self.buffer[:count])
+            self.buffer = self.buffer[count:]
+            self.offset += count
+
+        self._notify(offset, discarded)
+
+    def shift(self, pos: int) -> None:
+        """
+        Move the buffered text before the\
+        given absolute position out of the\
+        buffer, so it's not copied when\
+        more text is read. The text is kept\
+        until it's discarded if someone is\
+        notified of the discarded text,\
+        otherwise it's discarded right away
+
+        :param pos: absolute position
+        :private:
+        """
+        if self.on_discard is None:
+            self.discard(pos)
+            return
+
+        count = min(pos - self.offset, len(self.buffer))
+
+        if count <= 0:
+            return
+
+        self._kept.append(self.buffer[:count])
+        self._kept_size += count
+        self.buffer = self.buffer[count:]
+        self.offset += count
+
+    def span(
+            self,
+            start: int,
+            end: int=None) -> Union[str, bytes, memoryview]:
+        """
+        Return the text between the given\
+        absolute positions. The text that\
+        was discarded is left out
+
+        :param start: absolute position
+        :param end: absolute position (exclusive)\
+        or ``None`` for the rest of the buffer
+        :return: the text
+        :private:
+        """
+        if end is None:
+            end = self.offset + len(self.buffer)
+
+        if start >= self.offset:
+            return self.buffer[start - self.offset:end - self.offset]
+
+        parts = []
+        offset = self.offset - self._kept_size
+
+        for part in self._kept + collections.deque((self.buffer,)):
+            if offset + len(part) > start and offset < end:
+                parts.append(part[max(start - offset, 0):end - offset])
+
+            offset += len(part)
+
+        if not parts:
+            return self.buffer[:0]
+
+        return _join(parts)
+
+    def close(self) -> None:
+        """
+        Drop the buffered text and release\
+        the ``memoryview`` over it, if any.\
+        This allows closing a ``mmap``\
+        while the text is still referenced
+
+        :private:
+        """
+        for part in self._kept + collections.deque((self.buffer,)):
+            if isinstance(part, memoryview):
+                part.release()
+
+        self._chunks = iter(())
+        self._kept.clear()
+        self._kept_size = 0
+        self.buffer = ''
+        self.is_eof = True
+
+    def chunks(self) -> Iterator[Union[str, memoryview]]:
+        """
+        Read the rest of the text one chunk\
+        at a time, without buffering it.\
+        The text can't be read again
+
+        :return: the chunks of the text
+        :private:
+        """
+        while self._kept:
+            yield self._kept.popleft()
+
+        self._kept_size = 0
+
+        if self.buffer:
+            yield self.buffer
+
+        self.buffer = self.buffer[:0]
+        yield from self._chunks
+        self.is_eof = True
+
+    def char_at(self, pos: int) -> str:
+        """
+        Return the char at the given absolute\
+        position or an empty string if it's\
+        out of the text boundaries. Chars\
+        are ints in bytes mode
+
+        The position must not be\
+        before the buffer offset
+
+        :param pos: absolute position
+        :return: a char or empty string
+        :private:
+        """
+        if pos < 0:
+            return ''
+
+        index = pos - self.offset
+        assert index >= 0
+
+        while index >= len(self.buffer):
+            if self.is_eof or not self.fill():
+                return ''
+
+        return self.buffer[index]
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+
+"""
+Matching for regular expressions\
+over many texts at once with NumPy
+
+Texts are turned into a matrix\
+of char classes and a DFA is run\
+for all of them at the same time,\
+one position at a time. This is\
+meant for many short texts, since\
+texts are padded to the longest one
+
+NumPy is optional, it's only\
+required by these functions
+
+:private:
+"""
+
+from typing import (
+    Iterable,
+    List,
+    Tuple,
+    Union)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from ..compile.compile import NFA
+from ..compile.alphabet import (
+    Alphabet,
+    nfa_alphabet)
+from ..compile.dfa import (
+    DFA,
+    START,
+    to_dfa)
+from ..shared import (
+    Flags,
+    exceptions)
+from . import captures
+from .match import (
+    NFAType,
+    _Setup,
+    _find,
+    _nfa,
+    _text)
+
+
+__all__ = [
+    'match_mask',
+    'full_match_mask',
+    'search_mask',
+    'match_ends',
+    'extract_many']
+
+
+TextsType = Iterable[Union[str, bytes]]
+
+
+def _check_numpy() -> None:
+    if numpy is None:
+        raise ImportError(
+            'NumPy is required by this function')
+
+
+def _encode(
+        texts: List[Union[str, bytes]],
+        is_bytes: bool) -> Tuple['numpy.ndarray', 'numpy.ndarray']:
+    """
+    Return the chars (code units)\
+    of all texts in a flat array,\
+    and the length of every text
+
+    :private:
+    """
+    lengths = numpy.fromiter(
+        (len(text) for text in texts),
+        dtype=numpy.int64,
+        count=len(texts))
+
+    if is_bytes:
+        codes = numpy.frombuffer(b''.join(texts), dtype=numpy.uint8)
+    else:
+        codes = numpy.frombuffer(
+            ''.join(texts).encode('utf-32-le', 'surrogatepass'),
+            dtype='<u4')
+
+    return codes, lengths
+
+
+def _classes(
+        nfa: NFA,
+        alphabet: Alphabet,
+        texts: List[Union[str, bytes]]) -> Tuple[
+            'numpy.ndarray', 'numpy.ndarray']:
+    """
+    Turn the texts into classes of chars\
+    (see ``NFA.alphabet``). The class of\
+    every char is looked up by bisecting\
+    the alphabet intervals
+
+    :return: a matrix of classes by position\
+    and text, and the length of every text.\
+    Past the end of a text, the class is\
+    the last one plus one (padding)
+    :private:
+    """
+    codes, lengths = _encode(texts, bool(nfa.flags & Flags.BYTES))
+    intervals = numpy.searchsorted(
+        numpy.frombuffer(alphabet.starts, dtype=numpy.uint32),
+        codes,
+        side='right') - 1
+    width = int(lengths.max()) if len(lengths) else 0
+    mask = numpy.arange(width) < lengths[:, numpy.newaxis]
+    classes = numpy.full(
+        (len(texts), width), len(alphabet), dtype=numpy.int32)
+    classes[mask] = numpy.frombuffer(
+        alphabet.classes, dtype=numpy.uint32)[intervals]
+
+    # Position major, so every
+    # step reads contiguous memory
+    return numpy.ascontiguousarray(classes.T), lengths
+
+
+def _table(dfa: DFA) -> Tuple['numpy.ndarray', 'numpy.ndarray']:
+    """
+    Return the transitions as a matrix\
+    by state and class, the padding class\
+    does not change the state. Return\
+    whether every state is a match
+
+    :private:
+    """
+    table = numpy.array(dfa.transitions, dtype=numpy.int32).reshape(
+        dfa.states_count, dfa.classes_count)
+    table = numpy.hstack((
+        table,
+        numpy.arange(
+            dfa.states_count, dtype=numpy.int32)[:, numpy.newaxis]))
+    return table, numpy.array(dfa.accepts, dtype=numpy.bool_)
+
+
+def _run(
+        nfa: NFA,
+        texts: TextsType,
+        is_leftmost_first: bool,
+        is_search: bool) -> Tuple['numpy.ndarray', 'numpy.ndarray']:
+    """
+    Run the DFA for all the texts\
+    in lockstep. The DFA built at compile\
+    time is used, if any
+
+    :return: the last position where every\
+    text was in a match state or ``-1``,\
+    and whether it's in a match state\
+    at the end of the text
+    :private:
+    """
+    _check_numpy()
+    texts = list(texts)
+    alphabet = nfa_alphabet(nfa)
+    classes, lengths = _classes(nfa, alphabet, texts)
+
+    if nfa.dfa is None:
+        dfa = to_dfa(
+            nfa,
+            alphabet.chars,
+            is_leftmost_first=is_leftmost_first,
+            is_search=is_search)
+    elif is_search:
+        dfa = nfa.dfa.search
+    elif is_leftmost_first:
+        dfa = nfa.dfa.match
+    else:
+        dfa = nfa.dfa.full_match
+
+    table, accepts = _table(dfa)
+    states = numpy.full(len(texts), START, dtype=numpy.int32)
+    ends = numpy.where(accepts[states], 0, -1)
+
+    for pos, pos_classes in enumerate(classes):
+        states = table[states, pos_classes]
+        ends[accepts[states] & (pos < lengths)] = pos + 1
+
+        if not states.any():
+            break
+
+    return ends, accepts[states]
+
+
+def match_mask(nfa: NFAType, texts: TextsType) -> 'numpy.ndarray':
+    """
+    Return whether every text matches.\
+    Same as ``match`` returning a ``Match``
+
+    The regex must not contain assertions
+
+    :param nfa: a NFA or an expression
+    :param texts: texts to match
+    :return: a boolean array
+    :raise ValueError: if the regex\
+    contains assertions or is too large
+    :raise ImportError: if NumPy is not installed
+    """
+    nfa = _nfa(nfa)
+    ends, _is_end_match = _run(
+        nfa, texts, is_leftmost_first=True, is_search=False)
+    return ends >= 0
+
+
+def full_match_mask(nfa: NFAType, texts: TextsType) -> 'numpy.ndarray':
+    """
+    Return whether every text fully matches.\
+    Same as ``full_match`` returning a ``Match``.\
+    See ``match_mask``
+
+    :param nfa: a NFA or an expression
+    :param texts: texts to match
+    :return: a boolean array
+    """
+    nfa = _nfa(nfa)
+    _ends, is_end_match = _run(
+        nfa, texts, is_leftmost_first=False, is_search=False)
+    return is_end_match
+
+
+def search_mask(nfa: NFAType, texts: TextsType) -> 'numpy.ndarray':
+    """
+    Return whether every text contains a match.\
+    Same as ``search`` returning a ``Match``.\
+    See ``match_mask``
+
+    :param nfa: a NFA or an expression
+    :param texts: texts to search
+    :return: a boolean array
+    """
+    nfa = _nfa(nfa)
+    ends, _is_end_match = _run(
+        nfa, texts, is_leftmost_first=False, is_search=True)
+    return ends >= 0
+
+
+def match_ends(nfa: NFAType, texts: TextsType) -> 'numpy.ndarray':
+    """
+    Return where the match of every\
+    text ends or ``-1`` if there is\
+    no match. Same as ``Match.end``\
+    of ``match``. See ``match_mask``
+
+    :param nfa: a NFA or an expression
+    :param texts: texts to match
+    :return: an integer array
+    """
+    nfa = _nfa(nfa)
+    ends, _is_end_match = _run(
+        nfa, texts, is_leftmost_first=True, is_search=False)
+    return ends
+
+
+def extract_many(
+        nfa: NFAType,
+        texts: TextsType,
+        is_text: bool=False) -> List['numpy.ndarray']:
+    """
+    Search every text and return\
+    a column for every group, this is\
+    the start and end of the group in every\
+    text, or ``(-1, -1)`` if it did not match.\
+    Repeated groups are the last repetition
+
+    The texts with a match are found by\
+    running the DFA for all of them\
+    at once (see ``search_mask``). Only\
+    those are searched for the groups.\
+    If the regex contains assertions,\
+    all of them are searched
+
+    :param nfa: a NFA or an expression
+    :param texts: texts to search
+    :param is_text: return the text matched\
+    by the group or ``None`` instead\
+    of the start and end
+    :return: a column for every group
+    :raise ImportError: if NumPy is not installed
+    """
+    nfa = _nfa(nfa)
+    _check_numpy()
+    texts = list(texts)
+
+    try:
+        ends, _is_end_match = _run(
+            nfa, texts, is_leftmost_first=False, is_search=True)
+        candidates = numpy.flatnonzero(ends >= 0).tolist()
+    except ValueError:
+        candidates = range(len(texts))
+
+    spans = numpy.full(
+        (len(texts), nfa.groups_count, 2), -1, dtype=numpy.int64)
+    setup = _Setup(nfa)
+
+    for i in candidates:
+        try:
+            captured, start, _end = _find(
+                nfa, _text(nfa, texts[i]), setup=setup)
+        except exceptions.MatchError:
+            continue
+
+        if nfa.groups_count:
+            spans[i] = captures.spans(captured, nfa.groups_count, start)
+
+    if not is_text:
+        return [spans[:, g] for g in range(nfa.groups_count)]
+
+    columns = []
+
+    for g in range(nfa.groups_count):
+        column = numpy.empty(len(texts), dtype=object)
+        column[:] = [
+            text[start:end] if start >= 0 else None
+            for text, (start, end) in zip(texts, spans[:, g].tolist())]
+        columns.append(column)
+
+    return columns
@@ -5,11 +5,13 @@ Internally shared resources
 """
 
 from .symbols import Symbols
+from .flags import Flags
 from . import nodes
 from . import exceptions
 
 
 __all__ = [
     'Symbols',
+    'Flags',
     'nodes',
     'exceptions']
@@ -28,14 +28,12 @@ class StatesSet:
         return self._list[item]
 
     def extend(self, items):
-        items = tuple(
-            item
-            for item in items
-            if item[self.STATE] not in self._set)
-        self._list.extend(items)
-        self._set.update(
-            item[self.STATE]
-            for item in items)
+        for item in items:
+            state = item[self.STATE]
+
+            if state not in self._set:
+                self._set.add(state)
+                self._list.append(item)
 
     def clear(self):
         self._list.clear()
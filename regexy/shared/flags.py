@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module contains the flags\
+a regular expression may be compiled with
+"""
+
+__all__ = ['Flags']
+
+
+class Flags:
+    """
+    Compiling flags. They may be combined (i.e: ``A | B``)
+
+    :ivar int BYTES: match ``bytes`` (and other bytes-like\
+    objects) instead of ``str``. Offsets are byte offsets.\
+    Shorthands (``\\w``, etc) match ASCII chars only.\
+    This is implied when the regex is ``bytes``
+    :ivar int UTF8: match UTF-8 encoded bytes without\
+    decoding them. Chars and char classes match the byte\
+    sequences of the chars they match. Assertions\
+    (``\b``, lookaheads of a single char)\
+    consider ASCII chars only.\
+    This implies ``BYTES``
+    :ivar int IGNORECASE: match chars regardless\
+    of their case. The regex is folded when it's\
+    compiled, the text is matched as it is.\
+    Only ASCII chars are folded in bytes mode,\
+    and in lookaheads of a single\
+    char in UTF-8 mode
+    :ivar int MULTILINE: ``^`` and ``$`` match at\
+    the start and end of every line as well.\
+    ``\\A`` and ``\\z`` match at the start\
+    and end of the text only
+    :public:
+    """
+    BYTES = 1
+    UTF8 = 2
+    IGNORECASE = 4
+    MULTILINE = 8
@@ -8,12 +8,20 @@ the node types of the NFA
 :private:
 """
 
+import bisect
+import functools
 import unicodedata
 from typing import (
+    Dict,
+    FrozenSet,
+    List,
     Sequence,
     Callable,
     Iterator,
-    Tuple)
+    Tuple,
+    Union)
+
+from .symbols import Symbols
 
 __all__ = [
     'Node',
@@ -27,7 +35,8 @@ __all__ = [
     'AlphaNumNode',
     'DigitNode',
     'StartNode',
-    'EndNode']
+    'EndNode',
+    'LookaheadNFANode']
 
 
 class Node:
@@ -45,6 +54,43 @@ class Node:
     def __repr__(self) -> str:
         return repr((self.char, self.out))
 
+    def to_bytes(self) -> None:
+        """
+        Convert the node to match bytes\
+        (ints) instead of chars
+
+        :private:
+        """
+
+    def to_utf8(self) -> None:
+        """
+        Convert the node to match UTF-8\
+        encoded bytes instead of chars.\
+        Char nodes can't be converted in place,\
+        they must be expanded into byte nodes
+
+        :private:
+        """
+        self.to_bytes()
+
+    def to_ignore_case(self, is_ascii: bool=False) -> None:
+        """
+        Convert the node to match chars\
+        regardless of their case
+
+        :param is_ascii: whether to\
+        fold ASCII chars only
+        :private:
+        """
+
+    def to_multiline(self) -> None:
+        """
+        Convert the node to match at the\
+        start and end of every line
+
+        :private:
+        """
+
 
 class CharNode(Node):
     """
@@ -52,12 +98,46 @@ class CharNode(Node):
     against regular text characters
 
     :ivar is_captured: set this node for capturing
+    :ivar literal: the chars of the run\
+    this node starts, if any, matched\
+    in one step (see ``nfa.literals``)
+    :ivar literal_last: the last node of the run
     :private:
     """
+    literal = None  # type: Union[str, bytes]
+    literal_last = None  # type: CharNode
+
     def __init__(self, *, is_captured: bool=False, **kwargs) -> None:
         super().__init__(**kwargs)
         self.is_captured = is_captured
 
+    def to_bytes(self) -> None:
+        # The char was turned into
+        # a set by ``to_ignore_case``
+        if not isinstance(self.char, str):
+            self.char = BytesMatcher(
+                char=str(self.char),
+                values=self.char.bytes_values())
+            return
+
+        if ord(self.char) > 0xff:
+            raise ValueError(
+                'Char %r is not a byte' % self.char)
+
+        self.char = ord(self.char)
+
+    def to_ignore_case(self, is_ascii: bool=False) -> None:
+        if not isinstance(self.char, str):
+            return
+
+        chars = case_variants(self.char, is_ascii)
+
+        if len(chars) > 1:
+            self.char = SetMatcher(
+                chars=chars,
+                ranges=(),
+                shorthands=())
+
 
 class SymbolNode(Node):
     """
@@ -108,7 +188,22 @@ class AssertionNode(SymbolNode):
         raise NotImplementedError
 
 
+# Line break in str and bytes mode
+LINE_BREAKS = ('\n', 0x0a)
+
+
 class StartNode(AssertionNode):
+    """
+    Match at the start of the text.\
+    In multi-line mode ``^`` matches\
+    at the start of every line as well
+
+    :ivar bool is_multiline: whether it\
+    matches after a line break
+    :private:
+    """
+
+    is_multiline = False
 
     def __init__(self, *, char: str, **kwargs) -> None:
         if char == 'A':
@@ -116,11 +211,25 @@ class StartNode(AssertionNode):
 
         super().__init__(char=char, **kwargs)
 
+    def to_multiline(self) -> None:
+        self.is_multiline = self.char == Symbols.START
+
     def match(self, char, next_char):
-        return not char
+        return char == '' or (self.is_multiline and char in LINE_BREAKS)
 
 
 class EndNode(AssertionNode):
+    """
+    Match at the end of the text.\
+    In multi-line mode ``$`` matches\
+    at the end of every line as well
+
+    :ivar bool is_multiline: whether it\
+    matches before a line break
+    :private:
+    """
+
+    is_multiline = False
 
     def __init__(self, *, char: str, **kwargs) -> None:
         if char == 'z':
@@ -128,8 +237,19 @@ class EndNode(AssertionNode):
 
         super().__init__(char=char, **kwargs)
 
+    def to_multiline(self) -> None:
+        self.is_multiline = self.char == Symbols.END
+
     def match(self, char, next_char):
-        return not next_char
+        return next_char == '' or (
+            self.is_multiline and next_char in LINE_BREAKS)
+
+
+def _is_word(char) -> bool:
+    if isinstance(char, int):
+        return char < 0x80 and chr(char).isalnum()
+
+    return char.isalnum()
 
 
 class WordBoundaryNode(AssertionNode):
@@ -140,11 +260,11 @@ class WordBoundaryNode(AssertionNode):
             **kwargs)
 
     def match(self, char, next_char):
-        is_char_w = char.isalnum()
-        is_next_char_w = next_char.isalnum()
+        is_char_w = _is_word(char)
+        is_next_char_w = _is_word(next_char)
         return (
-            (not char and is_next_char_w) or
-            (is_char_w and not next_char) or
+            (char == '' and is_next_char_w) or
+            (is_char_w and next_char == '') or
             (is_char_w and not is_next_char_w) or
             (not is_char_w and is_next_char_w))
 
@@ -157,15 +277,23 @@ class NotWordBoundaryNode(AssertionNode):
             **kwargs)
 
     def match(self, char, next_char):
-        is_char_w = char.isalnum()
-        is_next_char_w = next_char.isalnum()
+        is_char_w = _is_word(char)
+        is_next_char_w = _is_word(next_char)
         return not (
-            (not char and is_next_char_w) or
-            (is_char_w and not next_char) or
+            (char == '' and is_next_char_w) or
+            (is_char_w and next_char == '') or
             (is_char_w and not is_next_char_w) or
             (not is_char_w and is_next_char_w))
 
 
+def _check_ascii_lookahead(node: CharNode) -> None:
+    # The lookahead peeks a single byte
+    if isinstance(node.char, str) and ord(node.char) > 0x7f:
+        raise ValueError(
+            'Lookahead of a non-ASCII char (%r) '
+            'is not supported in UTF-8 mode' % node.char)
+
+
 class LookaheadNode(AssertionNode):
 
     def __init__(self, *, node, **kwargs) -> None:
@@ -175,6 +303,18 @@ class LookaheadNode(AssertionNode):
     def match(self, char, next_char):
         return next_char == self._node.char
 
+    def to_bytes(self) -> None:
+        self._node.to_bytes()
+        self.char = '?=%s' % self._node
+
+    def to_ignore_case(self, is_ascii: bool=False) -> None:
+        self._node.to_ignore_case(is_ascii)
+        self.char = '?=%s' % self._node
+
+    def to_utf8(self) -> None:
+        _check_ascii_lookahead(self._node)
+        self.to_bytes()
+
 
 class NotLookaheadNode(AssertionNode):
 
@@ -185,6 +325,52 @@ class NotLookaheadNode(AssertionNode):
     def match(self, char, next_char):
         return next_char != self._node.char
 
+    def to_bytes(self) -> None:
+        self._node.to_bytes()
+        self.char = '?!%s' % self._node
+
+    def to_ignore_case(self, is_ascii: bool=False) -> None:
+        self._node.to_ignore_case(is_ascii)
+        self.char = '?!%s' % self._node
+
+    def to_utf8(self) -> None:
+        _check_ascii_lookahead(self._node)
+        self.to_bytes()
+
+
+class LookaheadNFANode(AssertionNode):
+    """
+    A lookahead of a sub-pattern of\
+    more than one char (i.e: ``(?=ab)``).\
+    The sub-pattern gets compiled into\
+    a NFA of its own, it's matched along\
+    the text by the threads reaching\
+    the node (see ``process.match``).\
+    Groups within the sub-pattern\
+    don't capture
+
+    :ivar str expression: the sub-pattern
+    :ivar bool is_negative: whether the\
+    sub-pattern must not match
+    :ivar Node state: the first node of\
+    the sub-pattern NFA, this is set\
+    when compiling the regex
+    :private:
+    """
+
+    def __init__(
+            self,
+            *,
+            expression: str,
+            is_negative: bool=False,
+            **kwargs) -> None:
+        super().__init__(
+            char='%s%s' % ('?!' if is_negative else '?=', expression),
+            **kwargs)
+        self.expression = expression
+        self.is_negative = is_negative
+        self.state = None  # type: Node
+
 
 class RepetitionRangeNode(OpNode):
 
@@ -197,27 +383,339 @@ class RepetitionRangeNode(OpNode):
 
 
 class ShorthandNode(CharNode):
-    """"""
+    """
+    Shorthands match ASCII\
+    chars only in bytes mode
+
+    :private:
+    """
+
+    def to_bytes(self) -> None:
+        self.char = BytesMatcher(
+            char=str(self.char),
+            values=self.char.bytes_values())
+
+
+# Code points that can be encoded
+# as UTF-8, this excludes surrogates
+CODE_POINTS = (
+    (0, 0xd7ff),
+    (0xe000, 0x10ffff))
+
+SURROGATES = (0xd800, 0xdfff)
+
+ALL_CODE_POINTS = ((0, 0x10ffff),)
+
+
+def _merge_ranges(ranges: Iterator[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    Sort and merge overlapping\
+    and adjacent code point ranges
+
+    :private:
+    """
+    merged = []
+
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+
+    return merged
+
+
+def _complement_ranges(
+        ranges: List[Tuple[int, int]],
+        code_points: Sequence[Tuple[int, int]]=CODE_POINTS) -> List[Tuple[int, int]]:
+    """
+    Return the code points (see ``CODE_POINTS``)\
+    not in the given merged ranges
+
+    :private:
+    """
+    complement = []
+
+    for cp_start, cp_end in code_points:
+        curr = cp_start
+
+        for start, end in ranges:
+            if end < curr or start > cp_end:
+                continue
+
+            if start > curr:
+                complement.append((curr, start - 1))
+
+            curr = end + 1
+
+        if curr <= cp_end:
+            complement.append((curr, cp_end))
+
+    return complement
+
+
+def _scan_code_points(compare: Callable[[str], bool]) -> List[Tuple[int, int]]:
+    """
+    Return the ranges of code points\
+    matched by the compare function.\
+    This goes through every code point,\
+    so it takes a while
+
+    :private:
+    """
+    ranges = []
+
+    for cp_start, cp_end in CODE_POINTS:
+        start = None
+
+        for cp in range(cp_start, cp_end + 1):
+            if compare(chr(cp)):
+                if start is None:
+                    start = cp
+            elif start is not None:
+                ranges.append((start, cp - 1))
+                start = None
+
+        if start is not None:
+            ranges.append((start, cp_end))
+
+    return _merge_ranges(ranges)
+
+
+# Code point ranges of shorthands by char
+_code_point_ranges_cache = {}
+
+
+def _fold(char: str) -> str:
+    """
+    Return the char all the chars\
+    matching the given one regardless\
+    of their case fold to (i.e: ``s``\
+    for ``S`` and ``\u017f``)
+
+    :private:
+    """
+    upper = char.upper()
+
+    if len(upper) != 1:
+        upper = char
+
+    lower = upper.lower()
+    return lower if len(lower) == 1 else upper
+
+
+@functools.lru_cache(maxsize=1)
+def _case_table() -> Tuple[Dict[str, FrozenSet[str]], List[int]]:
+    """
+    Return the chars matching every\
+    cased char regardless of their case,\
+    and the code points of the cased chars,\
+    sorted. This goes through every code\
+    point, so it takes a while. It's\
+    computed once and only if needed
+
+    :private:
+    """
+    folded = {}
+
+    for cp_start, cp_end in CODE_POINTS:
+        for cp in range(cp_start, cp_end + 1):
+            char = chr(cp)
+
+            if char.lower() != char or char.upper() != char:
+                folded.setdefault(_fold(char), set()).add(char)
+
+    table = {}
+
+    for chars in folded.values():
+        if len(chars) > 1:
+            chars = frozenset(chars)
+            table.update((char, chars) for char in chars)
+
+    return table, sorted(ord(char) for char in table)
+
+
+def case_variants(char: str, is_ascii: bool=False) -> FrozenSet[str]:
+    """
+    Return the chars matching the\
+    given one regardless of their case,\
+    including the given one
+
+    :param char: a char
+    :param is_ascii: whether to\
+    fold ASCII chars only
+    :return: the chars
+    :private:
+    """
+    if is_ascii:
+        if char < '\x80' and char.isalpha():
+            return frozenset((char.lower(), char.upper()))
+
+        return frozenset((char,))
+
+    return _case_table()[0].get(char, frozenset((char,)))
+
+
+def _cased_between(start: str, end: str, is_ascii: bool) -> Iterator[str]:
+    """
+    Return the cased chars within\
+    the range (inclusive)
+
+    :private:
+    """
+    if is_ascii:
+        for cp in range(ord(start), min(ord(end), 0x7f) + 1):
+            if chr(cp).isalpha():
+                yield chr(cp)
+
+        return
+
+    cased = _case_table()[1]
+
+    for i in range(
+            bisect.bisect_left(cased, ord(start)),
+            bisect.bisect_right(cased, ord(end))):
+        yield chr(cased[i])
+
+
+class BytesMatcher:
+    """
+    Match a byte (int) against a set of bytes
+
+    :private:
+    """
+
+    def __init__(self, *, char: str, values: Iterator[int]) -> None:
+        self.char = char
+        self._values = frozenset(values)
+
+    def __eq__(self, other: int) -> bool:
+        return other in self._values
+
+    def code_point_ranges(
+            self,
+            is_surrogates: bool=False) -> List[Tuple[int, int]]:
+        """
+        Return the matching byte ranges
+
+        :private:
+        """
+        return _merge_ranges((b, b) for b in self._values)
+
+    def __repr__(self) -> str:
+        return self.char
 
 
 class CharMatcher:
+    """
+    Match a char using a compare function
+
+    :ivar is_complement: whether this matches\
+    the complement of an ASCII class,\
+    so it matches any non-ASCII byte
+    :private:
+    """
 
-    def __init__(self, *, char: str, compare: Callable[[str], bool]) -> None:
+    def __init__(
+            self,
+            *,
+            char: str,
+            compare: Callable[[str], bool],
+            is_complement: bool=False) -> None:
         self.char = '\\%s' % char
         self.compare = compare
+        self.is_complement = is_complement
 
     def __eq__(self, other: str) -> bool:
         return self.compare(other)
 
+    def code_point_ranges(
+            self,
+            is_surrogates: bool=False) -> List[Tuple[int, int]]:
+        """
+        Return the matching code point ranges.\
+        These are computed once and cached.\
+        Surrogates are all matched or\
+        none of them is matched
+
+        :param is_surrogates: whether to\
+        include surrogates
+        :private:
+        """
+        if self.char not in _code_point_ranges_cache:
+            _code_point_ranges_cache[self.char] = (
+                _scan_code_points(self.compare))
+
+        ranges = _code_point_ranges_cache[self.char]
+
+        if is_surrogates and self.compare(chr(SURROGATES[0])):
+            return _merge_ranges(ranges + [SURROGATES])
+
+        return ranges
+
+    def bytes_values(self) -> Iterator[int]:
+        """
+        Return the matching bytes.\
+        Only ASCII chars are compared
+
+        :private:
+        """
+        for b in range(0x100):
+            if b < 0x80:
+                if self.compare(chr(b)):
+                    yield b
+            elif self.is_complement:
+                yield b
+
     def __repr__(self) -> str:
         return self.char
 
 
+# Whitespace characters according to python re
+WHITE_SPACES = frozenset(' \t\n\r\f\v')
+
+
+# Compare functions are not lambdas,
+# so matchers can be pickled
+
+
+def _is_alnum(char: str) -> bool:
+    return char.isalnum()
+
+
+def _is_not_alnum(char: str) -> bool:
+    return not char.isalnum()
+
+
+def _is_digit(char: str) -> bool:
+    return char.isdigit()
+
+
+def _is_not_digit(char: str) -> bool:
+    return not char.isdigit()
+
+
+def _is_white_space(char: str) -> bool:
+    # Lookaheads compare the end
+    # of the text, which is empty
+    return (
+        char in WHITE_SPACES or
+        (char != '' and unicodedata.category(char)[0] == 'Z'))
+
+
+def _is_not_white_space(char: str) -> bool:
+    return not _is_white_space(char)
+
+
+def _is_not_new_line(char: str) -> bool:
+    return char != '\n'
+
+
 class AlphaNumNode(ShorthandNode):
 
     def __init__(self, *, char: str, **kwargs) -> None:
         super().__init__(
-            char=CharMatcher(char=char, compare=lambda c: c.isalnum()),
+            char=CharMatcher(char=char, compare=_is_alnum),
             **kwargs)
 
 
@@ -225,23 +723,17 @@ class DigitNode(ShorthandNode):
 
     def __init__(self, *, char: str, **kwargs) -> None:
         super().__init__(
-            char=CharMatcher(char=char, compare=lambda c: c.isdigit()),
+            char=CharMatcher(char=char, compare=_is_digit),
             **kwargs)
 
 
-# Whitespace characters according to python re
-WHITE_SPACES = frozenset(' \t\n\r\f\v')
-
-
 class WhiteSpaceNode(ShorthandNode):
 
     def __init__(self, *, char: str, **kwargs) -> None:
         super().__init__(
             char=CharMatcher(
                 char=char,
-                compare=lambda c: (
-                    c in WHITE_SPACES or
-                    unicodedata.category(c)[0] == 'Z')),
+                compare=_is_white_space),
             **kwargs)
 
 
@@ -251,9 +743,8 @@ class NotWhiteSpaceNode(ShorthandNode):
         super().__init__(
             char=CharMatcher(
                 char=char,
-                compare=lambda c: (
-                    c not in WHITE_SPACES and
-                    unicodedata.category(c)[0] != 'Z')),
+                compare=_is_not_white_space,
+                is_complement=True),
             **kwargs)
 
 
@@ -261,7 +752,10 @@ class NotAlphaNumNode(ShorthandNode):
 
     def __init__(self, *, char: str, **kwargs) -> None:
         super().__init__(
-            char=CharMatcher(char=char, compare=lambda c: not c.isalnum()),
+            char=CharMatcher(
+                char=char,
+                compare=_is_not_alnum,
+                is_complement=True),
             **kwargs)
 
 
@@ -269,7 +763,10 @@ class NotDigitNode(ShorthandNode):
 
     def __init__(self, *, char: str, **kwargs) -> None:
         super().__init__(
-            char=CharMatcher(char=char, compare=lambda c: not c.isdigit()),
+            char=CharMatcher(
+                char=char,
+                compare=_is_not_digit,
+                is_complement=True),
             **kwargs)
 
 
@@ -277,9 +774,14 @@ class AnyNode(CharNode):
 
     def __init__(self, *, char: str, **kwargs) -> None:
         super().__init__(
-            char=CharMatcher(char=char, compare=lambda c: c != '\n'),
+            char=CharMatcher(char=char, compare=_is_not_new_line),
             **kwargs)
 
+    def to_bytes(self) -> None:
+        self.char = BytesMatcher(
+            char=str(self.char),
+            values=(b for b in range(0x100) if self.char == chr(b)))
+
 
 class SetMatcher:
 
@@ -300,6 +802,72 @@ class SetMatcher:
                 for start, end in self._ranges) or
             other in self._shorthands)
 
+    def code_point_ranges(
+            self,
+            is_surrogates: bool=False) -> List[Tuple[int, int]]:
+        """
+        Return the matching code point ranges
+
+        :param is_surrogates: whether to\
+        include surrogates
+        :private:
+        """
+        ranges = [(ord(char), ord(char)) for char in self._chars]
+        ranges.extend(
+            (ord(start), ord(end))
+            for start, end in self._ranges)
+
+        for shorthand in self._shorthands:
+            ranges.extend(shorthand.code_point_ranges(is_surrogates))
+
+        if is_surrogates:
+            return _merge_ranges(ranges)
+
+        # This removes surrogates
+        return _complement_ranges(
+            _complement_ranges(_merge_ranges(ranges)))
+
+    def to_ignore_case(self, is_ascii: bool=False) -> None:
+        """
+        Add the chars matching the chars\
+        and ranges of the set regardless of\
+        their case. Shorthands match chars\
+        of any case already
+
+        :param is_ascii: whether to\
+        fold ASCII chars only
+        :private:
+        """
+        chars = set(self._chars)
+
+        for char in self._chars:
+            chars.update(case_variants(char, is_ascii))
+
+        for start, end in self._ranges:
+            for char in _cased_between(start, end, is_ascii):
+                chars.update(case_variants(char, is_ascii))
+
+        self._chars = frozenset(chars)
+
+    def bytes_values(self) -> Iterator[int]:
+        """
+        Return the matching bytes. Shorthands\
+        match ASCII chars only
+
+        :private:
+        """
+        shorthands = frozenset(
+            b
+            for shorthand in self._shorthands
+            for b in shorthand.bytes_values())
+
+        for b in range(0x100):
+            if (chr(b) in self._chars or
+                    any(start <= chr(b) <= end
+                        for start, end in self._ranges) or
+                    b in shorthands):
+                yield b
+
     def __repr__(self) -> str:
         return '[%s%s%s]' % (
             ''.join(sorted(self._chars)),
@@ -327,6 +895,14 @@ class SetNode(CharNode):
                 shorthands=shorthands),
             **kwargs)
 
+    def to_bytes(self) -> None:
+        self.char = BytesMatcher(
+            char=str(self.char),
+            values=self.char.bytes_values())
+
+    def to_ignore_case(self, is_ascii: bool=False) -> None:
+        self.char.to_ignore_case(is_ascii)
+
 
 class NotSetMatcher:
 
@@ -336,6 +912,20 @@ class NotSetMatcher:
     def __eq__(self, other: str) -> bool:
         return other != self._matcher
 
+    def to_ignore_case(self, is_ascii: bool=False) -> None:
+        self._matcher.to_ignore_case(is_ascii)
+
+    def code_point_ranges(
+            self,
+            is_surrogates: bool=False) -> List[Tuple[int, int]]:
+        return _complement_ranges(
+            self._matcher.code_point_ranges(is_surrogates),
+            ALL_CODE_POINTS if is_surrogates else CODE_POINTS)
+
+    def bytes_values(self) -> Iterator[int]:
+        return frozenset(range(0x100)) - frozenset(
+            self._matcher.bytes_values())
+
     def __repr__(self) -> str:
         return '[^%s]' % repr(self._matcher)[1:-1]
 
@@ -356,6 +946,14 @@ class NotSetNode(CharNode):
                 shorthands=shorthands),
             **kwargs)
 
+    def to_bytes(self) -> None:
+        self.char = BytesMatcher(
+            char=str(self.char),
+            values=self.char.bytes_values())
+
+    def to_ignore_case(self, is_ascii: bool=False) -> None:
+        self.char.to_ignore_case(is_ascii)
+
 
 class SkipNode(Node):
     """
@@ -31,6 +31,7 @@ setup(
     zip_safe=False,
     include_package_data=True,
     install_requires=REQUIREMENTS,
+    extras_require={'numpy': ['numpy']},
     setup_requires=REQUIREMENTS,
     license='MIT License',
     classifiers=[
@@ -1,10 +1,39 @@
 # -*- coding: utf-8 -*-
 
+import io
+import os
+import hashlib
+import importlib.util
+import inspect
+import pickle
+import mmap
+import tempfile
 import unittest
+import unittest.mock
 import logging
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 import regexy
-from regexy.compile import to_atoms
+from regexy.compile import (
+    to_atoms,
+    to_nfa)
+from regexy.compile import cache
+from regexy.compile import codegen
+from regexy.compile import serialize
+from regexy.compile.literal import Literal
+from regexy.compile.alphabet import nfa_alphabet
+from regexy.compile.nfa import all_states
+from regexy.compile.dfa import (
+    to_dfa,
+    DEAD,
+    START)
+from regexy.shared.nodes import CharNode
+from regexy.process.text import Text
+from regexy.process.match import _find
 
 
 logging.disable(logging.CRITICAL)
@@ -34,6 +63,23 @@ def search(expression, text):
         regexy.compile(expression), text)
 
 
+def finditer(expression, text):
+    return [
+        m.span()
+        for m in regexy.finditer(
+            regexy.compile(expression), text)]
+
+
+def sub(expression, repl, text, **kwargs):
+    return regexy.sub(
+        regexy.compile(expression), repl, text, **kwargs)
+
+
+def split(expression, text, **kwargs):
+    return list(regexy.split(
+        regexy.compile(expression), text, **kwargs))
+
+
 def to_nfa_str(expression):
     return str(regexy.compile(expression).state)
 
@@ -615,3 +661,1166 @@ class RegexyTest(unittest.TestCase):
         self.assertEqual(
             new_full_match(r'((?P<bar>a)*b)', 'aab').group_name('bar'),
             ('a', 'a'))
+
+    def test_span(self):
+        self.assertEqual(match('a*', 'aab').span(), (0, 2))
+        self.assertEqual(new_full_match('a*', 'aa').span(), (0, 2))
+        self.assertEqual(search('b+', 'aabbc').span(), (2, 4))
+        self.assertEqual(search('b+', 'aabbc').start(), 2)
+        self.assertEqual(search('b+', 'aabbc').end(), 4)
+        self.assertEqual(search('', 'abc').span(), (0, 0))
+        self.assertEqual(search('$', 'abc').span(), (3, 3))
+
+    def test_finditer(self):
+        self.assertEqual(finditer('a', ''), [])
+        self.assertEqual(finditer('', ''), [(0, 0)])
+        self.assertEqual(finditer('a', 'abab'), [(0, 1), (2, 3)])
+        self.assertEqual(finditer('a|ab', 'abab'), [(0, 1), (2, 3)])
+        self.assertEqual(finditer('ab|b', 'abbab'), [(0, 2), (2, 3), (3, 5)])
+        self.assertEqual(finditer(r'\d*', '12a'), [(0, 2), (2, 2), (3, 3)])
+        self.assertEqual(
+            finditer('x*', 'abxd'),
+            [(0, 0), (1, 1), (2, 3), (3, 3), (4, 4)])
+        self.assertEqual(
+            finditer(r'^|\w+', 'two words'), [(0, 0), (0, 3), (4, 9)])
+        self.assertEqual(
+            finditer(r'\bis\b', 'this island is'), [(12, 14)])
+        self.assertEqual(
+            finditer(r'(\w+)@(\w+)', iter('x@y a@b')), [(0, 3), (4, 7)])
+        self.assertEqual(
+            [m.groups()
+             for m in regexy.finditer(
+                regexy.compile(r'(\w+)@(\w+)'), 'x@y a@b')],
+            [('x', 'y'), ('a', 'b')])
+
+    def test_finditer_stream(self):
+        def stream_gen():
+            for _ in range(1000):
+                yield from 'xyz a'
+
+        self.assertEqual(
+            finditer('a', stream_gen()),
+            [(i * 5 + 4, i * 5 + 5) for i in range(1000)])
+
+    def test_stream_buffer(self):
+        sizes = []
+
+        def stream_gen():
+            yield 'a'
+
+            for _ in range(1000):
+                sizes.append(len(text.buffer))
+                yield 'b'
+
+            yield 'c'
+
+        # A long-lived thread does not
+        # keep the text in the buffer
+        text = Text(stream_gen())
+        self.assertEqual(
+            _find(regexy.compile(r'a.*c'), text)[1:], (0, 1002))
+        self.assertTrue(max(sizes) <= 2)
+        self.assertEqual(
+            sub(r'a.*c', 'x', iter('za' + 'b' * 1000 + 'cz')), 'zxz')
+
+        discarded = []
+        text = Text(iter('abcdef'))
+        text.on_discard = lambda offset, part: discarded.append(
+            (offset, part))
+
+        while text.fill():
+            text.shift(text.offset + len(text.buffer) - 1)
+
+        self.assertEqual(text.buffer, 'f')
+        self.assertEqual(text.span(1, 4), 'bcd')
+        self.assertEqual(text.span(0), 'abcdef')
+        text.discard(2)
+        self.assertEqual(text.span(0), 'cdef')
+        text.discard(6)
+        self.assertEqual(discarded, [(0, 'ab'), (2, 'cdef')])
+        self.assertEqual(text.buffer, '')
+
+    def test_sub(self):
+        self.assertEqual(sub(r'\d+', 'N', 'a1b22c333'), 'aNbNcN')
+        self.assertEqual(sub(r'x*', '-', 'abxd'), '-a-b--d-')
+        self.assertEqual(sub(r'z', 'N', 'abc'), 'abc')
+        self.assertEqual(sub(r'', '-', ''), '-')
+        self.assertEqual(
+            sub(r'(\w+)@(\w+)', r'\1 at \0', 'x@y a@b'), 'y at x b at a')
+        self.assertEqual(
+            sub(r'(?P<user>\w+)@(\w+)', r'\g<user>!\g<1>', 'x@y a@b'),
+            'x!y a!b')
+        self.assertEqual(sub(r'a', r'\\', 'ab'), '\\b')
+        self.assertEqual(sub(r'(a)*b', r'[\0]', 'aab b'), '[a] []')
+        self.assertEqual(
+            sub(r'\d', lambda m: str(m.start()), 'a1b2'), 'a1b3')
+        self.assertRaises(ValueError, sub, r'(a)', r'\g<x>', 'a')
+        self.assertRaises(ValueError, sub, r'(a)', r'\1', 'a')
+        self.assertRaises(ValueError, sub, r'a', r'\0', 'b')
+        self.assertRaises(ValueError, sub, rb'(?P<x>a)', rb'\g<y>', b'a')
+
+    def test_sub_out(self):
+        out = io.StringIO()
+        self.assertIsNone(sub(r'\d+', 'N', iter('a1b22c'), out=out))
+        self.assertEqual(out.getvalue(), 'aNbNc')
+
+        def stream_gen():
+            for _ in range(1000):
+                yield from 'secret=123;'
+
+        written = []
+        sub(r'\d+', '***', stream_gen(), out=written.append)
+        self.assertEqual(''.join(written), 'secret=***;' * 1000)
+        self.assertTrue(max(len(w) for w in written) <= len('secret=;'))
+
+    def test_split(self):
+        self.assertEqual(split(r',', 'a,b,,c'), ['a', 'b', '', 'c'])
+        self.assertEqual(split(r'\d+', 'a1b22c'), ['a', 'b', 'c'])
+        self.assertEqual(split(r'x*', 'axbc'), ['', 'a', '', 'b', 'c', ''])
+        self.assertEqual(split(r'(,)', 'a,b'), ['a', ',', 'b'])
+        self.assertEqual(split(r'z', 'abc'), ['abc'])
+        self.assertEqual(split(r'', ''), ['', ''])
+        self.assertEqual(
+            split(r'\s+', ' a  b ', maxsplit=2), ['', 'a', 'b '])
+        self.assertEqual(split(r',', iter('a,b,c'), maxsplit=1), ['a', 'b,c'])
+
+    def test_split_stream(self):
+        def stream_gen():
+            for _ in range(1000):
+                yield from 'record;'
+
+        pieces = regexy.split(regexy.compile(r';'), stream_gen())
+        self.assertEqual(next(pieces), 'record')
+        self.assertEqual(list(pieces), ['record'] * 999 + [''])
+
+    def test_chunks(self):
+        text = 'this island is his'
+        chunks = [text[i:i + 3] for i in range(0, len(text), 3)]
+        self.assertEqual(finditer(r'\bis\b', chunks), [(12, 14)])
+        self.assertEqual(finditer(r'\bis\b', iter(text)), [(12, 14)])
+        self.assertEqual(finditer(r'\bis\b', ['', text, '']), [(12, 14)])
+        self.assertEqual(finditer(r's$', ['is', 'his']), [(4, 5)])
+        self.assertEqual(finditer(r'a(?=b)', ['a', 'b', 'a']), [(0, 1)])
+        self.assertEqual(
+            match(r'(\w+| +)*', ['Im a', ' str', 'eam']).groups(),
+            (('Im', ' ', 'a', ' ', 'stream'),))
+        self.assertEqual(
+            new_full_match(r'(\w+)', ['ab', 'c']).groups(), ('abc',))
+        self.assertIsNone(new_full_match(r'(\w+)', ['ab', ' ']))
+
+    def test_text_stream(self):
+        stream = io.TextIOWrapper(
+            io.BytesIO(b'Im a stream'), encoding='utf-8')
+        self.assertEqual(
+            match(r'(\w+| +)*', stream).groups(),
+            (('Im', ' ', 'a', ' ', 'stream'),))
+        self.assertEqual(
+            finditer(r'\w+', io.StringIO('Im a stream')),
+            [(0, 2), (3, 4), (5, 11)])
+        self.assertEqual(
+            sub(r'\w+', 'x', io.StringIO('Im a stream')), 'x x x')
+
+    def test_bytes(self):
+        self.assertEqual(finditer(rb'\d+', b'a1b22'), [(1, 2), (3, 5)])
+        self.assertEqual(
+            finditer(rb'\d+', bytearray(b'a1b22')), [(1, 2), (3, 5)])
+        self.assertEqual(
+            finditer(rb'\d+', memoryview(b'a1b22')), [(1, 2), (3, 5)])
+        self.assertEqual(
+            finditer(rb'\d+', io.BytesIO(b'a1b22')), [(1, 2), (3, 5)])
+        self.assertEqual(
+            finditer(rb'\d+', [b'a1', b'b2', b'2']), [(1, 2), (3, 5)])
+        self.assertEqual(
+            regexy.search(
+                regexy.compile(r'\d+', regexy.Flags.BYTES), b'a1b22').span(),
+            (1, 2))
+        self.assertEqual(
+            match(rb'(\w+)=(\w+)', b'k=v').groups(), (b'k', b'v'))
+        self.assertEqual(match(rb'(a)*', b'aa').groups(), ((b'a', b'a'),))
+        self.assertEqual(match(rb'(a)*', b'').groups(), (None,))
+        self.assertEqual(finditer(b'\x00', b'\x00a\x00'), [(0, 1), (2, 3)])
+        self.assertEqual(finditer(b'\xe9', 'caf\xe9'.encode('latin-1')), [(3, 4)])
+        self.assertEqual(sub(rb'(\d+)', rb'<\0>', b'a1b22'), b'a<1>b<22>')
+        self.assertEqual(split(rb',', b'a,b'), [b'a', b'b'])
+        self.assertRaises(TypeError, match, rb'a', 'a')
+        self.assertRaises(TypeError, match, r'a', b'a')
+
+    def test_bytes_ascii_shorthands(self):
+        text = 'caf\xe9 1'.encode('latin-1')
+        self.assertEqual(finditer(rb'\w+', text), [(0, 3), (5, 6)])
+        self.assertEqual(finditer(rb'\W', text), [(3, 4), (4, 5)])
+        self.assertEqual(finditer(rb'[\W]', text), [(3, 4), (4, 5)])
+        self.assertEqual(finditer(rb'\S+', text), [(0, 4), (5, 6)])
+        self.assertEqual(finditer(rb'.', b'a\n\xff'), [(0, 1), (2, 3)])
+        self.assertEqual(finditer(b'[\x80-\xff]', text), [(3, 4)])
+        self.assertEqual(finditer(b'[^a-z]', text), [(3, 4), (4, 5), (5, 6)])
+        self.assertEqual(finditer(rb'\bis\b', b'is\xe9is'), [(0, 2), (3, 5)])
+
+    def test_utf8(self):
+        def finditer_utf8(expression, text):
+            return [
+                m.span()
+                for m in regexy.finditer(
+                    regexy.compile(expression, regexy.Flags.UTF8),
+                    text.encode('utf-8'))]
+
+        self.assertEqual(finditer_utf8(r'\w+', 'caf\xe9 1'), [(0, 5), (6, 7)])
+        self.assertEqual(finditer_utf8(r'\w+', '\u65e5\u672c x'), [(0, 6), (7, 8)])
+        self.assertEqual(finditer_utf8(r'\W', 'a\u3000b'), [(1, 4)])
+        self.assertEqual(finditer_utf8(r'\d+', 'a\u0663\u0664'), [(1, 5)])
+        self.assertEqual(finditer_utf8(r'.', 'a\n\U0001f642'), [(0, 1), (2, 6)])
+        self.assertEqual(finditer_utf8('[\xe1-\xfc]+', 'a\xe9\xfcz'), [(1, 5)])
+        self.assertEqual(finditer_utf8(r'[^a]', 'a\xe9'), [(1, 3)])
+        self.assertEqual(finditer_utf8('\xe9+', '\xe9\xe9e'), [(0, 4)])
+        self.assertEqual(
+            finditer_utf8('\xe9*', '\xe9a\u65e5'),
+            [(0, 2), (2, 2), (3, 3), (6, 6)])
+        self.assertEqual(
+            regexy.match(
+                regexy.compile(r'(\w+)=(\w+)', regexy.Flags.UTF8),
+                '\xfc=\xdf'.encode('utf-8')).groups(),
+            ('\xfc'.encode('utf-8'), '\xdf'.encode('utf-8')))
+        self.assertRaises(
+            ValueError, regexy.compile, 'a(?=\xe9)', regexy.Flags.UTF8)
+        self.assertRaises(
+            TypeError, regexy.match,
+            regexy.compile(r'a', regexy.Flags.UTF8), 'a')
+
+    def test_bytes_mmap(self):
+        with tempfile.TemporaryFile() as f:
+            f.write(b'hello 123 world 45')
+            f.flush()
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                self.assertEqual(
+                    finditer(rb'\d+', mm), [(6, 9), (16, 18)])
+
+    def test_file(self):
+        with tempfile.TemporaryDirectory() as path:
+            file_path = os.path.join(path, 'file')
+
+            data = 'a1\n\nb22 cé 3'.encode('utf-8')
+
+            with open(file_path, 'wb') as f:
+                f.write(data)
+
+            self.assertEqual(
+                [(m.span(), m.line())
+                 for m in regexy.finditer_file(
+                    regexy.compile(rb'\d+'), file_path)],
+                [((1, 2), 1), ((5, 7), 3), ((12, 13), 3)])
+            self.assertEqual(
+                [m.span()
+                 for m in regexy.finditer_file(
+                    regexy.compile(r'c\w', regexy.Flags.UTF8), file_path)],
+                [(8, 11)])
+            m = regexy.search_file(regexy.compile(rb'(b)(\d+)'), file_path)
+            self.assertEqual(m.groups(), (b'b', b'22'))
+            self.assertEqual((m.span(), m.line()), ((4, 7), 3))
+            self.assertIsNone(
+                regexy.search_file(regexy.compile(rb'x'), file_path))
+            self.assertEqual(
+                regexy.search_file(rb'(b)(\d+)', file_path).span(), (4, 7))
+            self.assertEqual(
+                [m.span() for m in regexy.finditer_file(rb'\d+', file_path)],
+                [(1, 2), (5, 7), (12, 13)])
+            self.assertEqual(regexy.count_file(rb'\d+', file_path), 3)
+
+            # Plain text regexes
+            for expression in (rb'b22', rb'^a1', rb'3$', rb'\n\n'):
+                nfa = regexy.compile(expression)
+                self.assertIsNotNone(nfa.literal)
+                self.assertEqual(
+                    [(m.span(), m.line())
+                     for m in regexy.finditer_file(nfa, file_path)],
+                    [(m.span(), 1 + data[:m.start()].count(b'\n'))
+                     for m in regexy.finditer(nfa, data)])
+
+            self.assertEqual(
+                regexy.search_file(
+                    regexy.compile(rb'B22', regexy.Flags.IGNORECASE),
+                    file_path).span(),
+                (4, 7))
+            matches = regexy.finditer_file(regexy.compile(rb'\d'), file_path)
+            next(matches)
+            matches.close()
+            self.assertRaises(
+                TypeError, regexy.search_file, regexy.compile(r'a'), file_path)
+
+            empty_path = os.path.join(path, 'empty')
+            open(empty_path, 'wb').close()
+            self.assertEqual(
+                [m.span()
+                 for m in regexy.finditer_file(
+                    regexy.compile(rb'a*'), empty_path)],
+                [(0, 0)])
+
+    def test_file_parallel(self):
+        range_size = regexy.process.file.RANGE_SIZE
+        regexy.process.file.RANGE_SIZE = 4
+
+        try:
+            with tempfile.TemporaryDirectory() as path:
+                file_path = os.path.join(path, 'file')
+
+                with open(file_path, 'wb') as f:
+                    f.write(b'aab ab\nb1 aaaa22\n\nab 333 a')
+
+                for expression in (
+                        rb'\d+', rb'a*', rb'(a|b)+', rb'\b', rb'a.*?b', rb'$',
+                        rb'ab', rb'aa', rb'^aab', rb' a$'):
+                    nfa = regexy.compile(expression)
+                    expected = [
+                        (m.span(), m.groups(), m.line())
+                        for m in regexy.finditer_file(nfa, file_path)]
+                    self.assertEqual(
+                        [(m.span(), m.groups(), m.line())
+                         for m in regexy.finditer_file(
+                            nfa, file_path, processes=2)],
+                        expected)
+                    self.assertEqual(
+                        regexy.count_file(nfa, file_path, processes=2),
+                        len(expected))
+                    self.assertEqual(
+                        regexy.count_file(nfa, file_path), len(expected))
+        finally:
+            regexy.process.file.RANGE_SIZE = range_size
+
+    def test_pickle(self):
+        nfa = regexy.compile(r'(\w+)=(?P<value>\w+)')
+        loaded = pickle.loads(pickle.dumps(nfa))
+        self.assertEqual(loaded.named_groups, {'value': 1})
+        self.assertEqual(
+            regexy.search(loaded, 'a k=v').groups(), ('k', 'v'))
+        self.assertEqual(
+            regexy.search(
+                pickle.loads(pickle.dumps(regexy.compile(rb'\d+'))),
+                b'a12').span(),
+            (1, 3))
+        self.assertEqual(
+            pickle.loads(pickle.dumps(
+                regexy.compile(r'\w', regexy.Flags.UTF8))).flags,
+            regexy.Flags.UTF8 | regexy.Flags.BYTES)
+        m = pickle.loads(pickle.dumps(regexy.search(nfa, 'k=v')))
+        self.assertEqual((m.groups(), m.span()), (('k', 'v'), (0, 3)))
+
+    def test_dumps(self):
+        nfa = regexy.compile(r'(\w+)=(?P<value>\d+)(?!x)')
+        loaded = regexy.loads(regexy.dumps(nfa))
+        self.assertEqual(loaded.named_groups, {'value': 1})
+        self.assertEqual(loaded.expression, nfa.expression)
+        self.assertEqual(
+            regexy.search(loaded, 'a k=1').groups(), ('k', '1'))
+        self.assertIsNone(regexy.search(loaded, 'k=1x'))
+        utf8_nfa = regexy.compile(r'\w+', regexy.Flags.UTF8, dfa='full')
+        loaded = regexy.loads(regexy.dumps(utf8_nfa))
+        self.assertEqual(loaded.dfa, utf8_nfa.dfa)
+        self.assertEqual(
+            regexy.match(loaded, 'caf\xe9!'.encode('utf-8')).span(),
+            (0, 5))
+        loaded = regexy.loads(regexy.dumps(regexy.compile('a' * 2000)))
+        self.assertEqual(regexy.match(loaded, 'a' * 2000).span(), (0, 2000))
+
+        with tempfile.TemporaryFile() as f:
+            regexy.dump(regexy.compile(r'a|b'), f)
+            f.seek(0)
+            self.assertEqual(regexy.load(f).expression, r'a|b')
+
+        data = regexy.dumps(nfa)
+        self.assertRaises(ValueError, regexy.loads, b'')
+        self.assertRaises(ValueError, regexy.loads, b'x' + data[1:])
+        self.assertRaises(ValueError, regexy.loads, data[:-10])
+        self.assertRaises(
+            ValueError, regexy.loads,
+            data[:7] + b'\xff\xff' + data[9:])
+        self.assertRaises(
+            ValueError, regexy.loads,
+            data[:-1] + bytes([data[-1] ^ 1]))
+
+        def stored(payload):
+            return serialize._HEADER.pack(
+                serialize.MAGIC,
+                serialize.FORMAT_VERSION,
+                hashlib.sha256(payload).digest()) + payload
+
+        self.assertIsNotNone(
+            regexy.loads(stored(data[serialize._HEADER.size:])))
+        # A dotted name reaches a builtin
+        # through an allowed module
+        for payload in (
+                pickle.dumps((os.system, ('',))),
+                b'\x80\x04\x8c\x13regexy.shared.nodes'
+                b'\x8c\x10__builtins__.get\x93.'):
+            with self.assertRaises(ValueError) as cm:
+                regexy.loads(stored(payload))
+
+            self.assertIsInstance(
+                cm.exception.__cause__, pickle.UnpicklingError)
+
+        self.assertRaises(
+            ValueError, regexy.loads, stored(pickle.dumps(None)))
+        self.assertRaises(
+            ValueError, regexy.loads, stored(pickle.dumps(
+                (regexy.__version__,) + (None,) * 13)))
+
+    def test_compile_cached(self):
+        with tempfile.TemporaryDirectory() as path:
+            nfa = regexy.compile_cached(r'(a)b', path)
+            self.assertEqual(regexy.match(nfa, 'ab').groups(), ('a',))
+            files = os.listdir(path)
+            self.assertEqual(len(files), 1)
+            self.assertEqual(
+                regexy.match(
+                    regexy.compile_cached(r'(a)b', path), 'ab').groups(),
+                ('a',))
+            self.assertEqual(os.listdir(path), files)
+            nfa = regexy.compile_cached(rb'(a)b', path, dfa='full')
+            self.assertIsNotNone(nfa.dfa)
+            self.assertEqual(len(os.listdir(path)), 2)
+
+            with open(os.path.join(path, files[0]), 'r+b') as f:
+                f.seek(-20, os.SEEK_END)
+                f.write(b'\xff')
+
+            self.assertEqual(
+                regexy.match(
+                    regexy.compile_cached(r'(a)b', path), 'ab').groups(),
+                ('a',))
+            self.assertEqual(len(os.listdir(path)), 2)
+
+            with open(os.path.join(path, files[0]), 'wb') as f:
+                f.write(b'corrupted')
+
+            self.assertEqual(
+                regexy.match(
+                    regexy.compile_cached(r'(a)b', path), 'ab').groups(),
+                ('a',))
+            self.assertEqual(len(os.listdir(path)), 2)
+
+    def test_map_dfa(self):
+        nfa = regexy.compile(r'\w+\d', dfa='full')
+
+        with tempfile.TemporaryDirectory() as path:
+            file_path = os.path.join(path, 'tables')
+            mapped = regexy.map_dfa(nfa, file_path)
+            self.assertIsInstance(mapped.dfa.match.transitions, memoryview)
+            self.assertEqual(mapped.dfa, nfa.dfa)
+            self.assertEqual(regexy.match(mapped, 'ab1c2 3').span(), (0, 5))
+            self.assertIsNone(regexy.full_match(mapped, 'ab1c'))
+            mtime = os.stat(file_path).st_mtime_ns
+            self.assertEqual(
+                regexy.map_dfa(nfa, file_path).dfa.search, nfa.dfa.search)
+            self.assertEqual(os.stat(file_path).st_mtime_ns, mtime)
+            self.assertEqual(
+                regexy.loads(regexy.dumps(mapped)).dfa, nfa.dfa)
+
+            # The tables of another regex are replaced
+            other = regexy.compile(r'a+', dfa='full')
+            self.assertEqual(
+                regexy.map_dfa(other, file_path).dfa, other.dfa)
+            self.assertEqual(
+                regexy.map_dfa(nfa, file_path).dfa, nfa.dfa)
+
+            with open(file_path, 'wb') as f:
+                f.write(b'corrupted')
+
+            self.assertEqual(regexy.map_dfa(nfa, file_path).dfa, nfa.dfa)
+
+            # Truncated tables are unmapped
+            with open(file_path, 'rb') as f:
+                data = f.read()
+
+            with open(file_path, 'wb') as f:
+                f.write(data[:-8])
+
+            maps = []
+            mmap_type = mmap.mmap
+
+            def mapped_file(*args, **kwargs):
+                maps.append(mmap_type(*args, **kwargs))
+                return maps[-1]
+
+            with unittest.mock.patch.object(
+                    serialize.mmap, 'mmap', mapped_file):
+                self.assertRaises(
+                    ValueError, serialize._map_tables, nfa, file_path)
+
+            self.assertEqual(len(maps), 1)
+            self.assertTrue(maps[0].closed)
+            self.assertEqual(regexy.map_dfa(nfa, file_path).dfa, nfa.dfa)
+            self.assertRaises(
+                ValueError, regexy.map_dfa, regexy.compile(r'a'), file_path)
+
+    def test_compile_cache(self):
+        regexy.purge()
+        self.assertEqual(
+            regexy.cache_info(), (0, 0, 0, 0, 512, 0))
+        nfa = regexy.compile(r'(a)+b')
+        self.assertIs(regexy.compile(r'(a)+b'), nfa)
+        self.assertIsNot(regexy.compile(rb'(a)+b'), nfa)
+        self.assertIsNot(regexy.compile(r'(a)+b', dfa='full'), nfa)
+        info = regexy.cache_info()
+        self.assertEqual(
+            (info.hits, info.misses, info.evictions, info.size),
+            (1, 3, 0, 3))
+        self.assertGreater(info.bytes, 0)
+        self.assertEqual(
+            list(inspect.signature(regexy.compile).parameters),
+            ['expression', 'flags', 'dfa', 'dfa_max_states'])
+        self.assertEqual(
+            regexy.search(r'(\d+)', 'ab12').groups(), ('12',))
+        self.assertEqual(regexy.match(rb'a', b'ab').span(), (0, 1))
+        self.assertIsNotNone(regexy.full_match(r'a+', 'aa'))
+        self.assertEqual(
+            [m.span() for m in regexy.finditer(r'a', 'aba')],
+            [(0, 1), (2, 3)])
+        self.assertEqual(regexy.sub(r'a', 'x', 'aba'), 'xbx')
+        self.assertEqual(list(regexy.split(r'b', 'aba')), ['a', 'a'])
+        self.assertEqual(regexy.cache_info().hits, 2)
+        self.assertEqual(regexy.cache_info().misses, 8)
+        regexy.purge()
+        self.assertEqual(regexy.cache_info().size, 0)
+
+        # Unpickled regexes are cached as well
+        data = pickle.dumps(nfa)
+        loaded = pickle.loads(data)
+        self.assertIsNot(loaded, nfa)
+        self.assertIs(pickle.loads(data), loaded)
+        self.assertIs(regexy.compile(r'(a)+b'), loaded)
+        self.assertEqual(regexy.cache_info().size, 1)
+        regexy.purge()
+        self.assertIsNot(pickle.loads(data), loaded)
+        regexy.purge()
+
+        # LRU
+        max_size = cache.MAX_SIZE
+        regexy.compile(r'first')
+
+        for i in range(max_size - 1):
+            regexy.compile(r'a%d' % i)
+
+        regexy.compile(r'first')
+        regexy.compile(r'last')
+        info = regexy.cache_info()
+        self.assertEqual((info.size, info.evictions), (max_size, 1))
+        regexy.compile(r'first')
+        self.assertEqual(regexy.cache_info().hits, 2)
+        regexy.compile(r'a0')
+        self.assertEqual(regexy.cache_info().misses, max_size + 2)
+        regexy.purge()
+
+    def test_search_many(self):
+        nfa = regexy.compile(r'(\d+)')
+        texts = ['a1', 'b', '22c'] * 10
+        expected = [(1, 2), None, (0, 2)] * 10
+        self.assertEqual(
+            [m and m.span() for m in regexy.search_many(nfa, texts)],
+            expected)
+        self.assertEqual(
+            [m and m.span()
+             for m in regexy.search_many(
+                nfa, texts, processes=2, chunksize=4)],
+            expected)
+        self.assertEqual(
+            [m and m.groups()
+             for m in regexy.search_many(nfa, texts, processes=2)],
+            [('1',), None, ('22',)] * 10)
+        self.assertEqual(
+            [m and m.span() for m in regexy.search_many(r'(\d+)', texts)],
+            expected)
+
+    def test_match_many(self):
+        nfa = regexy.compile(r'(\d+)')
+        texts = ['1a', 'b', '22c', 'x3'] * 10
+        expected = [('1',), None, ('22',), None] * 10
+        self.assertEqual(
+            [m and m.groups() for m in regexy.match_many(nfa, texts)],
+            expected)
+        self.assertEqual(
+            [m and m.groups()
+             for m in regexy.match_many(
+                nfa, texts, processes=2, chunksize=3)],
+            expected)
+        self.assertEqual(
+            [m and m.span()
+             for m in regexy.match_many(
+                regexy.compile(r'\bx|a*'), ['ax', 'x', 'b'])],
+            [(0, 1), (0, 1), (0, 0)])
+        self.assertEqual(
+            [m and m.span()
+             for m in regexy.search_many(
+                regexy.compile(r'\bx|(a|b)*c'), ['abc', 'a x', 'ab'])],
+            [(0, 3), (2, 3), None])
+
+    def test_many_engines(self):
+        texts = ['GET /a', 'POST /b', 'get /', 'x GET /c', ''] * 3
+
+        for nfa in (
+                regexy.compile(r'GET /'),
+                regexy.compile(r'^GET /$'),
+                regexy.compile(r'\w+ /\w', dfa='full'),
+                regexy.compile(r'\w+ /\w', dfa='codegen'),
+                regexy.compile(r'(\w+) /')):
+            self.assertEqual(
+                [m and m.span() for m in regexy.match_many(nfa, texts)],
+                [m and m.span()
+                 for m in (regexy.match(nfa, t) for t in texts)])
+            self.assertEqual(
+                [m and m.span() for m in regexy.search_many(nfa, texts)],
+                [m and m.span()
+                 for m in (regexy.search(nfa, t) for t in texts)])
+            self.assertEqual(
+                [m and m.groups() for m in regexy.match_many(nfa, texts)],
+                [m and m.groups()
+                 for m in (regexy.match(nfa, t) for t in texts)])
+
+    def test_dfa(self):
+        def match_end(expression, text):
+            chars = sorted(set(text))
+            dfa = to_dfa(regexy.compile(expression), chars)
+            state = START
+            end = 0 if dfa.accepts[state] else -1
+
+            for pos, char in enumerate(text, 1):
+                state = dfa.step(state, chars.index(char))
+
+                if dfa.accepts[state]:
+                    end = pos
+
+                if state == DEAD:
+                    break
+
+            return end
+
+        self.assertEqual(match_end(r'a|ab', 'ab'), 1)
+        self.assertEqual(match_end(r'ab|a', 'ab'), 2)
+        self.assertEqual(match_end(r'a*?b', 'aab'), 3)
+        self.assertEqual(match_end(r'a*?', 'aab'), 0)
+        self.assertEqual(match_end(r'(a|b)*c', 'abab'), -1)
+        self.assertEqual(match_end(r'(a|b)*c', 'abcc'), 3)
+        self.assertEqual(match_end(r'\w+\d', 'ab1c2 3'), 5)
+        self.assertRaises(ValueError, match_end, r'\ba', 'a')
+        self.assertRaises(
+            ValueError, to_dfa, regexy.compile(r'(a|b)*a(a|b)(a|b)'),
+            'ab', max_states=4)
+
+    def test_full_dfa(self):
+        nfa = regexy.compile(r'ab|cb', dfa='full')
+        self.assertEqual(
+            to_dfa(nfa, is_leftmost_first=False).states_count, 5)
+        self.assertEqual(nfa.dfa.full_match.states_count, 4)
+        self.assertEqual(nfa.dfa.full_match.table_bytes, 4 * 4 + 4)
+        self.assertEqual(nfa.dfa.max_states, 10000)
+        self.assertIsNone(regexy.compile(r'ab|cb').dfa)
+
+        for expression in (
+                r'a|ab', r'ab|a', r'a*?b', r'(a|b)*c',
+                r'\w+\d', r'(?:ab|a)*', r'[^a]+', r''):
+            nfa = regexy.compile(expression)
+            dfa_nfa = regexy.compile(expression, dfa='full')
+
+            for text in ('', 'a', 'ab', 'aab', 'abcc', 'ab1c2 3', 'bb'):
+                for func in (regexy.match, regexy.full_match):
+                    dfa_match = func(dfa_nfa, text)
+                    nfa_match = func(nfa, text)
+                    self.assertEqual(repr(dfa_match), repr(nfa_match))
+                    self.assertEqual(
+                        dfa_match and dfa_match.span(),
+                        nfa_match and nfa_match.span())
+
+        self.assertEqual(
+            regexy.match(
+                regexy.compile(r'\w+', regexy.Flags.UTF8, dfa='full'),
+                'caf\xe9!'.encode('utf-8')).span(),
+            (0, 5))
+        self.assertEqual(
+            regexy.match(
+                regexy.compile(r'a+', dfa='full'),
+                iter(['a', 'aa', 'b'])).end(),
+            3)
+        # Groups are captured by the NFA
+        self.assertEqual(
+            regexy.match(regexy.compile(r'(a)+', dfa='full'), 'aab').groups(),
+            (('a', 'a'),))
+        self.assertIsNotNone(
+            pickle.loads(pickle.dumps(
+                regexy.compile(r'a', dfa='full', dfa_max_states=5))).dfa)
+        self.assertRaises(
+            ValueError, regexy.compile, r'(a|b)*a(a|b)(a|b)',
+            dfa='full', dfa_max_states=4)
+        self.assertRaises(ValueError, regexy.compile, r'\ba', dfa='full')
+
+    def test_codegen(self):
+        expressions = (
+            r'a|ab', r'ab|a', r'a*?b', r'(a|b)*c', r'\w+\d',
+            r'(?:ab|a)*', r'[^a]+', r'', r'\s*\S+', r'a{2,3}')
+        texts = ('', 'a', 'ab', 'aab', 'abcc', 'ab1c2 3', 'bb', ' aaa')
+
+        def check(max_states):
+            for expression in expressions:
+                nfa = regexy.compile(expression)
+                codegen_nfa = to_nfa(
+                    expression, dfa='codegen')
+                self.assertIsNotNone(codegen_nfa.matcher)
+
+                for text in texts:
+                    for func in (regexy.match, regexy.full_match):
+                        codegen_match = func(codegen_nfa, iter(text))
+                        nfa_match = func(nfa, text)
+                        self.assertEqual(
+                            repr(codegen_match), repr(nfa_match))
+                        self.assertEqual(
+                            codegen_match and codegen_match.span(),
+                            nfa_match and nfa_match.span())
+
+        check(codegen.MAX_STATES)
+        max_states = codegen.MAX_STATES
+        codegen.MAX_STATES = 1
+
+        try:
+            check(1)
+        finally:
+            codegen.MAX_STATES = max_states
+
+        nfa = regexy.compile(r'\w+', regexy.Flags.UTF8, dfa='codegen')
+        self.assertEqual(
+            regexy.match(nfa, 'caf\xe9!'.encode('utf-8')).span(), (0, 5))
+        self.assertIsNotNone(pickle.loads(pickle.dumps(nfa)).matcher)
+        self.assertEqual(
+            regexy.loads(regexy.dumps(nfa)).matcher.source,
+            nfa.matcher.source)
+        # Groups are captured by the NFA
+        self.assertEqual(
+            regexy.match(
+                regexy.compile(r'(a)+', dfa='codegen'), 'aab').groups(),
+            (('a', 'a'),))
+
+        with tempfile.TemporaryDirectory() as path:
+            file_path = os.path.join(path, 'matcher.py')
+            codegen.write_module(
+                regexy.compile(r'[a-z]+\d', dfa='codegen'), file_path)
+            spec = importlib.util.spec_from_file_location(
+                'matcher', file_path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            self.assertEqual(module.EXPRESSION, r'[a-z]+\d')
+            self.assertEqual(module.match(['ab', '1c']), 3)
+            self.assertEqual(module.match(['1']), -1)
+            self.assertEqual(module.full_match(['ab1']), 3)
+            self.assertEqual(module.full_match(['ab1c']), -1)
+
+    def test_literals(self):
+        def literals(nfa):
+            return [
+                state.literal
+                for state in all_states(nfa.state)
+                if isinstance(state, CharNode) and state.literal]
+
+        self.assertEqual(
+            literals(regexy.compile(r'Content-Type: (\w+)')),
+            ['Content-Type: '])
+        self.assertEqual(
+            literals(regexy.compile(r'ab*cd|(ef)')), ['ef', 'cd'])
+        self.assertEqual(literals(regexy.compile(r'a|b')), [])
+        self.assertEqual(literals(regexy.compile(b'abc')), [b'abc'])
+        self.assertEqual(
+            literals(regexy.loads(regexy.dumps(regexy.compile(r'abc')))),
+            ['abc'])
+
+        nfa = regexy.compile(r'(abc)+d|ab(c)')
+        bytes_nfa = regexy.compile(rb'(abc)+d|ab(c)')
+
+        for text in (iter('xabcabcd'), 'xabcabcd'):
+            self.assertEqual(
+                repr(regexy.search(nfa, text)),
+                "Match<(('abc', 'abc'), None)>")
+
+        for text in (iter('abcab'), 'abcab'):
+            self.assertEqual(
+                [m.span() for m in regexy.finditer(nfa, text)], [(0, 3)])
+
+        for text in ((bytes([c]) for c in b'xabcabcd'), b'xabcabcd'):
+            self.assertEqual(
+                regexy.search(bytes_nfa, text).span(), (1, 8))
+
+        nfa = regexy.compile(r'foo\b|foobar')
+        self.assertEqual(regexy.search(nfa, 'foobar foo').span(), (0, 6))
+        self.assertEqual(regexy.full_match(nfa, 'foo').span(), (0, 3))
+        self.assertIsNone(regexy.full_match(nfa, 'foob'))
+
+    def test_literal(self):
+        self.assertEqual(
+            regexy.compile(r'^a\.b$').literal,
+            Literal(text='a.b', is_start=True, is_end=True,
+                    is_ignore_case=False))
+        self.assertEqual(
+            regexy.compile(b'ab').literal,
+            Literal(text=b'ab', is_start=False, is_end=False,
+                    is_ignore_case=False))
+        self.assertEqual(
+            regexy.compile('\xe9', regexy.Flags.UTF8).literal.text,
+            b'\xc3\xa9')
+
+        for expression in (r'a|b', r'a*', r'(a)', r'^', r'a^b', r'\w'):
+            self.assertIsNone(regexy.compile(expression).literal)
+
+        for text in ('abab', iter('abab')):
+            self.assertEqual(regexy.count('ab', text), 2)
+
+        self.assertEqual(regexy.count('^ab', 'abab'), 1)
+        self.assertEqual(regexy.count(b'ab$', b'abab'), 1)
+        self.assertEqual(
+            [m.span() for m in regexy.finditer('ab', 'abxab')],
+            [(0, 2), (3, 5)])
+        self.assertEqual(
+            [m.span() for m in regexy.finditer('ab$', 'abxab')], [(3, 5)])
+        self.assertEqual(regexy.search('^ab', 'abab').span(), (0, 2))
+        self.assertIsNone(regexy.search('^ab', 'xab'))
+        self.assertEqual(regexy.search(b'b$', b'abab').span(), (3, 4))
+        self.assertEqual(repr(regexy.match('ab', 'abc')), 'Match<()>')
+        self.assertIsNone(regexy.match('ab$', 'abc'))
+        self.assertEqual(regexy.full_match('ab', 'ab').span(), (0, 2))
+        self.assertIsNone(regexy.full_match('ab', 'abc'))
+        self.assertEqual(
+            regexy.loads(regexy.dumps(regexy.compile('^ab'))).literal,
+            regexy.compile('^ab').literal)
+        self.assertRaises(TypeError, regexy.search, 'ab', b'ab')
+
+    def test_anchors(self):
+        def anchors(expression):
+            nfa = regexy.compile(expression)
+            return (
+                nfa.is_start_anchored,
+                nfa.is_end_anchored,
+                nfa.max_length)
+
+        self.assertEqual(anchors(r'^a|\Ab'), (True, False, 1))
+        self.assertEqual(anchors(r'(?:^a|b)c'), (False, False, 2))
+        self.assertEqual(anchors(r'(ab|c){1,3}$'), (False, True, 6))
+        self.assertEqual(anchors(r'a|b$'), (False, False, 1))
+        self.assertEqual(anchors(r'a+\z'), (False, True, None))
+        self.assertEqual(anchors(r'\b$'), (False, True, 0))
+
+        for text in ('abab', iter('abab')):
+            self.assertEqual(
+                [m.span() for m in regexy.finditer(r'^a|b', text)],
+                [(0, 1), (1, 2), (3, 4)])
+
+        for text in ('abab', iter('abab')):
+            self.assertEqual(
+                [m.span() for m in regexy.finditer(r'^(ab)', text)],
+                [(0, 2)])
+
+        for text in ('abab', iter('abab'), b'abab'):
+            expression = r'(ab|b){1,3}$'
+
+            if isinstance(text, bytes):
+                expression = expression.encode()
+
+            self.assertEqual(
+                regexy.search(expression, text).span(), (0, 4))
+
+        self.assertEqual(regexy.search(r'a?b$', 'abb').span(), (2, 3))
+        self.assertEqual(regexy.search(r'b?$', 'ab').span(), (1, 2))
+        self.assertEqual(list(regexy.split(r'\b$', 'a b')), ['a b', ''])
+        self.assertIsNone(regexy.search(r'^b', 'ab'))
+
+    def test_lengths(self):
+        def lengths(expression, flags=0):
+            nfa = regexy.compile(expression, flags)
+            return nfa.min_length, nfa.max_length
+
+        self.assertEqual(lengths(r''), (0, 0))
+        self.assertEqual(lengths(r'a{2,3}'), (2, 3))
+        self.assertEqual(lengths(r'(a|bc){1,2}d'), (2, 5))
+        self.assertEqual(lengths(r'(?:ab)?c{0,2}'), (0, 4))
+        self.assertEqual(lengths(r'\w{3,}'), (3, None))
+        self.assertEqual(lengths(r'(ab|c)+'), (1, None))
+        self.assertEqual(lengths(r'a(?=b)|^$'), (0, 1))
+        self.assertEqual(lengths('\xe9+', regexy.Flags.UTF8), (2, None))
+
+        self.assertIsNone(regexy.full_match(r'a{2,3}', 'a'))
+        self.assertIsNone(regexy.full_match(r'a{2,3}', 'aaaa'))
+        self.assertEqual(regexy.full_match(r'a{2,3}', 'aaa').span(), (0, 3))
+        self.assertIsNone(regexy.match(r'\w{3}', 'ab'))
+        self.assertEqual(regexy.match(r'\w{2}', 'abc').span(), (0, 2))
+        self.assertEqual(
+            [m.span() for m in regexy.finditer(r'\w\w', 'abcde')],
+            [(0, 2), (2, 4)])
+        self.assertEqual(
+            [m.span() for m in regexy.finditer(r'a*', 'ba')],
+            [(0, 0), (1, 2), (2, 2)])
+        self.assertEqual(regexy.search(rb'ab', b'xab').span(), (1, 3))
+
+    def test_ignore_case(self):
+        def ignore_case(expression, flags=0):
+            return regexy.compile(
+                expression, flags | regexy.Flags.IGNORECASE)
+
+        for dfa in (None, 'full'):
+            nfa = regexy.compile(
+                r'[b-d]+x', regexy.Flags.IGNORECASE, dfa=dfa)
+            self.assertIsNotNone(regexy.full_match(nfa, 'bCdX'))
+            self.assertIsNone(regexy.full_match(nfa, 'bCeX'))
+
+        self.assertEqual(
+            regexy.search(ignore_case('(\xe9+)'), 'a\xc9\xe9').groups(),
+            ('\xc9\xe9',))
+        self.assertIsNotNone(regexy.full_match(ignore_case(r'k'), '\u212a'))
+        self.assertIsNone(regexy.full_match(ignore_case(r'[^k]'), 'K'))
+        self.assertIsNotNone(regexy.full_match(ignore_case(r'[^a]'), 'b'))
+        self.assertIsNotNone(regexy.match(ignore_case(r'a(?=B)'), 'Ab'))
+        self.assertIsNone(regexy.match(ignore_case(r'a(?!B)'), 'Ab'))
+        self.assertIsNotNone(regexy.full_match(
+            ignore_case('\xe9', regexy.Flags.UTF8),
+            '\xc9'.encode('utf-8')))
+        self.assertIsNotNone(regexy.full_match(ignore_case(rb'ab'), b'aB'))
+        self.assertIsNone(regexy.full_match(ignore_case(b'\xe9'), b'\xc9'))
+        self.assertIsNone(regexy.full_match(regexy.compile(r'a'), 'A'))
+
+        nfa = ignore_case(r'aB')
+        self.assertEqual(
+            nfa.literal,
+            Literal(text='ab', is_start=False, is_end=False,
+                    is_ignore_case=True))
+        self.assertEqual(regexy.count(nfa, 'AB ab x\xe9Ab'), 3)
+        self.assertEqual(regexy.count(nfa, iter('AB ab')), 2)
+        self.assertEqual(regexy.full_match(nfa, 'Ab').span(), (0, 2))
+        self.assertEqual(
+            regexy.loads(regexy.dumps(nfa)).literal, nfa.literal)
+        self.assertIsNone(ignore_case('\xe9').literal)
+
+    def test_multiline(self):
+        def multiline(expression, flags=0):
+            return regexy.compile(
+                expression, flags | regexy.Flags.MULTILINE)
+
+        self.assertEqual(
+            [m.span() for m in regexy.finditer(multiline(r'^\w'), 'ab\ncd')],
+            [(0, 1), (3, 4)])
+        self.assertEqual(
+            [m.span() for m in regexy.finditer(multiline(r'\w$'), 'ab\ncd')],
+            [(1, 2), (4, 5)])
+        self.assertEqual(
+            [m.span() for m in regexy.finditer(multiline(rb'^$'), b'a\n\nb')],
+            [(2, 2)])
+        self.assertEqual(
+            [m.span()
+             for m in regexy.finditer(
+                 multiline(r'^\w', regexy.Flags.UTF8), b'a\nb')],
+            [(0, 1), (2, 3)])
+        self.assertEqual(
+            [m.span() for m in regexy.finditer(multiline(r'\A\w'), 'a\nb')],
+            [(0, 1)])
+        self.assertEqual(
+            [m.span() for m in regexy.finditer(multiline(r'\w\z'), 'a\nb')],
+            [(2, 3)])
+        self.assertEqual(
+            [m.span() for m in regexy.finditer(r'^\w', 'ab\ncd')],
+            [(0, 1)])
+
+        nfa = multiline(r'^ab$')
+        self.assertIsNone(nfa.literal)
+        self.assertFalse(nfa.is_start_anchored)
+        self.assertFalse(nfa.is_end_anchored)
+        self.assertIsNotNone(regexy.search(nfa, 'x\nab\ny'))
+        self.assertIsNotNone(regexy.search(
+            regexy.loads(regexy.dumps(nfa)), 'x\nab\ny'))
+
+    def test_search_lines(self):
+        def search_lines(expression, text):
+            return [
+                (line, text_line, m.span())
+                for line, text_line, m in regexy.search_lines(
+                    expression, text)]
+
+        text = 'GET /a 200\nPOST /b 500\n\nGET /c 500\n'
+
+        for expression in (r'500', r'\d+$', r'^GET', r'/\w \d+'):
+            self.assertEqual(
+                search_lines(expression, text),
+                [(line, text_line, m.span())
+                 for line, text_line in enumerate(text.splitlines(), 1)
+                 for m in (regexy.search(expression, text_line),)
+                 if m is not None])
+
+        self.assertEqual(
+            search_lines(r'500', text),
+            [(2, 'POST /b 500', (8, 11)), (4, 'GET /c 500', (7, 10))])
+        self.assertEqual(
+            search_lines(r'\w+\z', text),
+            [(1, 'GET /a 200', (7, 10)),
+             (2, 'POST /b 500', (8, 11)),
+             (4, 'GET /c 500', (7, 10))])
+        self.assertEqual(search_lines(r'^$', text), [(3, '', (0, 0))])
+        self.assertEqual(search_lines(r'0\sP', text), [])
+        self.assertEqual(search_lines(r'x*', ''), [])
+        self.assertEqual(
+            search_lines(r'b(?!\s)', 'ab\nb c\n'),
+            [(1, 'ab', (1, 2))])
+        self.assertEqual(
+            search_lines(r'(\d)0$', 'a\nb10'), [(2, 'b10', (1, 3))])
+        self.assertEqual(
+            [m.groups() for _line, _text, m in regexy.search_lines(
+                r'(\d)0$', 'a\nb10')],
+            [('1',)])
+
+        with tempfile.TemporaryFile() as f:
+            f.write(text.encode('utf-8'))
+            f.flush()
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                self.assertEqual(
+                    search_lines(rb'/\w 5', mm),
+                    [(2, b'POST /b 500', (5, 9)),
+                     (4, b'GET /c 500', (4, 8))])
+                self.assertEqual(
+                    search_lines(rb'500', mm),
+                    [(2, b'POST /b 500', (8, 11)),
+                     (4, b'GET /c 500', (7, 10))])
+
+        self.assertRaises(
+            TypeError, list, regexy.search_lines(r'a', iter(['a'])))
+        self.assertRaises(
+            TypeError, list, regexy.search_lines(rb'a', memoryview(b'a')))
+
+    def test_lookahead_nfa(self):
+        self.assertEqual(search(r'a(?=bc)', 'abd abc').span(), (4, 5))
+        self.assertEqual(search(r'a(?!bc)', 'abc abd').span(), (4, 5))
+        self.assertIsNone(search(r'a(?=bc)', 'ab'))
+        self.assertEqual(search(r'a(?!bc)', 'ab').span(), (0, 1))
+        self.assertEqual(match(r'a+(?=b+c)', 'aabbbc').span(), (0, 2))
+        self.assertIsNone(match(r'a+(?=b+c)', 'aabbb'))
+        self.assertEqual(match(r'(a|ab)(?=c)', 'abc').groups(), ('ab',))
+        self.assertEqual(match(r'[\w.]+(?=\.)', 'ab.cd.e').span(), (0, 5))
+        self.assertEqual(match(r'(?=[)]b)\)', ')b').span(), (0, 1))
+        self.assertEqual(match(r'(?!ab)\w\w', 'ac').span(), (0, 2))
+        self.assertIsNone(match(r'(?!ab)\w\w', 'ab'))
+        self.assertEqual(full_match(r'a(?=bc)bc', 'abc'), ())
+        self.assertEqual(search(r'a(?=.)', 'ab').span(), (0, 1))
+        self.assertIsNone(search(r'a(?=.)', 'a'))
+        self.assertIsNone(search(r'a(?!.)', 'ab'))
+        self.assertEqual(search(r'a(?!.)', 'a.a').span(), (2, 3))
+        self.assertEqual(search(r'a(?=\d)', 'ab a1').span(), (3, 4))
+        self.assertIsNone(search(r'a(?=\d)', 'ab'))
+        self.assertEqual(search(r'a(?=\b)', 'ab a').span(), (3, 4))
+        self.assertEqual(search(r'a(?=\.)', 'ab a.').span(), (3, 4))
+        self.assertEqual(search(r'a(?=$)', 'ab a').span(), (3, 4))
+        self.assertIsNone(full_match(r'a(?=bc)b', 'abc'))
+        self.assertEqual(
+            search(r'(?=(a|b)c)(\w)(\w)', 'xbc').groups(), ('b', 'c'))
+        self.assertEqual(
+            finditer(r'a(?=b+c)', 'abbc ab ac abc'), [(0, 1), (11, 12)])
+        self.assertEqual(
+            finditer(r'a(?=bc)', ['ab', 'ca', 'b', 'c']), [(0, 1), (3, 4)])
+        self.assertEqual(
+            regexy.search(regexy.compile(rb'a(?=bc)'), b'xabc').span(),
+            (1, 2))
+        self.assertEqual(
+            regexy.search(
+                regexy.compile('\xe9(?=\xf1b)', regexy.Flags.UTF8),
+                'x\xe9\xf1b'.encode('utf-8')).span(),
+            (1, 3))
+        self.assertEqual(
+            regexy.search(
+                regexy.compile(r'a(?=BC)', regexy.Flags.IGNORECASE),
+                'abC').span(),
+            (0, 1))
+        self.assertEqual(
+            [(line, m.span()) for line, _text, m in regexy.search_lines(
+                r'a(?=bc)', 'ab\nc\nxabc')],
+            [(3, (1, 2))])
+        loaded = regexy.loads(regexy.dumps(regexy.compile(r'a(?=b[cd])')))
+        self.assertEqual(
+            [m.span() for m in regexy.finditer(loaded, 'abe abd')],
+            [(4, 5)])
+        self.assertRaises(ValueError, regexy.compile, r'a(?=b(?=cd))')
+        self.assertRaises(
+            ValueError, regexy.compile, r'a(?=bc)', dfa='full')
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_masks(self):
+        texts = ['a1', 'ab12', '', 'b', '1a', 'abc']
+        nfa = regexy.compile(r'(a|b)*\d')
+        self.assertEqual(
+            regexy.match_mask(nfa, texts).tolist(),
+            [True, True, False, False, True, False])
+        self.assertEqual(
+            regexy.match_ends(nfa, texts).tolist(),
+            [2, 3, -1, -1, 1, -1])
+        self.assertEqual(
+            regexy.full_match_mask(nfa, texts).tolist(),
+            [True, False, False, False, False, False])
+        self.assertEqual(
+            regexy.search_mask(nfa, texts).tolist(),
+            [True, True, False, False, True, False])
+        self.assertEqual(
+            regexy.match_ends(regexy.compile(r'a|ab'), ['ab']).tolist(), [1])
+        self.assertEqual(
+            regexy.full_match_mask(regexy.compile(r'a|ab'), ['ab']).tolist(),
+            [True])
+        self.assertEqual(
+            regexy.match_ends(
+                regexy.compile(rb'\d+x'), [b'12x', b'x', b'9x9']).tolist(),
+            [3, -1, 2])
+        self.assertEqual(
+            regexy.match_ends(
+                regexy.compile(r'\w+', regexy.Flags.UTF8),
+                ['\xe91'.encode('utf-8'), b' a']).tolist(),
+            [3, -1])
+        self.assertEqual(regexy.match_mask(nfa, []).tolist(), [])
+        self.assertEqual(
+            regexy.search_mask(r'(a|b)*\d', texts).tolist(),
+            [True, True, False, False, True, False])
+        self.assertRaises(
+            ValueError, regexy.match_mask, regexy.compile(r'\ba'), ['a'])
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_extract_many(self):
+        texts = ['k=v', 'x', 'ab=', 'a=b=c']
+        nfa = regexy.compile(r'(\w+)=(\w*)')
+        keys, values = regexy.extract_many(nfa, texts)
+        self.assertEqual(keys.tolist(), [[0, 1], [-1, -1], [0, 2], [0, 1]])
+        self.assertEqual(values.tolist(), [[2, 3], [-1, -1], [3, 3], [2, 3]])
+        keys, values = regexy.extract_many(
+            r'(\w+)=(\w*)', texts, is_text=True)
+        self.assertEqual(keys.tolist(), ['k', None, 'ab', 'a'])
+        self.assertEqual(values.tolist(), ['v', None, '', 'b'])
+        self.assertEqual(
+            [column.tolist()
+             for column in regexy.extract_many(
+                regexy.compile(r'(?:(a)|(b))+'), ['ab', 'c'])],
+            [[[0, 1], [-1, -1]], [[1, 2], [-1, -1]]])
+        self.assertEqual(
+            regexy.extract_many(
+                regexy.compile(r'\b(a)'), ['ba a', 'b'])[0].tolist(),
+            [[3, 4], [-1, -1]])
+        self.assertEqual(
+            regexy.extract_many(
+                regexy.compile(rb'(\d+)'), [b'a12'], is_text=True)[0].tolist(),
+            [b'12'])
+
+    def test_alphabet(self):
+        # Built along with the DFAs only
+        self.assertIsNone(regexy.compile(r'\w').alphabet)
+        self.assertEqual(
+            len(regexy.compile(r'\w', dfa='full').alphabet), 2)
+        alphabet = nfa_alphabet(regexy.compile(r'[a-c]x|\d'))
+        self.assertEqual(len(alphabet), 4)
+        self.assertEqual(alphabet.class_of('a'), alphabet.class_of('c'))
+        self.assertNotEqual(alphabet.class_of('a'), alphabet.class_of('x'))
+        self.assertNotEqual(alphabet.class_of('a'), alphabet.class_of('1'))
+        self.assertEqual(alphabet.class_of('1'), alphabet.class_of('\u0663'))
+        self.assertEqual(alphabet.class_of('d'), alphabet.class_of('\u65e5'))
+        self.assertEqual(alphabet.class_of('d'), alphabet.class_of('\ud800'))
+        alphabet = nfa_alphabet(regexy.compile(r'\w'))
+        self.assertEqual(len(alphabet), 2)
+        self.assertEqual(alphabet.class_of('a'), alphabet.class_of('\xe9'))
+        self.assertNotEqual(alphabet.class_of('a'), alphabet.class_of(' '))
+        alphabet = nfa_alphabet(regexy.compile(rb'a[\x80-\xff]'))
+        self.assertEqual(len(alphabet), 3)
+        self.assertEqual(alphabet.class_of(0x80), alphabet.class_of(0xff))
+        self.assertEqual(alphabet.class_of(0), alphabet.class_of(0x7f))
+        alphabet = nfa_alphabet(
+            regexy.compile(r'\w', regexy.Flags.UTF8))
+        self.assertEqual(alphabet.class_of(ord('a')), alphabet.class_of(ord('z')))